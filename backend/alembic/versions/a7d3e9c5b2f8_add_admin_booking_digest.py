@@ -0,0 +1,42 @@
+"""add admin booking digest: appointments.created_at / cancelled_at and digest settings on tenants
+
+Revision ID: a7d3e9c5b2f8
+Revises: f2c6a8e1b9d4
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9c5b2f8'
+down_revision: Union[str, Sequence[str], None] = 'f2c6a8e1b9d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows get the migration time; digest windows only start once a tenant enables them.
+    op.add_column('appointments', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.add_column('appointments', sa.Column('cancelled_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_appointments_tenant_created_at', 'appointments', ['tenant_id', 'created_at'], unique=False)
+    op.create_index(
+        'ix_appointments_tenant_cancelled_at', 'appointments', ['tenant_id', 'cancelled_at'], unique=False,
+        postgresql_where=sa.text('cancelled_at IS NOT NULL'),
+    )
+
+    op.add_column('tenants', sa.Column('admin_digest_interval_minutes', sa.Integer(), nullable=True))
+    op.add_column('tenants', sa.Column('admin_digest_last_sent_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('tenants', 'admin_digest_last_sent_at')
+    op.drop_column('tenants', 'admin_digest_interval_minutes')
+
+    op.drop_index('ix_appointments_tenant_cancelled_at', table_name='appointments')
+    op.drop_index('ix_appointments_tenant_created_at', table_name='appointments')
+    op.drop_column('appointments', 'cancelled_at')
+    op.drop_column('appointments', 'created_at')
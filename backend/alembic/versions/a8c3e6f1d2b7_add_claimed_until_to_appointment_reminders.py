@@ -0,0 +1,29 @@
+"""add appointment_reminders.claimed_until
+
+Lease stamped by the reminder scan on the rows it queues, so later scans do not
+queue them again while they wait in the reminders queue (or for a rate-limit retry).
+
+Revision ID: a8c3e6f1d2b7
+Revises: c9f2d7a4e1b6
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3e6f1d2b7'
+down_revision: Union[str, Sequence[str], None] = 'c9f2d7a4e1b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('appointment_reminders', sa.Column('claimed_until', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('appointment_reminders', 'claimed_until')
@@ -0,0 +1,29 @@
+"""add functional index on lower(tenants.subdomain)
+
+Public endpoints resolve tenants with func.lower(subdomain) = :subdomain, which
+the plain ix_tenants_subdomain cannot serve.
+
+Revision ID: b4e8f1a6c3d9
+Revises: a7d3e9c5b2f8
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8f1a6c3d9'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e9c5b2f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tenants_subdomain_lower', 'tenants', [sa.text('lower(subdomain)')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tenants_subdomain_lower', table_name='tenants')
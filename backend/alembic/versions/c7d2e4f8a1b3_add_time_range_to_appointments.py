@@ -0,0 +1,42 @@
+"""add time_range tstzrange with GiST index to appointments
+
+Merges the end_datetime_utc and tenants.is_active heads.
+
+Revision ID: c7d2e4f8a1b3
+Revises: af1907a49e0d, b2f1d7c1a9a2
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e4f8a1b3'
+down_revision: Union[str, Sequence[str], None] = ('af1907a49e0d', 'b2f1d7c1a9a2')
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    # Generated column: existing rows are filled in by the ALTER itself
+    op.add_column('appointments', sa.Column(
+        'time_range',
+        postgresql.TSTZRANGE(),
+        sa.Computed("tstzrange(appointment_time, COALESCE(end_datetime_utc, appointment_time), '[)')", persisted=True),
+        nullable=True,
+    ))
+    op.create_index(
+        'ix_appointments_tenant_time_range', 'appointments', ['tenant_id', 'time_range'],
+        unique=False, postgresql_using='gist'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_appointments_tenant_time_range', table_name='appointments', postgresql_using='gist')
+    op.drop_column('appointments', 'time_range')
+    # btree_gist is left installed; other objects may depend on it
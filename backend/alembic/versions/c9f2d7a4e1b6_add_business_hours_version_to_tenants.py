@@ -0,0 +1,46 @@
+"""add tenants.business_hours_version
+
+Stores the business-hours schedule version (sha1 of the config + timezone) so
+get_tenant_schedule() compares a stored value instead of hashing the JSON on
+every call. Existing rows are backfilled with the same hash.
+
+Revision ID: c9f2d7a4e1b6
+Revises: b4e8f1a6c3d9
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+import hashlib
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f2d7a4e1b6'
+down_revision: Union[str, Sequence[str], None] = 'b4e8f1a6c3d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _schedule_version(business_hours_config, timezone_name: str) -> str:
+    # Same as app.services.business_hours.schedule_version at the time of this migration
+    payload = json.dumps([business_hours_config, timezone_name], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    op.add_column('tenants', sa.Column('business_hours_version', sa.String(length=40), nullable=True))
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, business_hours_config, timezone FROM tenants")).fetchall()
+    for tenant_id, config, timezone_name in rows:
+        bind.execute(
+            sa.text("UPDATE tenants SET business_hours_version = :version WHERE id = :id"),
+            {"version": _schedule_version(config, timezone_name or "UTC"), "id": tenant_id},
+        )
+
+
+def downgrade() -> None:
+    op.drop_column('tenants', 'business_hours_version')
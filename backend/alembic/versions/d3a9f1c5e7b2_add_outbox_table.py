@@ -0,0 +1,66 @@
+"""add outbox table for transactional notifications
+
+Revision ID: d3a9f1c5e7b2
+Revises: c7d2e4f8a1b3
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a9f1c5e7b2'
+down_revision: Union[str, Sequence[str], None] = 'c7d2e4f8a1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+outbox_kind = postgresql.ENUM('appointment_notification', 'email', name='outbox_kind', create_type=False)
+outbox_status = postgresql.ENUM('pending', 'sending', 'sent', 'failed', 'skipped', name='outbox_status', create_type=False)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    outbox_kind.create(bind, checkfirst=True)
+    outbox_status.create(bind, checkfirst=True)
+
+    op.create_table(
+        'outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', sa.Integer(), nullable=False),
+        sa.Column('kind', outbox_kind, nullable=False),
+        sa.Column('appointment_id', sa.Integer(), nullable=True),
+        sa.Column('event_trigger', sa.String(), nullable=True),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('status', outbox_status, server_default='pending', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('locked_by', sa.String(), nullable=True),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outbox_id'), 'outbox', ['id'], unique=False)
+    op.create_index(op.f('ix_outbox_tenant_id'), 'outbox', ['tenant_id'], unique=False)
+    op.create_index(op.f('ix_outbox_appointment_id'), 'outbox', ['appointment_id'], unique=False)
+    op.create_index(
+        'ix_outbox_pending_available_at', 'outbox', ['available_at'], unique=False,
+        postgresql_where=sa.text("status IN ('pending', 'sending')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_pending_available_at', table_name='outbox')
+    op.drop_index(op.f('ix_outbox_appointment_id'), table_name='outbox')
+    op.drop_index(op.f('ix_outbox_tenant_id'), table_name='outbox')
+    op.drop_index(op.f('ix_outbox_id'), table_name='outbox')
+    op.drop_table('outbox')
+    outbox_status.drop(op.get_bind(), checkfirst=True)
+    outbox_kind.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,58 @@
+"""add reminder_due_at / reminder_sent_at to appointments
+
+Revision ID: e5b8c2d4f6a1
+Revises: d3a9f1c5e7b2
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8c2d4f6a1'
+down_revision: Union[str, Sequence[str], None] = 'd3a9f1c5e7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('appointments', sa.Column('reminder_due_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('appointments', sa.Column('reminder_sent_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Schedule upcoming appointments of tenants with reminders enabled. Reminders whose
+    # time already passed (short-notice bookings the old job skipped) are not scheduled.
+    op.execute("""
+        UPDATE appointments a
+        SET reminder_due_at = a.appointment_time - make_interval(hours => t.reminder_interval_hours)
+        FROM tenants t
+        WHERE t.id = a.tenant_id
+          AND t.reminder_interval_hours > 0
+          AND a.appointment_time - make_interval(hours => t.reminder_interval_hours) > now()
+    """)
+    # Reminders already sent by the old polling job must not go out again
+    op.execute("""
+        UPDATE appointments a
+        SET reminder_sent_at = sent.last_sent_at
+        FROM (
+            SELECT appointment_id, max("timestamp") AS last_sent_at
+            FROM communications_log
+            WHERE type = 'REMINDER' AND status = 'sent' AND appointment_id IS NOT NULL
+            GROUP BY appointment_id
+        ) sent
+        WHERE sent.appointment_id = a.id
+          AND a.reminder_due_at IS NOT NULL
+    """)
+
+    op.create_index(
+        'ix_appointments_reminder_due_unsent', 'appointments', ['reminder_due_at'], unique=False,
+        postgresql_where=sa.text("reminder_sent_at IS NULL AND reminder_due_at IS NOT NULL")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_appointments_reminder_due_unsent', table_name='appointments')
+    op.drop_column('appointments', 'reminder_sent_at')
+    op.drop_column('appointments', 'reminder_due_at')
@@ -0,0 +1,95 @@
+"""add appointment_reminders (one row per offset) and reminder offsets on tenants/services
+
+Moves appointments.reminder_due_at / reminder_sent_at into appointment_reminders.
+
+Revision ID: f2c6a8e1b9d4
+Revises: e5b8c2d4f6a1
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a8e1b9d4'
+down_revision: Union[str, Sequence[str], None] = 'e5b8c2d4f6a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+reminder_outcome = postgresql.ENUM('sent', 'failed', 'skipped', name='reminder_outcome', create_type=False)
+
+
+def upgrade() -> None:
+    op.add_column('tenants', sa.Column('reminder_offsets_hours', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('services', sa.Column('reminder_offsets_hours', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+    reminder_outcome.create(op.get_bind(), checkfirst=True)
+    op.create_table(
+        'appointment_reminders',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('appointment_id', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', sa.Integer(), nullable=False),
+        sa.Column('offset_hours', sa.Integer(), nullable=False),
+        sa.Column('due_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('outcome', reminder_outcome, nullable=True),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('appointment_id', 'offset_hours', name='uq_appointment_reminders_appointment_offset'),
+    )
+    op.create_index(op.f('ix_appointment_reminders_id'), 'appointment_reminders', ['id'], unique=False)
+    op.create_index(op.f('ix_appointment_reminders_tenant_id'), 'appointment_reminders', ['tenant_id'], unique=False)
+    op.create_index('ix_appointment_reminders_tenant_sent_at', 'appointment_reminders', ['tenant_id', 'sent_at'], unique=False)
+
+    # Carry over the single-interval schedule
+    op.execute("""
+        INSERT INTO appointment_reminders (appointment_id, tenant_id, offset_hours, due_at, sent_at, outcome)
+        SELECT a.id, a.tenant_id, t.reminder_interval_hours, a.reminder_due_at, a.reminder_sent_at,
+               CASE WHEN a.reminder_sent_at IS NOT NULL THEN 'sent'::reminder_outcome END
+        FROM appointments a
+        JOIN tenants t ON t.id = a.tenant_id
+        WHERE a.reminder_due_at IS NOT NULL AND t.reminder_interval_hours > 0
+    """)
+
+    op.create_index(
+        'ix_appointment_reminders_due_unsent', 'appointment_reminders', ['due_at'], unique=False,
+        postgresql_where=sa.text("sent_at IS NULL")
+    )
+
+    op.drop_index('ix_appointments_reminder_due_unsent', table_name='appointments')
+    op.drop_column('appointments', 'reminder_sent_at')
+    op.drop_column('appointments', 'reminder_due_at')
+
+
+def downgrade() -> None:
+    op.add_column('appointments', sa.Column('reminder_due_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('appointments', sa.Column('reminder_sent_at', sa.DateTime(timezone=True), nullable=True))
+    # Only the earliest reminder of each appointment survives a downgrade
+    op.execute("""
+        UPDATE appointments a
+        SET reminder_due_at = r.due_at, reminder_sent_at = r.sent_at
+        FROM (
+            SELECT DISTINCT ON (appointment_id) appointment_id, due_at, sent_at
+            FROM appointment_reminders
+            ORDER BY appointment_id, offset_hours DESC
+        ) r
+        WHERE r.appointment_id = a.id
+    """)
+    op.create_index(
+        'ix_appointments_reminder_due_unsent', 'appointments', ['reminder_due_at'], unique=False,
+        postgresql_where=sa.text("reminder_sent_at IS NULL AND reminder_due_at IS NOT NULL")
+    )
+
+    op.drop_index('ix_appointment_reminders_due_unsent', table_name='appointment_reminders')
+    op.drop_index('ix_appointment_reminders_tenant_sent_at', table_name='appointment_reminders')
+    op.drop_index(op.f('ix_appointment_reminders_tenant_id'), table_name='appointment_reminders')
+    op.drop_index(op.f('ix_appointment_reminders_id'), table_name='appointment_reminders')
+    op.drop_table('appointment_reminders')
+    reminder_outcome.drop(op.get_bind(), checkfirst=True)
+    op.drop_column('services', 'reminder_offsets_hours')
+    op.drop_column('tenants', 'reminder_offsets_hours')
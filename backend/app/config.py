@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -10,6 +11,17 @@ class Settings(BaseSettings):
     # JWT Settings
     access_token_expire_minutes: int = 60 * 24 * 7  # Default to 7 days, can be overridden in .env
     cookie_domain: str = "localhost"  # Default for dev, GET FROM ENV
+    # Password hashing (app/services/password_hashing.py); changing the rounds rehashes passwords at next login
+    password_bcrypt_rounds: int = 12
+    password_hash_workers: int = 2 # bcrypt worker processes per API process
+    password_hash_max_pending: int = 8 # Hash/verify calls queued or running per API process before answering 429
+    password_hash_timeout_seconds: int = 10
+    # Failed-login throttling (app/services/login_throttle.py, Redis sliding windows); a limit of 0 disables it
+    login_throttle_window_seconds: int = 900 # Failures older than this no longer count
+    login_throttle_max_failures_per_email: int = 5
+    login_throttle_max_failures_per_ip: int = 20
+    login_throttle_lockout_seconds: int = 900 # How long a locked email/IP is refused (0 disables throttling)
+    login_throttle_trust_forwarded_for: bool = False # Use X-Forwarded-For as client IP for login throttling and slot hold caps (only behind a trusted proxy)
     # Email Settings
     mail_server: str
     mail_port: int = 587
@@ -18,11 +30,48 @@ class Settings(BaseSettings):
     mail_from_address: str
     mail_from_name: str = "Pamplia" # Default name
     mail_use_ssl: bool = False
+    # Transport behind send_email (app/services/email_transport.py): "smtp", or "maildir"/"memory" for load tests
+    mail_transport: str = "smtp"
+    mail_maildir_path: str = "/tmp/pamplia-maildir"
+    mail_transport_latency_ms: int = 0 # Artificial send time for maildir/memory
+    mail_transport_failure_rate: float = 0.0 # Share of maildir/memory sends rejected (logged as FAILED)
+    smtp_pool_size: int = 10 # Logged-in SMTP connections kept per process (app/services/smtp_pool.py)
+    smtp_pool_max_messages: int = 100 # Messages per connection before it is closed and replaced
+    smtp_pool_idle_seconds: int = 60 # Idle connections older than this are closed instead of reused
+    template_lookup_ttl_seconds: int = 60 # How long a tenant's template lookup (or 'no custom template') is cached; 0 disables
 
     # Celery Settings
     celery_broker_url: str 
     celery_result_backend: str
     timezone: str = "UTC"  # Default timezone
+
+    # Redis (shared with Celery in docker-compose). Falls back to the broker URL when unset.
+    redis_url: Optional[str] = None
+    availability_cache_ttl_seconds: int = 300 # 0 disables the /availability cache
+    slot_hold_ttl_seconds: int = 300 # How long a visitor's slot hold lasts during checkout
+    slot_hold_max_per_ip: int = 2 # Active holds per client IP and tenant; a new one releases the oldest (0 disables)
+    slot_hold_max_per_tenant: int = 50 # Active holds per tenant; beyond it POST /availability/holds answers 429 (0 disables)
+    principal_cache_ttl_seconds: int = 300 # Redis tier of the get_current_user cache (app/services/principal_cache.py); 0 disables
+    principal_cache_local_ttl_seconds: int = 10 # In-process tier; bounds how long other processes see a stale user/tenant; 0 disables
+    tenant_cache_ttl_seconds: int = 300 # Redis tier of the public subdomain -> tenant cache (app/services/tenant_cache.py); 0 disables
+    tenant_cache_local_ttl_seconds: int = 30 # In-process tier; bounds how long other processes see a stale tenant; 0 disables
+
+    # Notification outbox dispatcher (app/tasks/outbox_tasks.py)
+    outbox_batch_size: int = 50 # Rows claimed per dispatcher run
+    outbox_send_concurrency: int = 10 # Emails in flight at once per dispatcher run
+    outbox_max_attempts: int = 6 # After this many failed sends the row is marked failed
+    outbox_lease_seconds: int = 300 # A 'sending' row older than this (crashed worker) is claimed again
+
+    # Email send rate limits (app/services/rate_limiter.py, Redis token buckets); a rate of 0 disables that bucket
+    email_rate_global_per_second: float = 10.0 # Shared SMTP quota across all workers
+    email_rate_global_burst: int = 20
+    email_rate_tenant_per_minute: float = 120.0 # Per tenant
+    email_rate_tenant_burst: int = 30
+    email_rate_bulk_reserve: float = 0.25 # Share of each bucket bulk mail (reminders) may not use
+
+    # Appointment reminders (app/tasks/appointment_tasks.py)
+    reminder_send_concurrency: int = 10 # Reminder emails in flight at once per chunk task
+    reminder_claim_seconds: int = 300 # A reminder queued by a scan is not queued again before this (unless sent)
     
     #frontend URL
     frontend_url: str = "localtestt.me:3000" # Default for dev, GET FROM ENV
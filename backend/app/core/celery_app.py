@@ -24,6 +24,8 @@ celery_app = Celery(
     backend=RESULT_BACKEND,
     include=[
         'app.tasks.appointment_tasks', # Tell Celery where to find tasks
+        'app.tasks.outbox_tasks',
+        'app.tasks.digest_tasks',
         # Add other task modules here later if needed
         ]
 )
@@ -38,13 +40,25 @@ celery_app.conf.update(
     # Define task queues (optional but good practice for routing)
     task_default_queue='default',
     task_queues=(
+       Queue('notifications', routing_key='notifications.#'), # Transactional: outbox dispatcher, kept off the request path
        Queue('default', routing_key='task.#'),
-       Queue('reminders', routing_key='reminders.#'), # Example queue for reminders
+       Queue('reminders', routing_key='reminders.#'), # Bulk: reminder scan and chunks
        # Add other queues as needed
     ),
     task_default_exchange='tasks',
     task_default_exchange_type='topic',
     task_default_routing_key='task.default',
+    task_routes={
+        'app.tasks.outbox_tasks.*': {'queue': 'notifications', 'routing_key': 'notifications.dispatch'},
+        'app.tasks.appointment_tasks.*': {'queue': 'reminders', 'routing_key': 'reminders.send'},
+    },
+    # Priority: transactional mail (outbox: confirmations, invitations) before bulk reminders.
+    # With queue_order_strategy='priority' a worker drains queues in its -Q order, so run
+    #   celery -A app.core.celery_app worker -Q notifications,default,reminders
+    # and a reminder burst never delays a booking confirmation queued behind it.
+    # Prefetch 1 keeps a worker from holding a backlog of bulk tasks while transactional ones wait.
+    broker_transport_options={'queue_order_strategy': 'priority'},
+    worker_prefetch_multiplier=1,
 )
 
 
@@ -52,16 +66,28 @@ celery_app.conf.update(
 # Define tasks that should run automatically on a schedule.
 celery_app.conf.beat_schedule = {
     # Schedule Name: descriptive identifier
-    'send-appointment-reminders-every-15-minutes': {
+    'send-appointment-reminders-every-minute': {
         # Task Name: 'path.to.module.task_function_name'
         'task': 'app.tasks.appointment_tasks.send_appointment_reminders',
-        # Schedule: Run every 15 minutes
-        'schedule': crontab(minute='*/15'),
+        # Schedule: Run every minute (each run only reads due rows from the reminder_due_at index)
+        'schedule': crontab(minute='*'),
         # Optional arguments to pass to the task function (if any)
         # 'args': (16, 16),
         # Optional: Specify queue for this periodic task
         'options': {'queue' : 'reminders', 'routing_key': 'reminders.send'},
     },
+    # Safety net for the notification outbox: kicks after commits usually deliver sooner
+    'dispatch-notification-outbox-every-minute': {
+        'task': 'app.tasks.outbox_tasks.dispatch_outbox',
+        'schedule': crontab(minute='*'),
+        'options': {'queue': 'notifications', 'routing_key': 'notifications.dispatch'},
+    },
+    # Admin booking digests (tenants with admin_digest_interval_minutes set; windows are >= 15 minutes)
+    'send-admin-booking-digests-every-5-minutes': {
+        'task': 'app.tasks.digest_tasks.send_admin_digests',
+        'schedule': crontab(minute='*/5'),
+        'options': {'queue': 'default', 'routing_key': 'task.digest'},
+    },
     # Add more scheduled tasks here if needed
 }
 
@@ -0,0 +1,47 @@
+# app/core/metrics.py
+# --- NEW FILE ---
+#
+# Minimal counters for operational visibility (cache hit rates, job results...).
+# Counters are aggregated in a Redis hash so every API/worker process reports
+# into the same place; a per-process copy is kept as a fallback when Redis is down.
+
+from collections import Counter
+from threading import Lock
+from typing import Dict
+import logging
+
+import redis
+
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+METRICS_REDIS_KEY = "metrics:counters"
+
+_local_counters: Counter = Counter()
+_local_lock = Lock()
+
+
+def incr(name: str, amount: int = 1) -> None:
+    """Increments a named counter (e.g. 'availability_cache.hit'). Never raises."""
+    with _local_lock:
+        _local_counters[name] += amount
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.hincrby(METRICS_REDIS_KEY, name, amount)
+    except redis.RedisError as e:
+        logger.debug(f"Could not record metric '{name}' in Redis: {e}")
+
+
+def snapshot() -> Dict[str, int]:
+    """Returns all counters (cluster-wide from Redis when available, else this process only)."""
+    client = get_redis()
+    if client is not None:
+        try:
+            return {name: int(value) for name, value in client.hgetall(METRICS_REDIS_KEY).items()}
+        except redis.RedisError as e:
+            logger.warning(f"Could not read metrics from Redis, returning local counters: {e}")
+    with _local_lock:
+        return dict(_local_counters)
@@ -0,0 +1,43 @@
+# app/core/redis_client.py
+# --- NEW FILE ---
+
+from typing import Optional
+import logging
+
+import redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[redis.Redis] = None
+
+
+def _resolve_redis_url() -> Optional[str]:
+    """REDIS_URL if set, otherwise the Celery broker URL when it points at Redis."""
+    if settings.redis_url:
+        return settings.redis_url
+    if settings.celery_broker_url and settings.celery_broker_url.startswith(("redis://", "rediss://")):
+        return settings.celery_broker_url
+    return None
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """
+    Returns a shared Redis client (connection-pooled, one per process), or None
+    if Redis is not configured. Callers must treat Redis as optional and fail
+    open on redis.RedisError: caches and counters are never required for correctness.
+    """
+    global _client
+    if _client is None:
+        url = _resolve_redis_url()
+        if not url:
+            return None
+        _client = redis.Redis.from_url(
+            url,
+            decode_responses=True,
+            socket_timeout=0.5, # Keep request latency bounded if Redis is slow
+            socket_connect_timeout=0.5,
+        )
+        logger.info("Redis client initialised.")
+    return _client
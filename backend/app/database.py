@@ -1,6 +1,8 @@
 # app/database.py
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings  # Ensure you have a config file with DB URL
@@ -14,6 +16,14 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 # Create a session local class to handle sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine (asyncpg) for `async def` routes, so their queries do not block the event loop.
+# Same database and models; sync routes and Celery tasks keep using SessionLocal.
+ASYNC_SQLALCHEMY_DATABASE_URL = make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql+asyncpg")
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+
+# expire_on_commit=False: attributes stay readable after commit (no implicit async refresh)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 # Base class for models to inherit from
 Base = declarative_base()
 
@@ -24,3 +34,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async database session (async def routes only)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,14 +1,18 @@
 # app/dependencies.py
+from typing import Optional
 from fastapi import HTTPException, Depends, Request, status # Add Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import func # Keep for now, might remove later if unused elsewhere
 from app.utils.jwt_utils import verify_token
-from app.models.user import User
-from app.database import get_db
+from app.database import get_db, get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from jose import JWTError
 from app.config import settings
 from app.models.tenant import Tenant as TenantModel
+from app.services import principal_cache, tenant_cache
+from app.services.principal_cache import Principal
+from app.services.tenant_cache import TenantSnapshot
+from app.services.password_hashing import PasswordHashingBusy
 
 # Define the cookie name (make this consistent)
 AUTH_COOKIE_NAME = settings.auth_cookie_name
@@ -20,11 +24,34 @@ credentials_exception = HTTPException(
     # No need for WWW-Authenticate header for cookie auth usually
 )
 
+def password_hashing_busy_exception(exc: PasswordHashingBusy) -> HTTPException:
+    """429 for endpoints that hash or verify passwords while the bcrypt pool is saturated."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, please try again in a moment.",
+        headers={"Retry-After": str(exc.retry_after_seconds)},
+    )
+
+def get_client_ip(request: Request) -> Optional[str]:
+    """Client address for login throttling and slot hold caps (first X-Forwarded-For hop only if the proxy is trusted)."""
+    if settings.login_throttle_trust_forwarded_for:
+        forwarded_for = request.headers.get("X-Forwarded-For")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else None
+
 # Keep oauth2_scheme if other parts of your app might use it, otherwise remove
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 # Modified function to get user from cookie
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> Principal:
+    """
+    Resolves the auth cookie to a Principal (app/services/principal_cache.py): a cached
+    snapshot with id, email, name, tenant_id, role and active flags, NOT the ORM User.
+    Load the User / Tenant by id where a handler really needs the ORM object.
+    Deactivated users get 401; users of a suspended tenant get 403 (super admins excepted),
+    as at login.
+    """
     token = request.cookies.get(AUTH_COOKIE_NAME)
 
     if token is None:
@@ -42,37 +69,70 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == user_email).first()
-    if user is None:
+    principal = principal_cache.get_principal(db, user_email)
+    if principal is None or not principal.is_active:
         raise credentials_exception
 
-    return user
+    if not principal.tenant_is_active and principal.role != "super_admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Tenant is inactive.")
+
+    return principal
 
 # This dependency remains unchanged as it depends on the resolved get_current_user
-def get_current_tenant_id(user: User = Depends(get_current_user)):
+def get_current_tenant_id(user: Principal = Depends(get_current_user)):
     return user.tenant_id
 
 
 
-def resolve_tenant_by_subdomain(subdomain: str, db: Session) -> TenantModel:
-    """
-    Resolves a Tenant object by subdomain name (passed as a query parameter).
-    Raises HTTPException if tenant not found or inactive.
-    Used by public endpoints where tenant context comes from the frontend.
-    """
+def _clean_subdomain(subdomain: str) -> str:
     if not subdomain:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Subdomain parameter is required.")
 
     subdomain_clean = subdomain.strip().lower()
     if not subdomain_clean or '.' in subdomain_clean:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid subdomain format.")
+    return subdomain_clean
+
+
+def _require_active_tenant(tenant: Optional[TenantSnapshot]) -> TenantSnapshot:
+    if not tenant:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tenant portal not found.")
+
+    if not tenant.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Tenant portal is inactive.")
+
+    return tenant
+
 
-    tenant = db.query(TenantModel).filter(func.lower(TenantModel.subdomain) == subdomain_clean).first()
+def resolve_tenant_snapshot(subdomain: str, db: Session) -> TenantSnapshot:
+    """
+    Resolves a TenantSnapshot (id, name, subdomain, timezone, hours config, is_active)
+    by subdomain name (passed as a query parameter), through app/services/tenant_cache.py.
+    Raises HTTPException if tenant not found or inactive.
+    Used by public endpoints where tenant context comes from the frontend.
+    """
+    return _require_active_tenant(tenant_cache.get_tenant_snapshot(db, _clean_subdomain(subdomain)))
+
+
+async def resolve_tenant_snapshot_async(subdomain: str, db: AsyncSession) -> TenantSnapshot:
+    """resolve_tenant_snapshot for async routes (AsyncSession from get_async_db)."""
+    return _require_active_tenant(await tenant_cache.get_tenant_snapshot_async(db, _clean_subdomain(subdomain)))
+
+
+def resolve_tenant_by_subdomain(subdomain: str, db: Session) -> TenantModel:
+    """
+    Same as resolve_tenant_snapshot, but returns the ORM Tenant (loaded by primary key)
+    for endpoints that write with it, e.g. booking. The active flag is re-checked on the row.
+    """
+    snapshot = resolve_tenant_snapshot(subdomain, db)
+    tenant = db.get(TenantModel, snapshot.id)
 
     if not tenant:
+        tenant_cache.invalidate_subdomain(snapshot.subdomain)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tenant portal not found.")
 
     if not tenant.is_active:
+        tenant_cache.invalidate_subdomain(tenant.subdomain)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Tenant portal is inactive.")
 
     return tenant
@@ -80,16 +140,16 @@ def resolve_tenant_by_subdomain(subdomain: str, db: Session) -> TenantModel:
 
 async def get_tenant_from_request_subdomain(
     request: Request, 
-    db: Session = Depends(get_db)
-) -> TenantModel:
+    db: AsyncSession = Depends(get_async_db)
+) -> TenantSnapshot:
     """
-    Resolves a Tenant from a 'subdomain' query parameter.
+    Resolves a TenantSnapshot from a 'subdomain' query parameter.
     Falls back to Host header parsing for backward compatibility.
     """
     # Prefer explicit subdomain query parameter
     subdomain_param = request.query_params.get("subdomain")
     if subdomain_param:
-        return resolve_tenant_by_subdomain(subdomain_param, db)
+        return await resolve_tenant_snapshot_async(subdomain_param, db)
 
     # Fallback: parse Host header (for direct subdomain access)
     host_header = request.headers.get("Host", "")
@@ -113,4 +173,4 @@ async def get_tenant_from_request_subdomain(
         )
 
     subdomain_name = normalized_hostname.replace(f".{base_domain_config}", "")
-    return resolve_tenant_by_subdomain(subdomain_name, db)
+    return await resolve_tenant_snapshot_async(subdomain_name, db)
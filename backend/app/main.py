@@ -8,9 +8,9 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware # Optional for
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.responses import Response as StarletteResponse # For middleware typing
 
-from app.routers import tenants, appointments, services, auth, users, tags, clients, dashboard, templates, communications, staff, availability
+from app.routers import tenants, appointments, services, auth, users, tags, clients, dashboard, templates, communications, staff, availability, ops
 from app.database import Base, engine, get_db # Import get_db
-from app.models import tenant, user, service, appointment, finance # Import models
+from app.models import tenant, user, service, appointment, appointment_reminder, finance, outbox # Import models
 from sqlalchemy.orm import Session
 
 # Import dependencies and utils needed for middleware
@@ -152,6 +152,7 @@ app.include_router(templates)
 app.include_router(communications)
 app.include_router(staff)
 app.include_router(availability)  # Ensure availability router is included
+app.include_router(ops)
 
 @app.get("/")
 def root():
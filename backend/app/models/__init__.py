@@ -1,6 +1,7 @@
 # app/models/__init__.py
 from .tenant import Tenant
 from .appointment import Appointment
+from .appointment_reminder import AppointmentReminder
 from .service import Service
 from .user import User
 from .client import Client
@@ -8,5 +9,6 @@ from .tag import Tag
 from .communications_log import CommunicationsLog
 from .template import Template
 from .invitation import Invitation
+from .outbox import OutboxMessage
 from .consent import ConsentForm, ClientSignature
 from .finance import StaffCommission, Membership, ClientSubscription, TenantPaymentRecord
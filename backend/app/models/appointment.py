@@ -3,10 +3,11 @@
 
 from sqlalchemy import (
     Column, Integer, String, DateTime, ForeignKey,
-    Enum as SQLAlchemyEnum, Index # Added Index
+    Enum as SQLAlchemyEnum, Index, # Added Index
+    Computed, DDL, event
 )
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import ENUM as PG_ENUM
+from sqlalchemy.dialects.postgresql import ENUM as PG_ENUM, TSTZRANGE
 from sqlalchemy.sql import func # For func.now() if needed elsewhere
 
 from app.database import Base
@@ -22,6 +23,12 @@ class Appointment(Base):
     id = Column(Integer, primary_key=True, index=True)
     appointment_time = Column(DateTime(timezone=True), nullable=False, index=True) # Consider timezone=True
     end_datetime_utc = Column(DateTime(timezone=True), nullable=True, index=True)
+    # [start, end) maintained by Postgres from the two columns above (rows without an end are an empty range).
+    # Overlap lookups use `time_range && tstzrange(:start, :end)` against the GiST index below.
+    time_range = Column(
+        TSTZRANGE,
+        Computed("tstzrange(appointment_time, COALESCE(end_datetime_utc, appointment_time), '[)')", persisted=True),
+    )
     tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True)
 
     # --- Client Relationship ---
@@ -52,7 +59,36 @@ class Appointment(Base):
         back_populates="appointments"
     )
 
+    # When the booking was made / cancelled (admin booking digest windows, app.services.admin_digest)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    cancelled_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Reminder schedule, one row per offset (app.services.reminder_schedule)
+    reminders = relationship(
+        "AppointmentReminder",
+        back_populates="appointment",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
     # --- Indexes ---
+    __table_args__ = (
+        # btree_gist provides the GiST operator class for the integer tenant_id
+        Index("ix_appointments_tenant_time_range", "tenant_id", "time_range", postgresql_using="gist"),
+        Index("ix_appointments_tenant_created_at", "tenant_id", "created_at"),
+        Index(
+            "ix_appointments_tenant_cancelled_at", "tenant_id", "cancelled_at",
+            postgresql_where=cancelled_at.isnot(None)
+        ),
+    )
 
     def __repr__(self):
         return f"<Appointment(id={self.id}, client_id={self.client_id}, tenant_id={self.tenant_id}, time='{self.appointment_time}', status='{self.status.value}')>"
+
+
+# create_all() (used in main.py) needs the extension before the GiST index can be built
+event.listen(
+    Appointment.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
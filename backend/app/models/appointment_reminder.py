@@ -0,0 +1,46 @@
+# app/models/appointment_reminder.py
+# --- NEW FILE ---
+#
+# One row per (appointment, reminder offset). Maintained by app.services.reminder_schedule;
+# the reminder scheduler reads unsent rows with `due_at <= now()` from the partial index.
+
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, UniqueConstraint, text
+from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import ENUM as PG_ENUM
+from enum import Enum as PyEnum
+
+from app.database import Base
+
+
+class ReminderOutcome(PyEnum):
+    SENT = "sent"
+    FAILED = "failed"   # Logged as FAILED; re-sent via /tenants/{id}/reminders/retry-failed
+    SKIPPED = "skipped" # Nothing to send (no client email, no template...)
+
+
+class AppointmentReminder(Base):
+    __tablename__ = "appointment_reminders"
+
+    id = Column(Integer, primary_key=True, index=True)
+    appointment_id = Column(Integer, ForeignKey("appointments.id", ondelete="CASCADE"), nullable=False)
+    tenant_id = Column(Integer, ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False, index=True)
+    offset_hours = Column(Integer, nullable=False) # Hours before the appointment
+    due_at = Column(DateTime(timezone=True), nullable=False) # appointment_time - offset_hours
+    sent_at = Column(DateTime(timezone=True), nullable=True) # Set once processed, whatever the outcome
+    claimed_until = Column(DateTime(timezone=True), nullable=True) # Queued for sending; scans skip the row until then
+    outcome = Column(
+        PG_ENUM(ReminderOutcome, name='reminder_outcome', create_type=True, values_callable=lambda obj: [e.value for e in obj]),
+        nullable=True
+    )
+
+    appointment = relationship("Appointment", back_populates="reminders")
+
+    __table_args__ = (
+        # Dedupe key: each offset is sent at most once per appointment (time)
+        UniqueConstraint("appointment_id", "offset_hours", name="uq_appointment_reminders_appointment_offset"),
+        Index("ix_appointment_reminders_due_unsent", "due_at", postgresql_where=text("sent_at IS NULL")),
+        Index("ix_appointment_reminders_tenant_sent_at", "tenant_id", "sent_at"), # Health report per offset
+    )
+
+    def __repr__(self):
+        return f"<AppointmentReminder(appointment_id={self.appointment_id}, offset_hours={self.offset_hours}, due_at='{self.due_at}', sent_at='{self.sent_at}')>"
@@ -0,0 +1,64 @@
+# app/models/outbox.py
+# --- NEW FILE ---
+#
+# Transactional outbox for outbound notifications. Rows are added in the same
+# transaction as the business change (booking, invitation) and delivered later
+# by the dispatcher in app/tasks/outbox_tasks.py.
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, func, text
+from sqlalchemy.dialects.postgresql import ENUM as PG_ENUM, JSONB
+from enum import Enum as PyEnum
+
+from app.database import Base
+
+
+class OutboxKind(PyEnum):
+    APPOINTMENT_NOTIFICATION = "appointment_notification" # Rendered from templates at send time (event_trigger)
+    EMAIL = "email"                                       # Pre-rendered email in payload (e.g. staff invitations)
+
+
+class OutboxStatus(PyEnum):
+    PENDING = "pending"   # Waiting for (another) delivery attempt
+    SENDING = "sending"   # Claimed by a dispatcher run (locked_by) since locked_at
+    SENT = "sent"
+    FAILED = "failed"     # Gave up after settings.outbox_max_attempts
+    SKIPPED = "skipped"   # Nothing to send (no recipient, appointment gone...)
+
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(
+        PG_ENUM(OutboxKind, name='outbox_kind', create_type=True, values_callable=lambda obj: [e.value for e in obj]),
+        nullable=False
+    )
+    # APPOINTMENT_NOTIFICATION: which appointment and template trigger
+    appointment_id = Column(Integer, ForeignKey("appointments.id", ondelete="CASCADE"), nullable=True, index=True)
+    event_trigger = Column(String, nullable=True) # TemplateEventTrigger value
+    # EMAIL: to_email, subject, html_body, plus optional log fields (user_id, log_type)
+    payload = Column(JSONB, nullable=True)
+
+    status = Column(
+        PG_ENUM(OutboxStatus, name='outbox_status', create_type=True, values_callable=lambda obj: [e.value for e in obj]),
+        nullable=False, default=OutboxStatus.PENDING, server_default=OutboxStatus.PENDING.value
+    )
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now()) # Earliest next attempt (backoff)
+    locked_by = Column(String, nullable=True)  # Dispatcher run that claimed the row
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Only undelivered rows are ever scanned by the dispatcher
+        Index(
+            'ix_outbox_pending_available_at', 'available_at',
+            postgresql_where=text("status IN ('pending', 'sending')")
+        ),
+    )
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, kind='{self.kind.value if self.kind else None}', status='{self.status.value if self.status else None}')>"
@@ -1,6 +1,7 @@
 # app/models/service.py
 from sqlalchemy import Column, Integer, String, ForeignKey, Numeric
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB
 from app.database import Base
 from .association_tables import appointment_services_table
 
@@ -13,6 +14,8 @@ class Service(Base):
     duration_minutes = Column(Integer, nullable=False)
     tenant_id = Column(Integer, ForeignKey("tenants.id"))
     price = Column(Numeric(precision=10, scale=2), nullable=False)
+    # Optional per-service reminder offsets (hours); overrides the tenant's for appointments including it
+    reminder_offsets_hours = Column(JSONB(none_as_null=True), nullable=True)
     tenant = relationship("Tenant", back_populates="services")
     appointments = relationship(
          "Appointment",
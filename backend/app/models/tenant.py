@@ -1,7 +1,7 @@
 # app/models/tenant.py
 # --- MODIFIED ---
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Index, func
 from sqlalchemy.dialects.postgresql import JSONB # Use JSONB for PostgreSQL JSON
 # If not using PostgreSQL, use: from sqlalchemy.types import JSON
 from sqlalchemy.orm import relationship
@@ -46,11 +46,18 @@ class Tenant(Base):
 
     # --- Config Fields (for later use) ---
     business_hours_config = Column(JSONB, nullable=True) # Added (Using JSONB for Postgres efficiency)
+    # schedule_version() of business_hours_config + timezone, set on write (app.services.business_hours)
+    business_hours_version = Column(String(40), nullable=True)
     booking_widget_config = Column(JSONB, nullable=True) # Added (Using JSONB for Postgres efficiency)
     reminder_interval_hours = Column(
         Integer, nullable=True, server_default='24', default=24,
         comment="Hours before appointment to send reminder (null=disabled)"
     )
+    # Several reminders, e.g. [48, 2]. When set it replaces reminder_interval_hours.
+    reminder_offsets_hours = Column(JSONB(none_as_null=True), nullable=True)
+    # Admin booking notifications: null = one email per booking, else one digest every N minutes
+    admin_digest_interval_minutes = Column(Integer, nullable=True)
+    admin_digest_last_sent_at = Column(DateTime(timezone=True), nullable=True) # End of the last digest window
 
     # --- Commercial / Billing ---
     billing_plan = Column(String, nullable=False, default='starter', server_default='starter')
@@ -70,6 +77,11 @@ class Tenant(Base):
     invitations = relationship("Invitation", back_populates="tenant", cascade="all, delete-orphan")
     consent_forms = relationship("ConsentForm", back_populates="tenant", cascade="all, delete-orphan")
     payment_records = relationship("TenantPaymentRecord", back_populates="tenant", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Public endpoints resolve tenants by func.lower(subdomain), which the plain subdomain index cannot serve
+        Index("ix_tenants_subdomain_lower", func.lower(subdomain)),
+    )
     
     def __repr__(self):
          return f"<Tenant(id={self.id}, name='{self.name}', subdomain='{self.subdomain}')>"
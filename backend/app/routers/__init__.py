@@ -10,3 +10,4 @@ from .templates import router as templates
 from  .communications import router as communications
 from .staff import router as staff
 from .availability import router as availability
+from .ops import router as ops
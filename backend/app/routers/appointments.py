@@ -9,12 +9,11 @@ from datetime import datetime as dt, timedelta, timezone
 import logging
 
 from app import database, models, schemas # Ensure schemas is imported
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, Principal
 from app.config import settings
 from app.models.appointment import Appointment as AppointmentModel
 from app.models.service import Service as ServiceModel
 from app.models.tenant import Tenant as TenantModel
-from app.models.user import User
 from app.models.client import Client as ClientModel
 from app.schemas.enums import AppointmentStatus
 
@@ -31,7 +30,14 @@ from app.services.communication_service import create_communication_log # Import
 from app.models.communications_log import CommunicationDirection, CommunicationStatus, CommunicationType, CommunicationChannel # Import enums 
 
 # Notifications logic imports
-from app.services.notification_service import send_appointment_notification # Import the notification service
+from app.services import outbox # Notifications are written in the booking transaction
+from app.tasks.outbox_tasks import kick_dispatcher
+from app.services import availability_cache # Cached /availability results must be dropped on every write
+from app.services.booking_service import reserve_slot, SlotUnavailableError
+from app.services import slot_holds
+from app.services.availability_engine import to_utc
+from app.services import admin_digest # Digest tenants get no per-booking admin email
+from app.services.reminder_schedule import schedule_reminders
 from app.models.template import TemplateEventTrigger # Import the trigger enum
 
 # --- Setup logger ---
@@ -43,7 +49,7 @@ router = APIRouter(
 )
 
 # --- Helper Function for Permission Checks ---
-def check_appointment_permission(current_user: User, appointment: AppointmentModel, action: str = "access"):
+def check_appointment_permission(current_user: Principal, appointment: AppointmentModel, action: str = "access"):
     """Checks if the current user has permission to access/modify an appointment."""
     if current_user.role == "super_admin":
         logger.debug(f"[Permission Check] Super admin ({current_user.email}) granted for {action} on Appt ID {appointment.id}.")
@@ -72,7 +78,7 @@ def notify_deleted_user_active(client_id: int, tenant_id: int):
 
 # --- Create Appointment (Public, Subdomain Aware, Handles Client Logic, Sends Notifications) ---
 @router.post("/", response_model=AppointmentOut, status_code=status.HTTP_201_CREATED)
-async def create_appointment( # <--- Make endpoint async
+def create_appointment( # Sync: no awaits left, so FastAPI runs the blocking DB work in its threadpool
     appointment_data: AppointmentCreate,
     request: Request,
     db: Session = Depends(database.get_db)
@@ -182,12 +188,43 @@ async def create_appointment( # <--- Make endpoint async
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid or unavailable service IDs provided: {list(missing_ids)}")
 
     total_duration = sum(service.duration_minutes for service in services if service.duration_minutes is not None)
-    
+    appointment_end_time = appointment_data.appointment_time + timedelta(minutes=total_duration)
+
+    # 3a. Another visitor's active hold on this slot wins; the caller's own hold (hold_id) does not count.
+    #     That hold must be for this tenant and exactly this slot; an expired one simply no longer matters.
+    hold_id = appointment_data.hold_id
+    if hold_id:
+        try:
+            hold = slot_holds.get_hold(hold_id)
+        except slot_holds.SlotHoldUnavailableError:
+            hold = None # Without Redis no hold is enforced (active_holds fails open too)
+        if hold is not None and (
+            hold.tenant_id != tenant_id_from_subdomain
+            or hold.start_utc != to_utc(appointment_data.appointment_time).replace(microsecond=0)
+            or hold.end_utc != to_utc(appointment_end_time).replace(microsecond=0)
+        ):
+            db.rollback()
+            logger.warning(f"[Create Appointment] Hold {hold_id} does not match the requested slot {appointment_data.appointment_time} (tenant {tenant_id_from_subdomain}).")
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The slot hold does not match the selected time slot or services.")
+    if slot_holds.active_holds(tenant_id_from_subdomain, appointment_data.appointment_time, appointment_end_time, exclude_hold_id=hold_id):
+        db.rollback()
+        logger.info(f"[Create Appointment] Requested slot {appointment_data.appointment_time} is held by another visitor (tenant {tenant_id_from_subdomain}).")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="This time slot is currently being booked by someone else. Please choose another time.")
+
+    # 3b. Reserve the slot: serialize with concurrent bookings of this tenant/day, then re-check overlap.
+    #     The advisory lock lives until the commit below, so two requests for the same slot cannot both pass.
+    try:
+        reserve_slot(db, tenant_id_from_subdomain, appointment_data.appointment_time, appointment_end_time)
+    except SlotUnavailableError:
+        db.rollback()
+        logger.info(f"[Create Appointment] Requested slot {appointment_data.appointment_time} is no longer available for tenant {tenant_id_from_subdomain}.")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The selected time slot is no longer available. Please choose another time.")
+
     # 4. Create Appointment Object
     db_appointment = AppointmentModel(
         client_id=client_id,
         appointment_time=appointment_data.appointment_time, # Ensure timezone info is handled correctly if coming from frontend
-        end_datetime_utc=appointment_data.appointment_time + timedelta(minutes=total_duration) if appointment_data.appointment_time else None,
+        end_datetime_utc=appointment_end_time,
         tenant_id=tenant_id_from_subdomain,
         status=AppointmentStatus.PENDING,
         # Associate related objects directly for easier access later
@@ -195,12 +232,21 @@ async def create_appointment( # <--- Make endpoint async
         tenant=tenant,
     )
     db_appointment.services.extend(services) # Associate services
+    schedule_reminders(db_appointment, tenant)
 
     # 5. Add Appointment to Session
     db.add(db_appointment)
 
-    # 6. Attempt to Commit Main Transaction (Client updates/create + Appointment create)
+    # 6. Attempt to Commit Main Transaction (Client updates/create + Appointment create + outbox rows)
     try:
+        # Booking notifications go into the outbox in the SAME transaction: they exist
+        # if and only if the appointment commits. The outbox dispatcher sends and logs them.
+        # Tenants on admin digests get this booking in the next digest instead of its own email.
+        triggers = [TemplateEventTrigger.APPOINTMENT_BOOKED_CLIENT]
+        if not admin_digest.digest_enabled(tenant):
+            triggers.append(TemplateEventTrigger.APPOINTMENT_BOOKED_ADMIN)
+        for trigger in triggers:
+            outbox.enqueue_appointment_notification(db, db_appointment, trigger)
         db.commit()
         db.refresh(db_appointment)
         # Refresh relationships needed for notification context and response
@@ -210,6 +256,9 @@ async def create_appointment( # <--- Make endpoint async
         db.refresh(db_appointment, attribute_names=['services'])
 
         logger.info(f"[Create Appointment] Successfully committed Appt ID: {db_appointment.id} for Client ID: {client_id}")
+        availability_cache.invalidate_for_times(tenant, db_appointment.appointment_time, db_appointment.end_datetime_utc)
+        if hold_id:
+            slot_holds.release_hold(tenant_id_from_subdomain, hold_id) # Hold consumed by the booking
 
     except SQLAlchemyExceptions.IntegrityError as e:
         db.rollback()
@@ -220,50 +269,8 @@ async def create_appointment( # <--- Make endpoint async
         logger.error(f"[Create Appointment] Unknown Database Error saving appointment: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not create appointment.")
 
-    # --- 7. Send Notifications (AFTER successful commit of appointment) ---
-    notification_error = None
-    try:
-        # Send notification to the client
-        logger.info(f"Attempting to send client booking notification for Appt ID {db_appointment.id}...")
-        await send_appointment_notification( # <--- Use await
-            db=db,
-            appointment=db_appointment, # Pass the committed & refreshed appointment object
-            event_trigger=TemplateEventTrigger.APPOINTMENT_BOOKED_CLIENT
-        )
-
-        # Send notification to the admin/tenant contact
-        logger.info(f"Attempting to send admin booking notification for Appt ID {db_appointment.id}...")
-        await send_appointment_notification( # <--- Use await
-            db=db,
-            appointment=db_appointment,
-            event_trigger=TemplateEventTrigger.APPOINTMENT_BOOKED_ADMIN
-            # recipient_override=tenant.contact_email (handled inside service)
-        )
-
-        # --- 8. Commit Communication Logs ---
-        # The notification service adds logs to session, commit them now.
-        try:
-            db.commit()
-            logger.info(f"[Create Appointment] Communication logs committed for Appt ID: {db_appointment.id}")
-        except Exception as log_commit_e:
-             db.rollback() # Rollback log commit only
-             # Log this error but don't fail the main appointment creation return
-             logger.error(f"[Create Appointment] Failed to commit communication logs: {log_commit_e}", exc_info=True)
-             notification_error = "Failed to record notification status." # Store error message
-
-    except Exception as notify_e:
-        db.rollback() # Rollback potential log additions from failed notification calls
-        # Log the notification error, but the appointment IS created.
-        # Decide how critical notification failure is. Maybe return success but log error?
-        logger.error(f"[Create Appointment] Failed to send notifications for Appt ID {db_appointment.id}: {notify_e}", exc_info=True)
-        notification_error = "Appointment created, but failed to send notifications." # Store error message
-
-    # --- 9. Return Response ---
-    # Even if notifications failed, the appointment itself was created successfully.
-    # We might want to add the notification_error to the response later if needed.
-    if notification_error:
-        logger.warning(f"[Create Appointment] Returning success for Appt ID {db_appointment.id} despite notification error: {notification_error}")
-        # Optionally add warning to response headers or a non-standard field if schema allows?
+    # --- 7. Nudge the outbox dispatcher (beat picks the rows up anyway if this fails) ---
+    kick_dispatcher()
 
     return db_appointment # Return the created appointment details
 
@@ -271,7 +278,7 @@ async def create_appointment( # <--- Make endpoint async
 @router.get("/paginated", response_model=PaginatedAppointmentResponse)
 def get_paginated_appointments( # Renamed function for clarity
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     page: int = Query(1, ge=1, description="Page number (1-based)"),
     limit: int = Query(10, ge=1, le=100, description="Items per page"),
     client_id: Optional[int] = Query(None, description="Filter appointments by specific client ID"),
@@ -337,7 +344,7 @@ def get_paginated_appointments( # Renamed function for clarity
 @router.get("/", response_model=List[AppointmentOut])
 def get_appointments_list_simple( # Renamed to avoid conflict if keeping both
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     logger.info(f"[Get Simple Appointments List] User: {current_user.email}")
     query = db.query(AppointmentModel).options(
@@ -358,7 +365,7 @@ def get_appointments_list_simple( # Renamed to avoid conflict if keeping both
 def get_appointment_by_id(
     appointment_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     logger.info(f"User '{current_user.email}' requesting Appt ID: {appointment_id}")
     query = db.query(AppointmentModel).filter(AppointmentModel.id == appointment_id)
@@ -382,7 +389,7 @@ def update_appointment(
     appointment_id: int,
     update_data: AppointmentUpdate, # Use updated schema
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user) # Assuming User model is imported
+    current_user: Principal = Depends(get_current_user) # Assuming User model is imported
 ):
     """
     Updates an existing appointment. Allows updating status, time, etc.
@@ -415,6 +422,9 @@ def update_appointment(
 
     # 4. Apply Updates and Track Changes
     original_status = appointment.status # Store status *before* potential update
+    original_time = appointment.appointment_time # Needed to invalidate the old day's cached availability
+    original_end_time = appointment.end_datetime_utc
+    time_changed = False
     update_occurred = False
     status_changed = False # Flag to track if status specifically changed
     new_status_value = None # Store the new status if changed
@@ -429,6 +439,8 @@ def update_appointment(
                     update_occurred = True
                     status_changed = True # Mark status as changed
                     new_status_value = value # Store the new status enum value
+                    # Cancellations are reported by cancellation time in admin digests
+                    appointment.cancelled_at = dt.now(timezone.utc) if value == AppointmentStatus.CANCELLED else None
                     logger.debug(f"[Update Appt ID: {appointment_id}] Status changed to {value.value}")
                 else:
                      # This case should ideally be caught by Pydantic validation
@@ -439,7 +451,12 @@ def update_appointment(
             elif field == 'appointment_time' and value is not None:
                 # Add validation if needed (e.g., time not in past, within business hours?)
                 setattr(appointment, field, value)
+                # Keep the end (and therefore the generated time_range) in step with the new start
+                total_duration = sum(service.duration_minutes for service in appointment.services if service.duration_minutes is not None)
+                appointment.end_datetime_utc = value + timedelta(minutes=total_duration)
+                schedule_reminders(appointment, appointment.tenant) # New time, new reminders
                 update_occurred = True
+                time_changed = True
                 logger.debug(f"[Update Appt ID: {appointment_id}] Appointment time updated.")
 
             # Add elif blocks here for other fields you allow updating via AppointmentUpdate schema
@@ -473,6 +490,17 @@ def update_appointment(
     # if hasattr(appointment, 'updated_at'):
     #    appointment.updated_at = dt.now(timezone.utc)
 
+    # Moving (or re-activating a cancelled/finished) appointment must not land on an occupied slot
+    blocking_statuses = (AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED)
+    reactivated = status_changed and original_status not in blocking_statuses
+    if (time_changed or reactivated) and appointment.status in blocking_statuses and appointment.end_datetime_utc:
+        try:
+            reserve_slot(db, appointment.tenant_id, appointment.appointment_time, appointment.end_datetime_utc, exclude_appointment_id=appointment.id)
+        except SlotUnavailableError:
+            db.rollback()
+            logger.info(f"[Update Appt ID: {appointment_id}] New time overlaps another appointment.")
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The selected time slot is not available.")
+
     # 5. Commit Appointment Changes
     try:
         db.commit()
@@ -483,6 +511,7 @@ def update_appointment(
         if not hasattr(appointment, 'services') or not appointment.services:
             db.refresh(appointment, attribute_names=['services'])
         logger.info(f"[Update Appt ID: {appointment_id}] Appointment update committed successfully.")
+        availability_cache.invalidate_for_times(appointment.tenant, original_time, original_end_time, appointment.appointment_time, appointment.end_datetime_utc)
     except SQLAlchemyExceptions.IntegrityError as e:
          db.rollback()
          logger.error(f"[Update Appt ID: {appointment_id}] Database Integrity Error during update commit: {e}", exc_info=True)
@@ -552,7 +581,7 @@ def update_appointment(
 def delete_appointment(
     appointment_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     logger.info(f"[Delete Appt ID: {appointment_id}] User: {current_user.email}")
     appointment = db.query(AppointmentModel).filter(AppointmentModel.id == appointment_id).first()
@@ -562,10 +591,14 @@ def delete_appointment(
     check_appointment_permission(current_user, appointment, action="delete") # Includes role check
 
     logger.info(f"[Delete Appt ID: {appointment_id}] Permission granted. Deleting...")
+    tenant = appointment.tenant
+    appointment_time = appointment.appointment_time
+    appointment_end_time = appointment.end_datetime_utc
     try:
         db.delete(appointment)
         db.commit()
         logger.info(f"[Delete Appt ID: {appointment_id}] Deletion successful.")
+        availability_cache.invalidate_for_times(tenant, appointment_time, appointment_end_time)
         # Return Response for 204
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except Exception as e:
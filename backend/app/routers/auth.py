@@ -1,23 +1,26 @@
 # app/routers/auth.py
 # --- FULL REPLACEMENT ---
 
-from fastapi import APIRouter, HTTPException, status, Depends, Response
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy.orm import Session
 from app import models, database
 from app.utils.jwt_utils import create_access_token
-from passlib.context import CryptContext
 from app.config import settings
+from app.dependencies import get_client_ip, password_hashing_busy_exception
+from app.services import login_throttle, password_hashing
+from app.services.password_hashing import PasswordHashingBusy
 import ipaddress
 
+import logging
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/auth",
     tags=["Authentication"]
 )
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # --- Request and Response Models ---
 class LoginRequest(BaseModel):
     email: str
@@ -34,9 +37,6 @@ class LogoutResponse(BaseModel):
 
 
 # --- Helper Functions ---
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
 def get_cookie_domain_attribute(base_domain_setting: str) -> Optional[str]:
     """
     Calculates the appropriate value for the 'domain' attribute in set_cookie.
@@ -61,6 +61,7 @@ def get_cookie_domain_attribute(base_domain_setting: str) -> Optional[str]:
 # --- Login Endpoint ---
 @router.post("/login", response_model=LoginResponse)
 def login_for_access_token(
+    request: Request,
     response: Response,
     form_data: LoginRequest,
     db: Session = Depends(database.get_db)
@@ -69,11 +70,36 @@ def login_for_access_token(
     Authenticate user and resolve their tenant from user data (not Host header).
     Always returns the user's tenant subdomain for frontend redirect.
     """
+    # 0. Locked out email/IP (too many recent failures): refuse before any DB query or bcrypt
+    client_ip = get_client_ip(request)
+    retry_after = login_throttle.locked_for(form_data.email, client_ip)
+    if retry_after:
+        logger.warning(f"Login throttled: email {form_data.email}, IP {client_ip} ({retry_after}s left)")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many failed login attempts. Try again in {-(-retry_after // 60)} minute(s).",
+            headers={"Retry-After": str(retry_after)},
+        )
+
     # 1. Authenticate credentials
     user = db.query(models.User).filter(models.User.email == form_data.email).first()
-    if not user or not verify_password(form_data.password, user.password):
-        print(f"[Login] Auth failed for email: {form_data.email}")
+    verified, new_hash = False, None
+    if user:
+        try:
+            # bcrypt runs in the password hashing pool; 429 when it is saturated (login storm)
+            verified, new_hash = password_hashing.verify_and_update(form_data.password, user.password)
+        except PasswordHashingBusy as e:
+            raise password_hashing_busy_exception(e)
+    if not verified:
+        logger.warning(f"Login failed for email {form_data.email} from IP {client_ip}")
+        login_throttle.record_failure(form_data.email, client_ip)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    login_throttle.record_success(form_data.email)
+
+    if new_hash:
+        # Stored hash has another bcrypt cost than settings.password_bcrypt_rounds: upgrade it now
+        user.password = new_hash
+        db.commit()
 
     print(f"[Login] User '{user.email}' authenticated. Tenant ID: {user.tenant_id}, Role: {user.role}")
 
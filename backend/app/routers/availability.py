@@ -1,23 +1,39 @@
 # app/routers/availability.py
-from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 # from sqlalchemy import func, cast, Date as SQLDate # Not used in this snippet
-from typing import List, Dict
-from datetime import datetime, date as DDate, time, timedelta, timezone as pytimezone
+from typing import List, Dict, Literal, Optional, Tuple
+from datetime import datetime, date as DDate, timedelta, timezone as pytimezone
+import time
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.tenant import Tenant as TenantModel
 from app.models.appointment import Appointment as AppointmentModel
 from app.models.service import Service as ServiceModel
-from app.schemas.availability import AvailabilityResponse
-from app.dependencies import get_tenant_from_request_subdomain
+from app.schemas.availability import (
+    AvailabilityResponse, AvailabilityRangeResponse, NextAvailabilityResponse, NextAvailableSlot,
+    SlotHoldCreate, SlotHoldOut,
+)
+from app.dependencies import get_client_ip, get_tenant_from_request_subdomain
+from app.services.tenant_cache import TenantSnapshot
 # from app.core.config import settings # Not used directly, but could be for defaults
-from app.schemas.enums import AppointmentStatus
-
-try:
-    import zoneinfo
-except ImportError:
-    from backports import zoneinfo
+from app.services.availability_engine import (
+    to_utc,
+    build_work_intervals_utc,
+    local_day_bounds_utc,
+    busy_intervals_from_appointments,
+    merge_busy_intervals,
+    compute_available_slots,
+    exclude_overlapping_slots,
+    format_slots_local,
+    is_slot_start,
+)
+from app.services.business_hours import WeeklySchedule, get_tenant_schedule
+from app.services import availability_cache
+from app.services.booking_service import BLOCKING_STATUSES, time_range_overlaps, find_conflicting_appointment_async
+from app.services import slot_holds
 
 import logging
 logger = logging.getLogger(__name__)
@@ -29,30 +45,22 @@ router = APIRouter(
 
 # CONFIGURABLE DEFAULT - consider moving to settings or TenantModel
 DEFAULT_SLOT_STEP_MINUTES = 15
+# Upper bound for /availability/range (two months covers any calendar view)
+MAX_RANGE_DAYS = 62
+# /availability/next: search horizon, result cap and wall-clock budget
+NEXT_DEFAULT_MAX_DAYS = 30
+NEXT_MAX_DAYS = 90
+NEXT_MAX_RESULTS = 20
+NEXT_SEARCH_BUDGET_SECONDS = 1.0
 
 
-def get_timezone_object(tz_string: str):
-    """Helper to get a timezone object."""
-    try:
-        return zoneinfo.ZoneInfo(tz_string)
-    except zoneinfo.ZoneInfoNotFoundError:
-        logger.warning(f"Tenant timezone '{tz_string}' not found, defaulting to UTC.")
-        return zoneinfo.ZoneInfo("UTC")
-
-
-@router.get("/", response_model=AvailabilityResponse)
-async def get_appointment_availability(
-    request: Request,
-    date_query: DDate = Query(..., description="Date to check availability for (YYYY-MM-DD)"),
-    service_ids_query: str = Query(..., description="Comma-separated string of service IDs"),
-    db: Session = Depends(get_db)
-):
-    logger.info(f"Availability check requested for date: {date_query}, services: '{service_ids_query}'")
 
-    # 1. Resolve Tenant
+async def _resolve_public_tenant(request: Request, db: AsyncSession) -> TenantSnapshot:
+    """Resolves the tenant for a public availability call, normalizing unexpected errors to 500."""
     try:
         tenant = await get_tenant_from_request_subdomain(request, db)
         logger.info(f"Tenant resolved: {tenant.name} (ID: {tenant.id}), Subdomain: {tenant.subdomain}")
+        return tenant
     except HTTPException as e:
         logger.error(f"Failed to resolve tenant for availability: {e.detail}")
         raise e
@@ -60,7 +68,9 @@ async def get_appointment_availability(
         logger.error(f"Unexpected error resolving tenant: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error resolving tenant information.")
 
-    # 2. Parse Service IDs & Calculate Total Duration
+
+async def _get_total_duration_minutes(db: AsyncSession, tenant_id: int, service_ids_query: str) -> int:
+    """Parses the comma-separated service IDs and returns their total duration for this tenant."""
     try:
         s_ids = [int(s_id.strip()) for s_id in service_ids_query.split(',') if s_id.strip().isdigit()]
         if not s_ids:
@@ -68,206 +78,363 @@ async def get_appointment_availability(
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid service_ids format. Must be comma-separated integers.")
 
-    services = db.query(ServiceModel).filter(ServiceModel.id.in_(s_ids), ServiceModel.tenant_id == tenant.id).all()
-    if len(services) != len(s_ids):
+    durations = (await db.scalars(
+        select(ServiceModel.duration_minutes).where(ServiceModel.id.in_(s_ids), ServiceModel.tenant_id == tenant_id)
+    )).all()
+    if len(durations) != len(s_ids):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="One or more requested services not found for this tenant.")
-    
-    total_required_duration_minutes = sum(service.duration_minutes for service in services)
+
+    total_required_duration_minutes = sum(durations)
     if total_required_duration_minutes <= 0:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Total service duration must be positive.")
     logger.info(f"Total required duration: {total_required_duration_minutes} minutes.")
+    return total_required_duration_minutes
+
+
+async def _load_blocking_appointments(db: AsyncSession, tenant_id: int, start_utc: datetime, end_utc: datetime) -> List[AppointmentModel]:
+    """PENDING/CONFIRMED appointments of the tenant whose [start, end) overlaps [start_utc, end_utc) (GiST range lookup)."""
+    return (await db.scalars(select(AppointmentModel).where(
+        AppointmentModel.tenant_id == tenant_id,
+        AppointmentModel.status.in_(BLOCKING_STATUSES),
+        time_range_overlaps(start_utc, end_utc)
+    ))).all()
+
+
+@router.get("/", response_model=AvailabilityResponse)
+async def get_appointment_availability(
+    request: Request,
+    date_query: DDate = Query(..., description="Date to check availability for (YYYY-MM-DD)"),
+    service_ids_query: str = Query(..., description="Comma-separated string of service IDs"),
+    hold_id: Optional[str] = Query(None, description="The caller's own slot hold, which should not hide its slot"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    logger.info(f"Availability check requested for date: {date_query}, services: '{service_ids_query}'")
+
+    # 1. Resolve Tenant
+    tenant = await _resolve_public_tenant(request, db)
+
+    # 2. Parse Service IDs & Calculate Total Duration
+    total_required_duration_minutes = await _get_total_duration_minutes(db, tenant.id, service_ids_query)
+
+    schedule = get_tenant_schedule(tenant) # Compiled once per config version, tzinfo included
+    tenant_tz_str = schedule.timezone_name
+    tenant_tz = schedule.tz
+    slot_step_minutes = getattr(tenant, 'slot_increment_minutes', DEFAULT_SLOT_STEP_MINUTES)
+
+    # 3. Serve from the tenant-day cache when possible (invalidated on appointment/tenant writes)
+    #    Redis calls (cache, holds) are blocking: they run in the threadpool, off the event loop
+    available_slots_utc = await run_in_threadpool(
+        availability_cache.get_cached_slots, tenant.id, date_query, total_required_duration_minutes, slot_step_minutes
+    )
+    if available_slots_utc is None:
+        available_slots_utc = await _compute_slots_for_day(db, tenant, schedule, date_query, total_required_duration_minutes, slot_step_minutes)
+        await run_in_threadpool(
+            availability_cache.store_slots, tenant.id, date_query, total_required_duration_minutes, slot_step_minutes, available_slots_utc
+        )
+    else:
+        logger.debug(f"Availability cache hit for tenant {tenant.id} on {date_query}.")
+    # Holds are never cached: they change far more often than appointments
+    available_slots_utc = (await _exclude_held_slots(
+        tenant.id, schedule, {date_query: available_slots_utc}, total_required_duration_minutes, hold_id
+    ))[date_query]
+
+    # 6. Format available slots to "HH:MM" in tenant's timezone and remove duplicates
+    formatted_available_slots = format_slots_local(available_slots_utc, tenant_tz)
+    logger.info(f"Available slots for tenant {tenant.id} on {date_query} ({tenant_tz_str}): {formatted_available_slots}")
+    return AvailabilityResponse(
+        available_slots=formatted_available_slots,
+        date_checked=date_query,
+        timezone_queried=tenant_tz_str
+    )
+
 
+async def _compute_slots_for_day(db: AsyncSession, tenant: TenantSnapshot, schedule: WeeklySchedule, date_query: DDate, total_required_duration_minutes: int, slot_step_minutes: int) -> List[datetime]:
+    """Uncached path of the single-day endpoint: business hours + that day's appointments -> free UTC slot starts."""
     # 3. Determine Operating Intervals for the Selected Date (in UTC)
     #    SIMPLIFIED: Assumes business hours are within the same calendar day locally.
-    tenant_tz_str = tenant.timezone or "UTC"
-    tenant_tz = get_timezone_object(tenant_tz_str)
-    
-    day_of_week_str = date_query.strftime("%A").lower()
-    
-    business_hours_for_day = None
-    if tenant.business_hours_config and day_of_week_str in tenant.business_hours_config:
-        business_hours_for_day = tenant.business_hours_config[day_of_week_str]
-
-    if not business_hours_for_day or not business_hours_for_day.get("isOpen") or not business_hours_for_day.get("intervals"):
-        logger.info(f"Tenant {tenant.id} is closed or has no intervals for {day_of_week_str} ({date_query}).")
-        return AvailabilityResponse(available_slots=[], date_checked=date_query, timezone_queried=tenant_tz_str)
-
-    work_intervals_utc: List[Dict[str, datetime]] = []
-    for interval_str_obj in business_hours_for_day["intervals"]:
-        try:
-            start_time_obj = datetime.strptime(interval_str_obj["start"], "%H:%M").time()
-            end_time_obj = datetime.strptime(interval_str_obj["end"], "%H:%M").time()
-
-            # Constraint: Business hours must be within the same calendar day.
-            # If end time is on or before start time, it's an invalid interval for a single day.
-            if end_time_obj <= start_time_obj:
-                logger.warning(
-                    f"Skipping invalid business interval for {date_query} (tenant {tenant.id}): "
-                    f"end time '{interval_str_obj['end']}' ({end_time_obj}) is not after start time "
-                    f"'{interval_str_obj['start']}' ({start_time_obj}) for same-day operation."
-                )
-                continue
-
-            # Combine with date_query, attach tenant's timezone
-            start_dt_local = datetime.combine(date_query, start_time_obj, tzinfo=tenant_tz)
-            end_dt_local = datetime.combine(date_query, end_time_obj, tzinfo=tenant_tz)
-            
-            # Convert to UTC
-            start_utc = start_dt_local.astimezone(pytimezone.utc)
-            end_utc = end_dt_local.astimezone(pytimezone.utc)
-
-            # This check is still important, e.g., for DST transitions that might make end_utc <= start_utc
-            # even if local times were valid (e.g. "spring forward" losing an hour).
-            if end_utc <= start_utc:
-                logger.warning(
-                    f"Skipping work interval due to invalid UTC times after conversion: "
-                    f"{start_utc.isoformat()} to {end_utc.isoformat()} "
-                    f"(from local {start_dt_local.isoformat()} to {end_dt_local.isoformat()}). "
-                    f"This might occur around DST changes or with unusual timezone definitions."
-                )
-                continue
-                
-            work_intervals_utc.append({
-                "start_utc": start_utc,
-                "end_utc": end_utc
-            })
-        except ValueError as e:
-            logger.error(f"Error parsing time interval '{interval_str_obj}' for tenant {tenant.id}: {e}")
-            continue # Skip this malformed interval
-    
+    work_intervals_utc = build_work_intervals_utc(date_query, schedule, tenant.id)
     if not work_intervals_utc:
         logger.info(f"No valid work intervals in UTC for tenant {tenant.id} on {date_query} after processing business hours.")
-        return AvailabilityResponse(available_slots=[], date_checked=date_query, timezone_queried=tenant_tz_str)
+        return []
     logger.debug(f"Work intervals in UTC for {date_query}: {work_intervals_utc}")
-    logger.info(f"Work intervals in UTC for {date_query}: {work_intervals_utc}")
-
 
     # 4. Fetch Existing Appointments to determine Busy Intervals (UTC)
-    day_start_on_queried_date_local = datetime.combine(date_query, time.min, tzinfo=tenant_tz)
-    start_of_next_day_local = datetime.combine(date_query + timedelta(days=1), time.min, tzinfo=tenant_tz)
-    
-    query_appointments_start_utc = day_start_on_queried_date_local.astimezone(pytimezone.utc)
-    query_appointments_end_utc = start_of_next_day_local.astimezone(pytimezone.utc)
-
-    logger.debug(f"Querying existing appointments for tenant {tenant.id} that START between UTC: {query_appointments_start_utc.isoformat()} and {query_appointments_end_utc.isoformat()}")
-    
-    existing_appointments_on_day = db.query(AppointmentModel).filter(
-        AppointmentModel.tenant_id == tenant.id,
-        AppointmentModel.status.in_([AppointmentStatus.CONFIRMED, AppointmentStatus.PENDING]),
-        AppointmentModel.appointment_time >= query_appointments_start_utc,
-        AppointmentModel.appointment_time < query_appointments_end_utc
-    ).all()
-
-    busy_utc_intervals: List[Dict[str, datetime]] = []
-    logger.debug(f"Normalizing {len(existing_appointments_on_day)} existing appointments to UTC...")
-    for appt in existing_appointments_on_day:
-        raw_start_time = appt.appointment_time
-        raw_end_time = appt.end_datetime_utc
-
-        
-        
-        logger.debug(f"  Appt ID {appt.id}: Raw start='{raw_start_time.isoformat() if hasattr(raw_start_time, 'isoformat') else raw_start_time}' (tz: {raw_start_time.tzinfo if hasattr(raw_start_time, 'tzinfo') else 'N/A'}), "
-                     f"Raw end='{raw_end_time.isoformat() if hasattr(raw_end_time, 'isoformat') else raw_end_time}' (tz: {raw_end_time.tzinfo if hasattr(raw_end_time, 'tzinfo') else 'N/A'})")
-
-        # Normalize start time to UTC with pytimezone.utc
-        if raw_start_time.tzinfo is None:
-            # Assume naive datetime from DB is UTC if not specified otherwise by ORM/DB settings
-            # If it's meant to be local, it should have been made aware with tenant_tz first.
-            # For now, sticking to the idea that DB times are either UTC-aware or naive-UTC.
-            start_utc = raw_start_time.replace(tzinfo=pytimezone.utc)
-            logger.debug(f"    Appt ID {appt.id}: Start was naive, assumed UTC and made aware: {start_utc.isoformat()}")
-        elif raw_start_time.tzinfo.utcoffset(raw_start_time) != pytimezone.utc.utcoffset(None): # Compare offsets
-            original_tz_str = str(raw_start_time.tzinfo)
-            start_utc = raw_start_time.astimezone(pytimezone.utc)
-            logger.debug(f"    Appt ID {appt.id}: Start was {original_tz_str}, converted to UTC: {start_utc.isoformat()}")
-        else: # Already UTC (could be zoneinfo.ZoneInfo("UTC") or datetime.timezone.utc)
-            # Ensure the tzinfo object is specifically pytimezone.utc for consistency if needed,
-            # though comparison logic handles different UTC tzinfo objects.
-            # For strictness, one might do: start_utc = raw_start_time.astimezone(pytimezone.utc)
-            start_utc = raw_start_time 
-            if start_utc.tzinfo != pytimezone.utc: # If it's zoneinfo UTC, convert to datetime.timezone.utc
-                 start_utc = start_utc.astimezone(pytimezone.utc)
-            logger.debug(f"    Appt ID {appt.id}: Start already effectively UTC ({start_utc.tzinfo}): {start_utc.isoformat()}")
-
-        # Normalize end time to UTC with pytimezone.utc
-        if raw_end_time.tzinfo is None:
-            end_utc = raw_end_time.replace(tzinfo=pytimezone.utc)
-            logger.debug(f"    Appt ID {appt.id}: End was naive, assumed UTC and made aware: {end_utc.isoformat()}")
-        elif raw_end_time.tzinfo.utcoffset(raw_end_time) != pytimezone.utc.utcoffset(None): # Compare offsets
-            original_tz_str = str(raw_end_time.tzinfo)
-            end_utc = raw_end_time.astimezone(pytimezone.utc)
-            logger.debug(f"    Appt ID {appt.id}: End was {original_tz_str}, converted to UTC: {end_utc.isoformat()}")
-        else: # Already UTC
-            end_utc = raw_end_time
-            if end_utc.tzinfo != pytimezone.utc: # If it's zoneinfo UTC, convert to datetime.timezone.utc
-                 end_utc = end_utc.astimezone(pytimezone.utc)
-            logger.debug(f"    Appt ID {appt.id}: End already effectively UTC ({end_utc.tzinfo}): {end_utc.isoformat()}")
-        
-        busy_utc_intervals.append({"start_utc": start_utc, "end_utc": end_utc})
-    
-    # This log should now reflect purely UTC timings if the above logic worked.
-    logger.debug(f"Found {len(busy_utc_intervals)} busy UTC intervals (normalized) for {date_query} (Tenant {tenant.id}): {busy_utc_intervals}")
-    logger.info(f" busy UTC intervals for {date_query} (Tenant {tenant.id}): {busy_utc_intervals}")
+    query_appointments_start_utc, query_appointments_end_utc = local_day_bounds_utc(date_query, schedule.tz)
+    logger.debug(f"Querying existing appointments for tenant {tenant.id} that overlap UTC {query_appointments_start_utc.isoformat()} - {query_appointments_end_utc.isoformat()}")
+
+    existing_appointments_on_day = await _load_blocking_appointments(db, tenant.id, query_appointments_start_utc, query_appointments_end_utc)
+
+    # Sorted + merged once, then swept against each work interval in a single pass
+    busy_utc_intervals = merge_busy_intervals(busy_intervals_from_appointments(existing_appointments_on_day))
+    logger.debug(f"Found {len(busy_utc_intervals)} merged busy UTC intervals for {date_query} (Tenant {tenant.id}): {busy_utc_intervals}")
+
     # 5. Generate Potential Slots & Check Availability
-    available_slots_utc: List[datetime] = []
-    slot_step_minutes = getattr(tenant, 'slot_increment_minutes', DEFAULT_SLOT_STEP_MINUTES) 
-    
     logger.debug(f"Using slot step: {slot_step_minutes} minutes. Required duration: {total_required_duration_minutes} minutes.")
+    return compute_available_slots(
+        work_intervals_utc, busy_utc_intervals, total_required_duration_minutes, slot_step_minutes
+    )
 
-    for work_interval in work_intervals_utc:
-        current_potential_slot_start_utc = work_interval["start_utc"]
-        work_interval_end_utc = work_interval["end_utc"]
-        
-        logger.debug(f"Processing work interval: {current_potential_slot_start_utc.isoformat()} to {work_interval_end_utc.isoformat()}")
-
-        while True:
-            potential_slot_end_utc = current_potential_slot_start_utc + timedelta(minutes=total_required_duration_minutes)
-
-            if potential_slot_end_utc > work_interval_end_utc:
-                logger.debug(f"  Slot {current_potential_slot_start_utc.isoformat()} - {potential_slot_end_utc.isoformat()} ends after work interval. Stopping for this work interval.")
-                break 
-
-            is_slot_free = True
-            for busy_idx, busy_interval in enumerate(busy_utc_intervals):
-                # These busy_start/end are now guaranteed to be UTC with pytimezone.utc tzinfo
-                busy_start = busy_interval["start_utc"] 
-                busy_end = busy_interval["end_utc"]
-
-                # Log values used in comparison for the specific iteration causing issues
-                # logger.debug(
-                #     f"    Checking slot {current_potential_slot_start_utc.isoformat()}-{potential_slot_end_utc.isoformat()} "
-                #     f"against busy interval #{busy_idx}: {busy_start.isoformat()}-{busy_end.isoformat()}"
-                # )
-                
-                # Overlap condition: max(start1, start2) < min(end1, end2)
-                # All datetimes here should be UTC and timezone-aware (with pytimezone.utc)
-                if max(current_potential_slot_start_utc, busy_start) < min(potential_slot_end_utc, busy_end):
-                    logger.debug(
-                        f"  Conflict DETECTED: Slot {current_potential_slot_start_utc.isoformat()}-{potential_slot_end_utc.isoformat()} "
-                        f"overlaps with busy interval #{busy_idx}: {busy_start.isoformat()}-{busy_end.isoformat()}"
-                    )
-                    is_slot_free = False
-                    break 
-            
-            if is_slot_free:
-                available_slots_utc.append(current_potential_slot_start_utc)
-                logger.debug(f"  Found available slot (UTC): {current_potential_slot_start_utc.isoformat()}")
-            # else:
-                # logger.debug(f"  Slot {current_potential_slot_start_utc.isoformat()}-{potential_slot_end_utc.isoformat()} is NOT free.")
-
-
-            current_potential_slot_start_utc += timedelta(minutes=slot_step_minutes)
-            
-            if current_potential_slot_start_utc >= work_interval_end_utc:
-                 break
-    
-    # 6. Format available slots to "HH:MM" in tenant's timezone and remove duplicates
-    formatted_available_slots = sorted(list(set(
-        slot_utc.astimezone(tenant_tz).strftime("%H:%M") for slot_utc in available_slots_utc
-    )))
-    logger.info(f"Available slots for tenant {tenant.id} on {date_query} ({tenant_tz_str}): {formatted_available_slots}")
-    return AvailabilityResponse(
-        available_slots=formatted_available_slots,
-        date_checked=date_query,
-        timezone_queried=tenant_tz_str
+
+async def _slots_for_days(
+    db: AsyncSession,
+    tenant: TenantSnapshot,
+    schedule: WeeklySchedule,
+    days: List[DDate],
+    total_required_duration_minutes: int,
+    slot_step_minutes: int,
+) -> Tuple[Dict[DDate, List[datetime]], int, int]:
+    """
+    Free UTC slot starts for a sorted list of consecutive local days.
+    Days are served from the cache where possible; the rest are computed from a single
+    appointment query and cached. Returns (slots_by_day, computed_day_count, appointments_loaded).
+    """
+    tenant_tz = schedule.tz
+    slots_utc_by_day = await run_in_threadpool(
+        availability_cache.get_cached_days, tenant.id, days, total_required_duration_minutes, slot_step_minutes
     )
+    missing_days = [day for day in days if day not in slots_utc_by_day]
+
+    appointment_count = 0
+    if missing_days:
+        # Closed days have no slots whatever is booked, so only open days need appointments
+        open_missing_days = [day for day in missing_days if schedule.is_open(day)]
+        merged_busy_utc: List[Tuple[datetime, datetime]] = []
+        if open_missing_days:
+            # One overlap query covering the uncached days; merged once, then each day's
+            # work intervals are swept against the whole list (the sweep bisects into it).
+            range_start_utc, _ = local_day_bounds_utc(open_missing_days[0], tenant_tz)
+            _, range_end_utc = local_day_bounds_utc(open_missing_days[-1], tenant_tz)
+            appointments = await _load_blocking_appointments(db, tenant.id, range_start_utc, range_end_utc)
+            appointment_count = len(appointments)
+            merged_busy_utc = merge_busy_intervals(busy_intervals_from_appointments(appointments))
+
+        computed: Dict[DDate, List[datetime]] = {}
+        for day in missing_days:
+            computed[day] = compute_available_slots(
+                build_work_intervals_utc(day, schedule, tenant.id), merged_busy_utc,
+                total_required_duration_minutes, slot_step_minutes
+            )
+        await run_in_threadpool(availability_cache.store_days, tenant.id, computed, total_required_duration_minutes, slot_step_minutes)
+        slots_utc_by_day.update(computed)
+
+    return slots_utc_by_day, len(missing_days), appointment_count
+
+
+async def _exclude_held_slots(
+    tenant_id: int,
+    schedule: WeeklySchedule,
+    slots_utc_by_day: Dict[DDate, List[datetime]],
+    total_required_duration_minutes: int,
+    exclude_hold_id: Optional[str] = None,
+) -> Dict[DDate, List[datetime]]:
+    """Treats other visitors' active slot holds as busy (one Redis read for the whole set of days)."""
+    if not slots_utc_by_day:
+        return slots_utc_by_day
+    window_start_utc, _ = local_day_bounds_utc(min(slots_utc_by_day), schedule.tz)
+    _, window_end_utc = local_day_bounds_utc(max(slots_utc_by_day), schedule.tz)
+    holds = await run_in_threadpool(slot_holds.active_holds, tenant_id, window_start_utc, window_end_utc, exclude_hold_id)
+    if not holds:
+        return slots_utc_by_day
+    return {
+        day: exclude_overlapping_slots(slots, total_required_duration_minutes, holds)
+        for day, slots in slots_utc_by_day.items()
+    }
+
+
+@router.get("/range", response_model=AvailabilityRangeResponse)
+async def get_appointment_availability_range(
+    request: Request,
+    start_date: DDate = Query(..., description="First date of the range (YYYY-MM-DD)"),
+    end_date: DDate = Query(..., description="Last date of the range, inclusive (YYYY-MM-DD)"),
+    service_ids_query: str = Query(..., description="Comma-separated string of service IDs"),
+    mode: Literal["slots", "summary"] = Query("slots", description="'slots' returns HH:MM lists per day, 'summary' only the slot count per day"),
+    hold_id: Optional[str] = Query(None, description="The caller's own slot hold, which should not hide its slot"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Multi-day variant of GET /availability/ for calendar views.
+    One tenant lookup and one appointment query for the whole range; per-day
+    slots use the same engine (and therefore the same results) as the single-day endpoint.
+    """
+    logger.info(f"Availability range requested: {start_date} -> {end_date}, services: '{service_ids_query}', mode: {mode}")
+
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must be on or after start_date.")
+    day_count = (end_date - start_date).days + 1
+    if day_count > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Date range cannot exceed {MAX_RANGE_DAYS} days.")
+
+    tenant = await _resolve_public_tenant(request, db)
+    total_required_duration_minutes = await _get_total_duration_minutes(db, tenant.id, service_ids_query)
+
+    schedule = get_tenant_schedule(tenant) # Compiled once per config version, tzinfo included
+    tenant_tz_str = schedule.timezone_name
+    tenant_tz = schedule.tz
+    slot_step_minutes = getattr(tenant, 'slot_increment_minutes', DEFAULT_SLOT_STEP_MINUTES)
+
+    all_days = [start_date + timedelta(days=offset) for offset in range(day_count)]
+    slots_utc_by_day, computed_count, appointment_count = await _slots_for_days(
+        db, tenant, schedule, all_days, total_required_duration_minutes, slot_step_minutes
+    )
+    slots_utc_by_day = await _exclude_held_slots(tenant.id, schedule, slots_utc_by_day, total_required_duration_minutes, hold_id)
+
+    slots_by_day: Dict[DDate, List[str]] = {
+        day: format_slots_local(slots_utc_by_day[day], tenant_tz) for day in all_days
+    }
+
+    logger.info(f"Availability for tenant {tenant.id} over {day_count} days: {day_count - computed_count} cached, {computed_count} computed from {appointment_count} appointments.")
+    if mode == "summary":
+        return AvailabilityRangeResponse(
+            start_date=start_date, end_date=end_date, timezone_queried=tenant_tz_str, mode=mode,
+            slot_counts={day: len(slots) for day, slots in slots_by_day.items()}
+        )
+    return AvailabilityRangeResponse(
+        start_date=start_date, end_date=end_date, timezone_queried=tenant_tz_str, mode=mode,
+        available_slots=slots_by_day
+    )
+
+
+@router.get("/next", response_model=NextAvailabilityResponse)
+async def get_next_available_slots(
+    request: Request,
+    service_ids_query: str = Query(..., description="Comma-separated string of service IDs"),
+    start_date: Optional[DDate] = Query(None, description="First date to search from (YYYY-MM-DD); defaults to today in the tenant's timezone"),
+    max_days: int = Query(NEXT_DEFAULT_MAX_DAYS, ge=1, le=NEXT_MAX_DAYS, description="How many days forward to search"),
+    limit: int = Query(1, ge=1, le=NEXT_MAX_RESULTS, description="Stop after this many free slots"),
+    hold_id: Optional[str] = Query(None, description="The caller's own slot hold, which should not hide its slot"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Earliest free slots from start_date onwards, using the same per-day slot logic
+    (and cache) as GET /availability/. Days are examined in windows of 1, 2, 4, 8...
+    days so an early opening costs one small query, and the search stops once
+    `limit` slots are found, max_days are covered, or the latency budget is spent.
+    """
+    logger.info(f"Next availability requested from {start_date}, services: '{service_ids_query}', max_days: {max_days}, limit: {limit}")
+
+    tenant = await _resolve_public_tenant(request, db)
+    total_required_duration_minutes = await _get_total_duration_minutes(db, tenant.id, service_ids_query)
+
+    schedule = get_tenant_schedule(tenant)
+    tenant_tz = schedule.tz
+    slot_step_minutes = getattr(tenant, 'slot_increment_minutes', DEFAULT_SLOT_STEP_MINUTES)
+
+    now_utc = datetime.now(pytimezone.utc)
+    today_local = now_utc.astimezone(tenant_tz).date()
+    search_from = max(start_date or today_local, today_local) # Past days can never have bookable slots
+    last_day = search_from + timedelta(days=max_days - 1)
+
+    found: List[datetime] = []
+    searched_through: Optional[DDate] = None
+    search_complete = True
+
+    if not any(schedule.days):
+        logger.info(f"Tenant {tenant.id} has no open weekday configured; nothing to search.")
+        searched_through = last_day
+    else:
+        deadline = time.monotonic() + NEXT_SEARCH_BUDGET_SECONDS
+        window_start = search_from
+        window_days = 1
+        while window_start <= last_day and len(found) < limit:
+            if time.monotonic() > deadline:
+                search_complete = False
+                logger.warning(f"Next availability search for tenant {tenant.id} hit the {NEXT_SEARCH_BUDGET_SECONDS}s budget after {searched_through}.")
+                break
+
+            window_end = min(window_start + timedelta(days=window_days - 1), last_day)
+            days = [window_start + timedelta(days=offset) for offset in range((window_end - window_start).days + 1)]
+            slots_utc_by_day, _, _ = await _slots_for_days(db, tenant, schedule, days, total_required_duration_minutes, slot_step_minutes)
+            slots_utc_by_day = await _exclude_held_slots(tenant.id, schedule, slots_utc_by_day, total_required_duration_minutes, hold_id)
+
+            # Days are consecutive and each day's slots fall within that local day, so this is chronological
+            for day in days:
+                for slot_utc in sorted(set(slots_utc_by_day[day])):
+                    if slot_utc >= now_utc:
+                        found.append(slot_utc)
+                        if len(found) >= limit:
+                            break
+                if len(found) >= limit:
+                    break
+
+            searched_through = window_end
+            window_start = window_end + timedelta(days=1)
+            window_days *= 2
+
+    logger.info(f"Next availability for tenant {tenant.id}: {len(found)} slot(s) found searching {search_from} -> {searched_through}.")
+    return NextAvailabilityResponse(
+        slots=[
+            NextAvailableSlot(
+                local_date=slot_utc.astimezone(tenant_tz).date(),
+                local_time=slot_utc.astimezone(tenant_tz).strftime("%H:%M"),
+                start_utc=slot_utc,
+            )
+            for slot_utc in found
+        ],
+        timezone_queried=schedule.timezone_name,
+        searched_from=search_from,
+        searched_through=searched_through,
+        search_complete=search_complete,
+    )
+
+
+# --- Slot Holds (public booking flow) ---
+@router.post("/holds", response_model=SlotHoldOut, status_code=status.HTTP_201_CREATED)
+async def create_slot_hold(
+    request: Request,
+    hold_data: SlotHoldCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Places a short TTL lease on a slot while the visitor fills in their details.
+    Other visitors see the slot as busy until it is booked, released or expires.
+    Lives only in Redis: abandoned holds expire without any database write.
+    Only bookable slot starts can be held; a client IP keeps at most
+    settings.slot_hold_max_per_ip holds per tenant (its oldest is released).
+    """
+    tenant = await _resolve_public_tenant(request, db)
+    total_required_duration_minutes = await _get_total_duration_minutes(
+        db, tenant.id, ",".join(str(service_id) for service_id in hold_data.service_ids)
+    )
+    start_utc = to_utc(hold_data.start_time)
+    end_utc = start_utc + timedelta(minutes=total_required_duration_minutes)
+
+    # Only real slots can be held: in the future, inside business hours and on the slot grid
+    if start_utc <= datetime.now(pytimezone.utc):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The selected time slot is in the past.")
+    schedule = get_tenant_schedule(tenant)
+    slot_step_minutes = getattr(tenant, 'slot_increment_minutes', DEFAULT_SLOT_STEP_MINUTES)
+    work_intervals_utc = build_work_intervals_utc(start_utc.astimezone(schedule.tz).date(), schedule, tenant.id)
+    if not is_slot_start(work_intervals_utc, start_utc, total_required_duration_minutes, slot_step_minutes):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The selected time is not a bookable slot.")
+
+    if await find_conflicting_appointment_async(db, tenant.id, start_utc, end_utc) is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The selected time slot is no longer available.")
+
+    try:
+        created = await run_in_threadpool(slot_holds.create_hold, tenant.id, start_utc, end_utc, client_ip=get_client_ip(request))
+    except slot_holds.SlotHoldLimitError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many slots are being booked right now, please try again shortly.",
+            headers={"Retry-After": "30"},
+        )
+    except slot_holds.SlotHoldUnavailableError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Slot holds are temporarily unavailable.")
+    if created is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="This time slot is currently being booked by someone else.")
+
+    hold_id, expires_at = created
+    logger.info(f"Slot hold created for tenant {tenant.id}: {start_utc.isoformat()} - {end_utc.isoformat()} (expires {expires_at.isoformat()}).")
+    return SlotHoldOut(hold_id=hold_id, start_utc=start_utc, end_utc=end_utc, expires_at=expires_at)
+
+
+@router.delete("/holds/{hold_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def release_slot_hold(
+    hold_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Releases a hold early (visitor picked another slot or left). Idempotent."""
+    tenant = await _resolve_public_tenant(request, db)
+    await run_in_threadpool(slot_holds.release_hold, tenant.id, hold_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
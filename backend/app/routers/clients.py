@@ -9,11 +9,10 @@ from datetime import datetime as dt # Alias to avoid confusion with schema datet
 import logging  # Import logging module
 
 from app import database, models, schemas
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, Principal
 from app.config import settings
 from app.models.client import Client as ClientModel
 from app.models.tenant import Tenant as TenantModel
-from app.models.user import User
 from app.models.tag import Tag as TagModel           # Import the Tag model
 from app.schemas.tag import TagOut 
 from app.schemas.client import ClientOut
@@ -34,7 +33,7 @@ logging.basicConfig(level=logging.INFO)
 
 
 # --- Helper Function for Client Permissions ---
-def check_client_permission(current_user: User, client: ClientModel, action: str = "access"):
+def check_client_permission(current_user: Principal, client: ClientModel, action: str = "access"):
     """Checks if the current user has permission to access/modify a client."""
     if current_user.role == "super_admin":
         print(f"[Permission Check] Super admin ({current_user.email}) granted for {action} on Client ID {client.id}.")
@@ -85,7 +84,7 @@ def get_client_or_404(
 def create_client_manual(
     client_data: schemas.client.ClientCreateRequest,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     print(f"[Create Client Manual] User: {current_user.email}, Role: {current_user.role}")
 
@@ -140,7 +139,7 @@ def create_client_manual(
 @router.get("/", response_model=PaginatedResponse[ClientOut])
 def get_clients_paginated(
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(10, ge=1, le=100, description="Items per page"),
     include_deleted: bool = Query(False, description="Include soft-deleted clients"),
@@ -248,7 +247,7 @@ def get_clients_paginated(
 def get_client(
     client_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     include_deleted: bool = Query(False, description="Allow fetching a soft-deleted client")
 ):
     # ... (your existing code, ensure options(joinedload(ClientModel.tags)) is present)
@@ -279,7 +278,7 @@ def get_client(
 def get_client(
     client_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     include_deleted: bool = Query(False, description="Allow fetching a soft-deleted client")
 ):
     print(f"[Get Client ID: {client_id}] User: {current_user.email}, Include Deleted: {include_deleted}")
@@ -311,7 +310,7 @@ def update_client(
     client_id: int,
     client_update: schemas.client.ClientUpdate,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     print(f"[Update Client ID: {client_id}] User: {current_user.email}")
 
@@ -367,7 +366,7 @@ def update_client(
 def delete_client(
     client_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     print(f"[Delete Client ID: {client_id}] User: {current_user.email}")
 
@@ -403,7 +402,7 @@ def assign_tag_to_client(
     client_id: int,
     tag_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Assigns an existing tag to a specific client.
@@ -467,7 +466,7 @@ def remove_tag_from_client(
     client_id: int,
     tag_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Removes an existing tag association from a specific client.
@@ -527,7 +526,7 @@ def remove_tag_from_client(
 def list_client_appointments(
     client_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user) # Requires authentication
+    current_user: Principal = Depends(get_current_user) # Requires authentication
 ):
     """
     Retrieves a list of all appointments associated with a specific client.
@@ -574,7 +573,7 @@ def list_client_communications(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(6, ge=1, le=50, description="Items per page"), # Default to 6 per requirement
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user) # All roles can view
+    current_user: Principal = Depends(get_current_user) # All roles can view
 ):
     """
     Retrieves a paginated list of communication logs for a specific client,
@@ -8,8 +8,7 @@ from typing import List, Optional
 
 # Core App Imports
 from app import database, models, schemas
-from app.dependencies import get_current_user
-from app.models.user import User as UserModel
+from app.dependencies import get_current_user, Principal
 from app.models.client import Client as ClientModel # Need Client to verify tenant scope
 from app.models.communications_log import ( 
     CommunicationsLog as CommunicationsLogModel,
@@ -42,7 +41,7 @@ router = APIRouter(
 def create_manual_communication_log(
     log_data: ManualLogCreate,
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_user) # Requires authentication
+    current_user: Principal = Depends(get_current_user) # Requires authentication
 ):
     """
     Manually logs a communication interaction (Phone, Email, SMS, In-Person, etc.).
@@ -172,7 +171,7 @@ def create_manual_communication_log(
 #     page: int = Query(1, ge=1, description="Page number"),
 #     limit: int = Query(6, ge=1, le=50, description="Items per page"), # Default to 6 per requirement
 #     db: Session = Depends(database.get_db),
-#     current_user: UserModel = Depends(get_current_user) # All roles can view
+#     current_user: Principal = Depends(get_current_user) # All roles can view
 # ):
 #     """
 #     Retrieves a paginated list of communication logs for a specific client,
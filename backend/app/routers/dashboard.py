@@ -8,9 +8,8 @@ from datetime import datetime, timedelta, date, timezone
 
 # Core App Imports (Adjust paths if necessary)
 from app import database, models, schemas # Assuming schemas.__init__ imports necessary schemas
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, Principal
 from app.models.tenant import Tenant as TenantModel
-from app.models.user import User as UserModel
 from app.models.appointment import Appointment as AppointmentModel
 from app.models.client import Client as ClientModel
 from app.models.service import Service as ServiceModel
@@ -70,7 +69,7 @@ def get_date_range_from_period(period: StatsPeriod) -> Tuple[datetime, datetime]
 def get_dashboard_stats(
     period: StatsPeriod = Query('last_7_days', description="Time period for stats like revenue, completed appts."),
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_user) # Ensures authentication
+    current_user: Principal = Depends(get_current_user) # Ensures authentication
 ):
     """
     Retrieves aggregated dashboard statistics for the current user's tenant.
@@ -265,7 +264,7 @@ def get_revenue_trend(
     # For now, let's hardcode to last 7 days as per discussion.
     # Later, you can add a query param: period: str = Query("last_7_days", description="Time period for the trend"),
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     is_super_admin = current_user.role == "super_admin"
     if not is_super_admin and not current_user.tenant_id:
@@ -0,0 +1,130 @@
+# app/routers/ops.py
+# --- NEW FILE ---
+#
+# Operational endpoints for super admins (process/cluster counters, health signals).
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from typing import Any, Dict, List, Optional
+
+from app.core import metrics
+from app.dependencies import Principal
+from app.routers.tenants import get_current_active_super_admin
+from app.services import login_throttle, password_hashing, principal_cache, reminder_runs, template_cache, tenant_cache
+from app.services.smtp_pool import pool_stats
+
+import logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/ops",
+    tags=["Ops"]
+)
+
+
+@router.get("/metrics", response_model=Dict[str, int])
+def get_metrics(
+    current_user: Principal = Depends(get_current_active_super_admin)
+):
+    """
+    Returns the counters recorded via app.core.metrics (e.g. availability cache hits/misses).
+    Counters live in Redis when configured, so they are shared across workers.
+    """
+    return metrics.snapshot()
+
+
+@router.get("/reminder-runs", response_model=List[Dict[str, Any]])
+def get_reminder_runs(
+    limit: int = Query(20, ge=1, le=50),
+    current_user: Principal = Depends(get_current_active_super_admin)
+):
+    """
+    Recent send_appointment_reminders runs, newest first: found, sent, failed, skipped,
+    scan time and total duration (set once the run's last chunk finished). Requires Redis.
+    """
+    return reminder_runs.recent_runs(limit)
+
+
+@router.get("/smtp-pool", response_model=Optional[Dict[str, int]])
+def get_smtp_pool_stats(
+    current_user: Principal = Depends(get_current_active_super_admin)
+):
+    """
+    SMTP connection pool of THIS API process (opened/reused/recycled connections, idle/in use).
+    null if the process has not sent email yet. Worker-side connection events are in /ops/metrics
+    under smtp_pool.*.
+    """
+    return pool_stats()
+
+
+@router.get("/template-cache", response_model=Dict[str, Any])
+def get_template_cache_stats(
+    current_user: Principal = Depends(get_current_active_super_admin)
+):
+    """
+    Notification template cache of THIS API process (sizes, hits, misses, hit rates).
+    Workers report their hits/misses to /ops/metrics as template_cache.*.
+    """
+    return template_cache.stats()
+
+
+@router.get("/principal-cache", response_model=Dict[str, Any])
+def get_principal_cache_stats(
+    current_user: Principal = Depends(get_current_active_super_admin)
+):
+    """
+    get_current_user cache of THIS API process: in-process hits, Redis hits, database
+    lookups (miss / tenant_miss) and sizes.
+    """
+    return principal_cache.stats()
+
+
+@router.get("/tenant-cache", response_model=Dict[str, Any])
+def get_tenant_cache_stats(
+    current_user: Principal = Depends(get_current_active_super_admin)
+):
+    """
+    Public subdomain -> tenant cache of THIS API process: in-process hits, Redis hits,
+    database lookups (miss) and size.
+    """
+    return tenant_cache.stats()
+
+
+@router.get("/password-hashing", response_model=Dict[str, Any])
+def get_password_hashing_stats(
+    current_user: Principal = Depends(get_current_active_super_admin)
+):
+    """
+    bcrypt pool of THIS API process: hash/verify counts, average and max queue wait and
+    bcrypt time (ms), and calls rejected with 429. Cluster totals are in /ops/metrics
+    under password_hash.*.
+    """
+    return password_hashing.stats()
+
+
+@router.get("/login-throttle", response_model=Dict[str, Any])
+def get_login_throttle(
+    limit: int = Query(100, ge=1, le=500),
+    current_user: Principal = Depends(get_current_active_super_admin)
+):
+    """
+    Failed-login throttling: the configured policy, the cluster counters (failed logins,
+    lockouts and rejected attempts by email/IP) and the current lockouts. Requires Redis.
+    """
+    counters = {name: value for name, value in metrics.snapshot().items() if name.startswith("login_throttle.")}
+    return {
+        "policy": login_throttle.policy(),
+        "counters": counters,
+        "lockouts": login_throttle.active_lockouts(limit),
+    }
+
+
+@router.delete("/login-throttle/{kind}/{value}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_login_lockout(
+    kind: str = Path(..., pattern="^(email|ip)$"),
+    value: str = Path(...),
+    current_user: Principal = Depends(get_current_active_super_admin)
+):
+    """Lifts a lockout early (e.g. a locked-out user confirmed by support)."""
+    if not login_throttle.unlock(kind, value):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No such lockout.")
+    logger.info(f"Super admin {current_user.email} lifted login lockout {kind} '{value}'.")
@@ -9,14 +9,14 @@ from typing import List, Optional # Import Optional for update schema
 from app import models, schemas, database
 
 # --- Import Dependencies and Settings ---
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, Principal
 from app.config import settings
 
 # --- Import Models and Schemas ---
 from app.models.tenant import Tenant as TenantModel
 from app.models.service import Service as ServiceModel
-from app.models.user import User
 from app.schemas.service import ServiceCreate, ServiceOut, ServiceUpdate # Ensure ServiceUpdate exists
+from app.services.reminder_schedule import reschedule_service_reminders
 
 router = APIRouter(
     prefix="/services",
@@ -24,7 +24,7 @@ router = APIRouter(
 )
 
 # --- Helper Function for Permission Checks ---
-def check_service_permission(current_user: User, service: ServiceModel, action: str = "access"):
+def check_service_permission(current_user: Principal, service: ServiceModel, action: str = "access"):
     """Checks if the current user has permission to access/modify a service."""
     if current_user.role == "super_admin":
         print(f"[Permission Check] Super admin ({current_user.email}) granted for {action} on Service ID {service.id}.")
@@ -46,7 +46,7 @@ def check_service_permission(current_user: User, service: ServiceModel, action:
 def create_service(
     service_data: ServiceCreate,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     print(f"[Create Service] User: {current_user.email}, Role: {current_user.role}, User Tenant: {current_user.tenant_id}")
 
@@ -107,7 +107,7 @@ def create_service(
 @router.get("/", response_model=List[ServiceOut])
 def get_services(
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     # skip: int = 0, limit: int = 100 # Add pagination later
 ):
     print(f"[Get Services] User: {current_user.email}, Role: {current_user.role}, Tenant: {current_user.tenant_id}")
@@ -133,7 +133,7 @@ def get_services(
 def get_service_by_id(
     service_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     print(f"[Get Service ID: {service_id}] User: {current_user.email}, Role: {current_user.role}")
     service = db.query(ServiceModel).filter(ServiceModel.id == service_id).first()
@@ -153,7 +153,7 @@ def update_service(
     service_id: int,
     update_data: ServiceUpdate, # Use the specific update schema
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     print(f"[Update Service ID: {service_id}] User: {current_user.email}, Role: {current_user.role}")
     service = db.query(ServiceModel).filter(ServiceModel.id == service_id).first()
@@ -182,9 +182,13 @@ def update_service(
     if "tenant_id" in update_data_dict:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot change the tenant of a service.")
 
+    offsets_changed = "reminder_offsets_hours" in update_data_dict and update_data_dict["reminder_offsets_hours"] != service.reminder_offsets_hours
     for field, value in update_data_dict.items():
         setattr(service, field, value)
 
+    if offsets_changed:
+        reschedule_service_reminders(db, service) # Upcoming appointments with this service follow the new offsets
+
     try:
         db.commit()
         db.refresh(service)
@@ -199,7 +203,7 @@ def update_service(
 def delete_service(
     service_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     service = db.query(ServiceModel).filter(ServiceModel.id == service_id).first()
 
@@ -257,8 +261,8 @@ def get_services_for_request_tenant(
     Retrieves services for the tenant identified by subdomain query parameter.
     Intended for public booking pages. NO AUTHENTICATION REQUIRED.
     """
-    from app.dependencies import resolve_tenant_by_subdomain
-    tenant = resolve_tenant_by_subdomain(subdomain, db)
+    from app.dependencies import resolve_tenant_snapshot
+    tenant = resolve_tenant_snapshot(subdomain, db) # Cached; no tenants query on a warm cache
     print(f"[Get Services /tenant] Found Tenant ID: {tenant.id} for subdomain {subdomain}")
 
     services = db.query(ServiceModel).filter(ServiceModel.tenant_id == tenant.id).all()
@@ -14,13 +14,14 @@ from app.schemas.invitation import (
     InvitationCreate, InvitationOut, InvitationAccept, ValidateTokenResponseSchema
 )
 from app.schemas.user import UserOut # For accept invitation response
-from app.dependencies import get_current_user # Assuming this checks for active user by default
-# If get_current_user doesn't check is_active, you might need a get_current_active_user
-from app.services import email_service # Assuming your email_service is here
+from app.dependencies import get_current_user, Principal, password_hashing_busy_exception # Rejects deactivated users and suspended tenants
+from app.services import password_hashing, principal_cache
+from app.services.password_hashing import PasswordHashingBusy
+from app.services import outbox # Invitation emails are written in the invitation transaction
+from app.tasks.outbox_tasks import kick_dispatcher
 from app.utils import permissions # Your permissions helpers
 from app.utils.jwt_utils import create_access_token # For login after accepting invite
 from app.core.config import settings # For FRONTEND_URL if constructing links
-from passlib.context import CryptContext # For hashing password
 from app.utils.cookie_utils import get_cookie_domain_attribute
 from app.utils.permissions import is_admin, is_super_admin, can_edit_user # Import your permission checks
 
@@ -32,10 +33,12 @@ router = APIRouter(
     tags=["Staff & Invitations"]
 )
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    """bcrypt in the password hashing pool; 429 when it is saturated."""
+    try:
+        return password_hashing.hash_password(password)
+    except PasswordHashingBusy as e:
+        raise password_hashing_busy_exception(e)
 
 def generate_secure_token(length: int = 32) -> str:
     return secrets.token_urlsafe(length)
@@ -43,10 +46,10 @@ def generate_secure_token(length: int = 32) -> str:
 # --- Invitation Endpoints ---
 
 @router.post("/invitations", response_model=schemas.invitation.InvitationOut, status_code=status.HTTP_201_CREATED)
-async def invite_staff_member( # Made async to use await for email
+def invite_staff_member( # Sync: the email goes through the outbox, no awaits left
     invitation_data: schemas.invitation.InvitationCreate,
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Allows a Tenant Admin or Super Admin to invite a new staff member to their tenant.
@@ -120,15 +123,16 @@ async def invite_staff_member( # Made async to use await for email
     # Construct activation link (ensure FRONTEND_URL is in your settings)
     # Example: FRONTEND_URL = "http://localhost:3000" or "https://tenant.pamplia.com"
     # The frontend route for accepting invitations needs to be defined, e.g., /accept-invitation
-    tenant_subdomain = current_user.tenant.subdomain if hasattr(current_user.tenant, 'subdomain') else None
+    inviting_tenant = db.query(TenantModel).filter(TenantModel.id == current_user.tenant_id).first() # current_user is a cached Principal, not the ORM User
+    tenant_subdomain = inviting_tenant.subdomain if inviting_tenant else None
     protocol = "https" if settings.environment == "production" else "http"
     activation_link = f"{protocol}://{tenant_subdomain}.{settings.base_domain}/accept-invitation?token={db_invitation.invitation_token}"
     
-    email_subject = f"You're invited to join {current_user.tenant.name} on Pamplia" # Tenant name from relationship
+    email_subject = f"You're invited to join {inviting_tenant.name} on Pamplia" # Tenant name from relationship
     # Create a simple HTML body or use a template rendering engine
     html_body = f"""
     <p>Hello {invitation_data.first_name or invitation_data.email},</p>
-    <p>You have been invited by {current_user.name} to join the team for <strong>{current_user.tenant.name}</strong> on Pamplia as a {db_invitation.role_to_assign}.</p>
+    <p>You have been invited by {current_user.name} to join the team for <strong>{inviting_tenant.name}</strong> on Pamplia as a {db_invitation.role_to_assign}.</p>
     <p>Please click the link below to accept your invitation and set up your account. This link will expire in {settings.invitation_expiry_hours or 48} hours.</p>
     <p>
         <a href="{activation_link}" style="display:inline-block;padding:10px 20px;background-color:#2563eb;color:#fff;text-decoration:none;border-radius:5px;font-weight:bold;">
@@ -139,29 +143,21 @@ async def invite_staff_member( # Made async to use await for email
     <p>Thanks,<br>The Pamplia Team</p>
     """
     
-    # Fetch tenant for reply-to (already available via current_user.tenant)
-    email_sent = await email_service.send_email(
+    # Queued in the same transaction as the invitation: no email for an invitation that
+    # failed to save, and no saved invitation whose email is silently lost.
+    outbox.enqueue_email(
+        db,
+        tenant_id=target_tenant_id,
         to_email=db_invitation.email,
         subject=email_subject,
         html_body=html_body,
-        tenant=current_user.tenant, # Pass the tenant object
-        # reply_to_email=current_user.tenant.contact_email # Or let send_email handle defaults
+        user_id=current_user.id,
     )
 
-    if not email_sent:
-        # If email fails, should we roll back the invitation creation?
-        # For now, let's assume the invitation is created, but admin might need to resend.
-        # Or, raise an error if email is critical for the flow to proceed.
-        # For a robust system, if email fails, the invite might be marked as "pending_email_send_failed"
-        # Or raise 500:
-        # db.rollback() # If you want to undo invite creation on email failure
-        logger.error(f"Failed to send invitation email to {db_invitation.email} for tenant {target_tenant_id}. Invitation created but email failed.")
-        # Raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Invitation created, but failed to send email.")
-        # For now, proceed with invite creation, admin can resend.
-
     try:
         db.commit()
         db.refresh(db_invitation)
+        kick_dispatcher()
         router.status_code = status_to_return # Set status code for response here if needed for FastAPI test client
         return db_invitation
     except Exception as e:
@@ -171,7 +167,7 @@ async def invite_staff_member( # Made async to use await for email
 
 
 @router.post("/invitations/accept", response_model=schemas.token.TokenUserResponse) # Using TokenUserResponse from auth schemas
-async def accept_staff_invitation(
+def accept_staff_invitation( # Sync: sync DB + bcrypt pool wait, runs on the threadpool
     invitation_accept_data: schemas.invitation.InvitationAccept,
     response: Response, # FastAPI Response object injected
     db: Session = Depends(database.get_db)
@@ -285,7 +281,7 @@ def list_tenant_invitations(
     limit: int = Query(20, ge=1, le=100),
     status_filter: Optional[InvitationStatusEnum] = Query(None, alias="status"),
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     if not current_user.tenant_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not associated with a tenant.")
@@ -319,10 +315,10 @@ def list_tenant_invitations(
 
 
 @router.post("/invitations/{invitation_id}/resend", response_model=InvitationOut)
-async def resend_staff_invitation( # Made async for email
+def resend_staff_invitation( # Sync: the email goes through the outbox
     invitation_id: int,
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     if not current_user.tenant_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not associated with a tenant.")
@@ -344,13 +340,14 @@ async def resend_staff_invitation( # Made async for email
     invitation.token_expiry = datetime.now(pytimezone.utc) + timedelta(hours=settings.invitation_expiry_hours or 48)
     
     # Resend email
-    tenant_subdomain = current_user.tenant.subdomain if hasattr(current_user.tenant, 'subdomain') else None
+    inviting_tenant = db.query(TenantModel).filter(TenantModel.id == current_user.tenant_id).first() # current_user is a cached Principal, not the ORM User
+    tenant_subdomain = inviting_tenant.subdomain if inviting_tenant else None
     protocol = "https" if settings.environment == "production" else "http"
     activation_link = f"{protocol}://{tenant_subdomain}.{settings.base_domain}/accept-invitation?token={invitation.invitation_token}"
-    email_subject = f"Reminder: You're invited to join {current_user.tenant.name} on Pamplia"
+    email_subject = f"Reminder: You're invited to join {inviting_tenant.name} on Pamplia"
     html_body = f"""
     <p>Hello {invitation.first_name or invitation.email},</p>
-    <p>This is a reminder for your invitation to join <strong>{current_user.tenant.name}</strong> on Pamplia as a {invitation.role_to_assign}.</p>
+    <p>This is a reminder for your invitation to join <strong>{inviting_tenant.name}</strong> on Pamplia as a {invitation.role_to_assign}.</p>
     <p>Please click the button below to accept. This new link will expire in {settings.invitation_expiry_hours or 48} hours.</p>
     <p>
         <a href="{activation_link}" style="display:inline-block;padding:10px 20px;background-color:#2563eb;color:#fff;text-decoration:none;border-radius:5px;font-weight:bold;">
@@ -358,21 +355,19 @@ async def resend_staff_invitation( # Made async for email
         </a>
     </p>
     """
-    email_sent = await email_service.send_email(
+    outbox.enqueue_email(
+        db,
+        tenant_id=invitation.tenant_id,
         to_email=invitation.email,
         subject=email_subject,
         html_body=html_body,
-        tenant=current_user.tenant
+        user_id=current_user.id,
     )
-    if not email_sent:
-        logger.error(f"Failed to resend invitation email for ID {invitation_id}.")
-        # Don't rollback token changes, admin can try again.
-        # Or, raise an error indicating email failure.
-        # For now, we proceed as token is updated.
 
     try:
         db.commit()
         db.refresh(invitation)
+        kick_dispatcher()
         return invitation
     except Exception as e:
         db.rollback()
@@ -383,7 +378,7 @@ async def resend_staff_invitation( # Made async for email
 def cancel_staff_invitation(
     invitation_id: int,
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     if not current_user.tenant_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not associated with a tenant.")
@@ -418,7 +413,7 @@ def update_staff_status(
     staff_user_id: int,
     status_update: schemas.user.UserStatusUpdate, # New schema: { is_active: bool }
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     if not current_user.tenant_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not associated with a tenant.")
@@ -442,6 +437,7 @@ def update_staff_status(
     
     try:
         db.commit()
+        principal_cache.invalidate_user(target_staff_user.email) # Deactivation takes effect on their next request
         db.refresh(target_staff_user)
         return target_staff_user
     except Exception as e:
@@ -8,11 +8,10 @@ from typing import List, Optional
 import logging
 
 from app import database, models, schemas
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, Principal
 from app.config import settings
 from app.models.tag import Tag as TagModel
 from app.models.tenant import Tenant as TenantModel
-from app.models.user import User
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -57,7 +56,7 @@ def get_tenant_id_from_request(request: Request, db: Session) -> int:
 
 
 # --- Helper Function for Tag Permissions ---
-def check_tag_permission(current_user: User, tag: TagModel, action: str = "access"):
+def check_tag_permission(current_user: Principal, tag: TagModel, action: str = "access"):
     """Checks if the current user has permission to access/modify a tag."""
     # Allow access/view for staff+ roles within the tenant initially
     allowed_view_roles = ["staff", "admin", "super_admin"]
@@ -102,7 +101,7 @@ def get_tag_or_404(db: Session, tag_id: int) -> TagModel:
 def create_tag(
     tag_data: schemas.tag.TagCreate,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     logger.info(f"[Create Tag] User: {current_user.email}, Role: {current_user.role}")
 
@@ -148,7 +147,7 @@ def create_tag(
 @router.get("/", response_model=List[schemas.tag.TagOut])
 def get_tags(
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500)
     # Add filters later if needed (e.g., by name)
@@ -184,7 +183,7 @@ def get_tags(
 def get_tag(
     tag_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     logger.info(f"[Get Tag ID: {tag_id}] User: {current_user.email}")
 
@@ -202,7 +201,7 @@ def update_tag(
     tag_update: schemas.tag.TagUpdate,
     # request: Request, # Optional: For extra subdomain check
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     logger.info(f"[Update Tag ID: {tag_id}] User: {current_user.email}")
 
@@ -254,7 +253,7 @@ def delete_tag(
     tag_id: int,
     # request: Request, # Optional: For extra subdomain check
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     logger.info(f"[Delete Tag ID: {tag_id}] User: {current_user.email}")
 
@@ -8,11 +8,11 @@ from typing import List
 
 # Core App Imports (Adjust paths if necessary)
 from app import database, models, schemas
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, Principal
 from app.models.tenant import Tenant as TenantModel # Needed for context/permissions
-from app.models.user import User as UserModel
 from app.models.template import Template as TemplateModel # The main model for this router
 from app.schemas.template import TemplateCreate, TemplateOut, TemplateUpdate # Schemas
+from app.services import template_cache # Cached lookups/compiled templates must be dropped on every write
 
 import logging
 logger = logging.getLogger(__name__)
@@ -24,7 +24,7 @@ router = APIRouter(
 
 # --- Dependency for Admin/SuperAdmin Check ---
 # (Could be moved to app/api/deps.py)
-def get_current_active_admin_or_super(current_user: UserModel = Depends(get_current_user)) -> UserModel:
+def get_current_active_admin_or_super(current_user: Principal = Depends(get_current_user)) -> Principal:
     """
     Dependency ensuring user is authenticated and has 'admin' or 'super_admin' role.
     """
@@ -48,7 +48,7 @@ def get_current_active_admin_or_super(current_user: UserModel = Depends(get_curr
 )
 def list_templates(
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_active_admin_or_super) # Get authorized user
+    current_user: Principal = Depends(get_current_active_admin_or_super) # Get authorized user
 ):
     """
     Retrieves a list of all templates for the current user's tenant.
@@ -71,7 +71,7 @@ def list_templates(
 def create_template(
     template_data: TemplateCreate,
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_active_admin_or_super) # Ensure creator is admin/super
+    current_user: Principal = Depends(get_current_active_admin_or_super) # Ensure creator is admin/super
 ):
     """
     Creates a new template for the current user's tenant.
@@ -108,6 +108,7 @@ def create_template(
         db.add(db_template)
         db.commit()
         db.refresh(db_template)
+        template_cache.invalidate_lookup(tenant_id, db_template.event_trigger) # Drop a cached "use default"
         logger.info(f"Template '{db_template.name}' (ID: {db_template.id}) created successfully for Tenant ID: {tenant_id}")
         return db_template
     except SQLAlchemyExceptions.IntegrityError as e:
@@ -128,7 +129,7 @@ def create_template(
 def read_template(
     template_id: int,
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_active_admin_or_super) # Permission check
+    current_user: Principal = Depends(get_current_active_admin_or_super) # Permission check
 ):
     """
     Retrieves details for a specific template by ID.
@@ -157,7 +158,7 @@ def update_template(
     template_id: int,
     update_data: TemplateUpdate,
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_active_admin_or_super) # Permission check
+    current_user: Principal = Depends(get_current_active_admin_or_super) # Permission check
 ):
     """
     Updates an existing template by ID.
@@ -188,6 +189,7 @@ def update_template(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No update data provided.")
 
     logger.debug(f"Update payload for Template ID {template_id}: {update_data_dict}")
+    template_cache.invalidate_template(template) # Keyed by the current updated_at, so before any change
     update_occurred = False
     for field, value in update_data_dict.items():
         if hasattr(template, field) and getattr(template, field) != value:
@@ -205,6 +207,7 @@ def update_template(
     try:
         db.commit()
         db.refresh(template)
+        template_cache.invalidate_lookup(template.tenant_id, template.event_trigger) # Again, in case a send re-cached the old row
         logger.info(f"Template ID: {template_id} updated successfully by user {current_user.email}.")
         return template
     except Exception as e:
@@ -221,7 +224,7 @@ def update_template(
 def delete_template(
     template_id: int,
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_active_admin_or_super) # Permission check
+    current_user: Principal = Depends(get_current_active_admin_or_super) # Permission check
 ):
     """
     Deletes a template by ID.
@@ -247,8 +250,10 @@ def delete_template(
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot delete system default templates.")
 
     try:
+        template_cache.invalidate_template(template)
         db.delete(template)
         db.commit()
+        template_cache.invalidate_lookup(current_user.tenant_id, template.event_trigger) # Again, in case a send re-cached the old row
         logger.info(f"Template ID: {template_id} deleted successfully by user {current_user.email}.")
         # Return None for 204 response
         return None # FastAPI handles the 204 status code
@@ -3,15 +3,15 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request # Request potentially needed for other endpoints or future logging
 from sqlalchemy.orm import Session
-from sqlalchemy import exc as SQLAlchemyExceptions, func, select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import exc as SQLAlchemyExceptions, func, and_, or_
 from typing import List
 from datetime import datetime, timezone, timedelta
 import re
 
 # Core App Imports (Adjust paths if necessary)
 from app import database, models, schemas
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, Principal
+from app.config import settings
 from app.models.tenant import Tenant as TenantModel
 from app.models.user import User as UserModel
 from app.schemas.tenant import (
@@ -23,24 +23,34 @@ from app.schemas.tenant import (
     TenantPaymentRecordOut,
 )
 from app.models.appointment import Appointment as AppointmentModel
+from app.models.appointment_reminder import AppointmentReminder as AppointmentReminderModel, ReminderOutcome
 from app.models.client import Client as ClientModel
 from app.models.service import Service as ServiceModel
 from app.models.association_tables import appointment_services_table
 from app.schemas.enums import AppointmentStatus
 from app.models.finance import TenantPaymentRecord
 from app.models.communications_log import CommunicationsLog, CommunicationType, CommunicationStatus
-from app.models.template import TemplateEventTrigger
-from app.services.notification_service import send_appointment_notification
+from app.services import availability_cache
+from app.services import admin_digest
+from app.services import principal_cache
+from app.services import tenant_cache
+from app.services.business_hours import invalidate_tenant_schedule, stamp_schedule_version
+from app.services.reminder_schedule import REMINDABLE_STATUSES, reschedule_tenant_reminders, tenant_reminder_offsets
 import logging 
-import asyncio
+
+# Tenant fields that feed into /availability; changing any of them drops the tenant's cached slots
+AVAILABILITY_FIELDS = {"business_hours_config", "timezone"}
+# Tenant fields that define reminder offsets; changing any of them reschedules upcoming reminders
+REMINDER_FIELDS = {"reminder_interval_hours", "reminder_offsets_hours"}
+# Tenant fields kept in the public subdomain -> tenant cache (app/services/tenant_cache.py)
+SNAPSHOT_FIELDS = {"name", "subdomain", "timezone", "business_hours_config", "is_active"}
 
 # --- Setup logger ---
 logger = logging.getLogger(__name__)
-REMINDER_CHECK_BUFFER_MINUTES = 10
 
 # --- Dependency for Super Admin Check ---
 # (Ensure this exists in app/api/deps.py)
-def get_current_active_super_admin(current_user: UserModel = Depends(get_current_user)) -> UserModel:
+def get_current_active_super_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
     """
     Dependency that ensures the current user is authenticated AND is a super_admin.
     """
@@ -105,6 +115,7 @@ def create_tenant(
         # slogan=tenant_data.slogan,
         # Remaining fields will use DB defaults or be NULL
     )
+    stamp_schedule_version(db_tenant)
 
     try:
         db.add(db_tenant)
@@ -146,18 +157,17 @@ def get_all_tenants(db: Session = Depends(database.get_db)):
     response_model=TenantOut
 )
 def read_tenant_me(
-    # db session might not be strictly needed if relationship is loaded, but keep for consistency
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_user) # Ensures user is authenticated
+    current_user: Principal = Depends(get_current_user) # Ensures user is authenticated
 ):
     """
     Retrieves the details of the tenant associated with the currently
     authenticated user (staff, admin, or super_admin).
-    Relies solely on the authenticated user's tenant relationship.
+    Relies solely on the authenticated user's tenant_id.
     """
     logger.info(f"User {current_user.email} (ID: {current_user.id}, Role: {current_user.role}) requesting own tenant details via /me.")
 
-    tenant = current_user.tenant # Access tenant via relationship
+    tenant = db.query(TenantModel).filter(TenantModel.id == current_user.tenant_id).first() # current_user is a cached Principal
 
     if not tenant:
         logger.error(f"Data Integrity Issue: User {current_user.email} (ID: {current_user.id}) has no associated tenant in DB.")
@@ -178,13 +188,13 @@ def read_tenant_me(
 def update_tenant_me(
     update_data: TenantUpdate, # Use the specific update schema
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_user) # Ensures authenticated
+    current_user: Principal = Depends(get_current_user) # Ensures authenticated
 ):
     """
     Updates the details of the tenant associated with the currently
     authenticated user. Requires 'admin' role for the tenant, or 'super_admin'.
     Staff role is explicitly denied.
-    Relies solely on the authenticated user's tenant relationship.
+    Relies solely on the authenticated user's tenant_id.
     """
     logger.info(f"User {current_user.email} (ID: {current_user.id}, Role: {current_user.role}) attempting to update own tenant settings via /me.")
 
@@ -197,7 +207,7 @@ def update_tenant_me(
          )
 
     # --- Get Tenant to Update (Must be the user's own tenant) ---
-    tenant_to_update = current_user.tenant
+    tenant_to_update = db.query(TenantModel).filter(TenantModel.id == current_user.tenant_id).first()
 
     if not tenant_to_update:
         logger.error(f"User {current_user.email} (Role: {current_user.role}) has no associated tenant to update via /me endpoint.")
@@ -219,6 +229,7 @@ def update_tenant_me(
 
     logger.debug(f"Update payload for Tenant ID {tenant_to_update.id}: {update_data_dict}")
     update_occurred = False
+    changed_fields = set()
     for field, value in update_data_dict.items():
         # Prevent updating critical/immutable fields like subdomain via this endpoint
         if field in ["subdomain", "id", "is_active"]: # 'name' might be updatable depending on policy
@@ -232,6 +243,7 @@ def update_tenant_me(
                 setattr(tenant_to_update, field, value)
                 logger.debug(f"Updating field '{field}' for Tenant ID {tenant_to_update.id}.")
                 update_occurred = True
+                changed_fields.add(field)
             # else: logger.debug(f"Field '{field}' provided but value is unchanged.") # Optional: log unchanged
         else:
              logger.warning(f"Field '{field}' in update payload does not exist on Tenant model.")
@@ -240,11 +252,25 @@ def update_tenant_me(
         logger.info(f"No actual changes applied to Tenant ID: {tenant_to_update.id}.")
         return tenant_to_update # Return current data
 
+    if changed_fields & AVAILABILITY_FIELDS:
+        stamp_schedule_version(tenant_to_update)
+    # Upcoming reminders follow the new interval (same transaction as the setting itself)
+    if changed_fields & REMINDER_FIELDS:
+        reschedule_tenant_reminders(db, tenant_to_update)
+    # Switching admin digests on/off starts or forgets the digest window
+    if "admin_digest_interval_minutes" in changed_fields:
+        admin_digest.apply_digest_setting(tenant_to_update)
+
     # --- Commit and Return ---
     try:
         db.commit()
         db.refresh(tenant_to_update)
         logger.info(f"Tenant ID: {tenant_to_update.id} updated successfully by user {current_user.email}.")
+        if changed_fields & AVAILABILITY_FIELDS:
+            invalidate_tenant_schedule(tenant_to_update.id)
+            availability_cache.invalidate_tenant(tenant_to_update.id)
+        if changed_fields & SNAPSHOT_FIELDS:
+            tenant_cache.invalidate_subdomain(tenant_to_update.subdomain)
         return tenant_to_update
     except SQLAlchemyExceptions.IntegrityError as e:
          db.rollback()
@@ -290,6 +316,9 @@ def expire_overdue_tenants(
 
     if updated_count > 0:
         db.commit()
+        for tenant in overdue_tenants:
+            principal_cache.invalidate_tenant(tenant.id) # Suspension applies to logged-in users too
+            tenant_cache.invalidate_subdomain(tenant.subdomain) # ... and to the public booking pages
 
     return {
         "checked_at": now_utc.isoformat(),
@@ -357,13 +386,31 @@ def update_tenant_by_id(
         if existing_subdomain:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Subdomain is already taken.")
 
+    previous_subdomain = tenant.subdomain
+    changed_fields = set()
     for field, value in update_data_dict.items():
         if hasattr(tenant, field):
+            if getattr(tenant, field) != value:
+                changed_fields.add(field)
             setattr(tenant, field, value)
 
+    if changed_fields & AVAILABILITY_FIELDS:
+        stamp_schedule_version(tenant)
+    if changed_fields & REMINDER_FIELDS:
+        reschedule_tenant_reminders(db, tenant)
+    if "admin_digest_interval_minutes" in changed_fields:
+        admin_digest.apply_digest_setting(tenant)
+
     try:
         db.commit()
         db.refresh(tenant)
+        if changed_fields & AVAILABILITY_FIELDS:
+            invalidate_tenant_schedule(tenant.id)
+            availability_cache.invalidate_tenant(tenant.id)
+        if "is_active" in changed_fields:
+            principal_cache.invalidate_tenant(tenant.id)
+        if changed_fields & SNAPSHOT_FIELDS:
+            tenant_cache.invalidate_subdomain(previous_subdomain, tenant.subdomain)
         return tenant
     except SQLAlchemyExceptions.IntegrityError as e:
         db.rollback()
@@ -467,7 +514,7 @@ def create_tenant_payment(
     tenant_id: int,
     payload: TenantPaymentRecordCreate,
     db: Session = Depends(database.get_db),
-    current_user: UserModel = Depends(get_current_active_super_admin),
+    current_user: Principal = Depends(get_current_active_super_admin),
 ):
     tenant = db.query(TenantModel).filter(TenantModel.id == tenant_id).first()
     if not tenant:
@@ -498,6 +545,9 @@ def create_tenant_payment(
         tenant.next_due_at = payload.period_end
 
     db.commit()
+    if payload.activate_tenant:
+        principal_cache.invalidate_tenant(tenant_id)
+        tenant_cache.invalidate_subdomain(tenant.subdomain)
     db.refresh(payment)
     return payment
 
@@ -538,36 +588,54 @@ def get_tenant_reminder_health(
     ).scalar()
 
     interval_hours = tenant.reminder_interval_hours or 0
-    due_now_count = 0
-
-    if interval_hours > 0:
-        reminder_time_utc = now_utc + timedelta(hours=interval_hours)
-        window_start = reminder_time_utc - timedelta(minutes=REMINDER_CHECK_BUFFER_MINUTES)
-        window_end = reminder_time_utc + timedelta(minutes=REMINDER_CHECK_BUFFER_MINUTES)
-
-        recent_sent_subquery = select(CommunicationsLog.appointment_id).where(
-            CommunicationsLog.tenant_id == tenant_id,
-            CommunicationsLog.type == CommunicationType.REMINDER,
-            CommunicationsLog.status == CommunicationStatus.SENT,
-            CommunicationsLog.timestamp >= now_utc - timedelta(hours=interval_hours + 1),
-        ).distinct().subquery()
-
-        due_now_count = db.query(func.count(AppointmentModel.id)).filter(
-            AppointmentModel.tenant_id == tenant_id,
-            AppointmentModel.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
-            AppointmentModel.appointment_time >= window_start,
-            AppointmentModel.appointment_time < window_end,
-            AppointmentModel.id.notin_(select(recent_sent_subquery.c.appointment_id)),
-        ).scalar() or 0
+
+    # Per offset, in one grouped query over recent/pending reminder rows
+    processed_recently = AppointmentReminderModel.sent_at >= last_24h
+    due_unsent = and_(
+        AppointmentReminderModel.sent_at.is_(None),
+        AppointmentReminderModel.due_at <= now_utc,
+        AppointmentModel.appointment_time > now_utc,
+        AppointmentModel.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
+    )
+    failed_recently = and_(processed_recently, AppointmentReminderModel.outcome == ReminderOutcome.FAILED)
+    offset_rows = db.query(
+        AppointmentReminderModel.offset_hours,
+        func.count(AppointmentReminderModel.id).filter(and_(processed_recently, AppointmentReminderModel.outcome == ReminderOutcome.SENT)),
+        func.count(AppointmentReminderModel.id).filter(failed_recently),
+        func.count(AppointmentReminderModel.id).filter(due_unsent), # Normally drained by the every-minute scheduler
+        func.max(AppointmentReminderModel.sent_at).filter(failed_recently),
+    ).join(
+        AppointmentModel, AppointmentModel.id == AppointmentReminderModel.appointment_id
+    ).filter(
+        AppointmentReminderModel.tenant_id == tenant_id,
+        or_(processed_recently, AppointmentReminderModel.sent_at.is_(None)),
+    ).group_by(AppointmentReminderModel.offset_hours).all()
+
+    by_offset = {
+        offset: {"offset_hours": offset, "sent_last_24h": 0, "failed_last_24h": 0, "due_now_count": 0, "last_failure_at": None}
+        for offset in tenant_reminder_offsets(tenant)
+    }
+    for offset, sent_count, failed_count, due_count, last_offset_failure in offset_rows:
+        by_offset[offset] = {
+            "offset_hours": offset,
+            "sent_last_24h": int(sent_count or 0),
+            "failed_last_24h": int(failed_count or 0),
+            "due_now_count": int(due_count or 0),
+            "last_failure_at": last_offset_failure.isoformat() if last_offset_failure else None,
+        }
+    offsets_health = [by_offset[offset] for offset in sorted(by_offset, reverse=True)]
+    due_now_count = sum(item["due_now_count"] for item in offsets_health)
 
     return {
         "tenant_id": tenant_id,
         "checked_at": now_utc.isoformat(),
         "reminder_interval_hours": interval_hours,
+        "reminder_offsets_hours": tenant_reminder_offsets(tenant),
         "sent_last_24h": int(sent_last_24h),
         "failed_last_24h": int(failed_last_24h),
         "due_now_count": int(due_now_count),
         "last_failure_at": last_failure_at.isoformat() if last_failure_at else None,
+        "offsets": offsets_health,
     }
 
 
@@ -601,58 +669,42 @@ def retry_failed_reminders(
 
     safe_hours_back = max(1, min(hours_back, 168))
     safe_limit = max(1, min(limit, 100))
-    window_start = datetime.now(timezone.utc) - timedelta(hours=safe_hours_back)
-
-    failed_logs = db.query(CommunicationsLog).filter(
-        CommunicationsLog.tenant_id == tenant_id,
-        CommunicationsLog.type == CommunicationType.REMINDER,
-        CommunicationsLog.status == CommunicationStatus.FAILED,
-        CommunicationsLog.timestamp >= window_start,
-        CommunicationsLog.appointment_id.isnot(None),
-    ).order_by(CommunicationsLog.timestamp.desc()).limit(safe_limit * 3).all()
-
-    retry_appointment_ids = []
-    seen = set()
-    for log in failed_logs:
-        if log.appointment_id and log.appointment_id not in seen:
-            seen.add(log.appointment_id)
-            retry_appointment_ids.append(log.appointment_id)
-        if len(retry_appointment_ids) >= safe_limit:
-            break
-
-    success_count = 0
-    failure_count = 0
-
-    for appointment_id in retry_appointment_ids:
-        appointment = db.query(AppointmentModel).filter(
-            AppointmentModel.id == appointment_id,
-            AppointmentModel.tenant_id == tenant_id,
-        ).options(
-            joinedload(AppointmentModel.client),
-            joinedload(AppointmentModel.tenant),
-            joinedload(AppointmentModel.services),
-        ).first()
+    now_utc = datetime.now(timezone.utc)
+    window_start = now_utc - timedelta(hours=safe_hours_back)
 
-        if not appointment:
-            failure_count += 1
-            continue
+    # The failed reminder rows are re-opened rather than re-sent here: the reminder pipeline
+    # sends them again and records the new outcome on the row, so /reminders/health follows.
+    failed_reminders = db.query(
+        AppointmentReminderModel, AppointmentModel.appointment_time, AppointmentModel.status
+    ).join(
+        AppointmentModel, AppointmentModel.id == AppointmentReminderModel.appointment_id
+    ).filter(
+        AppointmentReminderModel.tenant_id == tenant_id,
+        AppointmentReminderModel.outcome == ReminderOutcome.FAILED,
+        AppointmentReminderModel.sent_at >= window_start,
+    ).order_by(AppointmentReminderModel.sent_at.desc()).limit(safe_limit).all()
+
+    reopened_ids = []
+    for reminder, appointment_time, appointment_status in failed_reminders:
+        if appointment_time <= now_utc or appointment_status not in REMINDABLE_STATUSES:
+            continue # Too late to remind: stays FAILED
+        reminder.sent_at = None
+        reminder.outcome = None
+        reminder.claimed_until = now_utc + timedelta(seconds=settings.reminder_claim_seconds) # Queued below, not by the next scan
+        reopened_ids.append(reminder.id)
+    db.commit()
 
+    if reopened_ids:
+        from app.tasks.appointment_tasks import send_reminder_chunk
         try:
-            asyncio.run(send_appointment_notification(
-                db=db,
-                appointment=appointment,
-                event_trigger=TemplateEventTrigger.APPOINTMENT_REMINDER_CLIENT,
-            ))
-            db.commit()
-            success_count += 1
-        except Exception:
-            db.rollback()
-            failure_count += 1
+            send_reminder_chunk.apply_async(args=[reopened_ids, None], queue='reminders', routing_key='reminders.send')
+        except Exception as e:
+            logger.warning(f"Could not queue retried reminders of tenant {tenant_id} (the next scheduler run sends them): {e}")
 
     return {
         "tenant_id": tenant_id,
-        "attempted": len(retry_appointment_ids),
-        "sent": success_count,
-        "failed": failure_count,
+        "attempted": len(failed_reminders),
+        "queued": len(reopened_ids),
+        "failed": len(failed_reminders) - len(reopened_ids),
         "hours_back": safe_hours_back,
     }
@@ -4,8 +4,9 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app import models, schemas, database
 from app.models.user import User
-from passlib.context import CryptContext
-from app.dependencies import get_current_user, get_current_tenant_id
+from app.dependencies import get_current_user, get_current_tenant_id, Principal, password_hashing_busy_exception
+from app.services import password_hashing, principal_cache
+from app.services.password_hashing import PasswordHashingBusy
 from app.utils.permissions import can_edit_user, is_super_admin, is_admin, is_staff
 from typing import List, Optional
 from app.schemas.pagination import PaginatedResponse # Ensure this is imported
@@ -16,19 +17,20 @@ router = APIRouter(
     tags=["Users"]
 )
 
-# Set up bcrypt hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 ITEMS_PER_PAGE = 10  # Default items per page
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    """bcrypt in the password hashing pool; 429 when it is saturated."""
+    try:
+        return password_hashing.hash_password(password)
+    except PasswordHashingBusy as e:
+        raise password_hashing_busy_exception(e)
 
 @router.post("/", response_model=schemas.user.UserOut)
 def create_user(
     user: schemas.user.UserCreate,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     if not (current_user.role in ["admin", "super_admin"]):
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -58,7 +60,7 @@ def update_user(
     user_id: int,
     update_data: schemas.user.UserUpdate,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
@@ -71,10 +73,12 @@ def update_user(
     if "tenant_id" in update_data.model_dump():
         raise HTTPException(status_code=400, detail="Cannot update tenant_id")
 
+    previous_email = user.email
     for field, value in update_data.model_dump(exclude_unset=True).items():
         setattr(user, field, value)
 
     db.commit()
+    principal_cache.invalidate_user(previous_email, user.email) # Role, active flag or email may have changed
     db.refresh(user)
     return user
 
@@ -83,7 +87,7 @@ def reset_user_password(
     user_id: int,
     payload: UserPasswordReset,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     target_user = db.query(models.User).filter(models.User.id == user_id).first()
     if not target_user:
@@ -97,14 +101,21 @@ def reset_user_password(
     return {"detail": "Password reset successfully"}
 
 @router.get("/profile", response_model=schemas.user.UserOut)
-def get_profile(current_user: User = Depends(get_current_user)):
-    return current_user  # The `current_user` will be automatically mapped to UserOut schema
+def get_profile(
+    db: Session = Depends(database.get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    # current_user is a cached Principal; UserOut also needs the timestamps, so load the row
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
 @router.delete("/{user_id}")
 def delete_user(
     user_id: int,
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     target_user = db.query(User).filter(User.id == user_id).first()
     if not target_user:
@@ -124,12 +135,13 @@ def delete_user(
     # Super admin can delete anyone
     db.delete(target_user)
     db.commit()
+    principal_cache.invalidate_user(target_user.email)
     return {"detail": "User deleted successfully"}
 
 @router.get("/", response_model=PaginatedResponse[UserOut]) # UPDATED response_model
 def get_all_users_paginated( # Renamed for clarity, or keep original name
     db: Session = Depends(database.get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(ITEMS_PER_PAGE, ge=1, le=100), # Use constant or default
     role: Optional[str] = Query(None),
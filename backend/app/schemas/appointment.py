@@ -40,6 +40,7 @@ class AppointmentCreate(BaseModel): # Does not inherit from AppointmentBase anym
     client_phone: Optional[str] = None # Add phone if using in lookup/create
     appointment_time: datetime
     service_ids: List[int] = Field(..., min_items=1) # Ensure at least one service
+    hold_id: Optional[str] = None # Slot hold from POST /availability/holds, consumed on success
 
 
 # AppointmentOut now includes the nested Client object
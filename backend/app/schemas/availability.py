@@ -1,7 +1,7 @@
 # app/schemas/availability.py
-from pydantic import BaseModel
-from typing import List
-from datetime import date # For date_checked
+from pydantic import BaseModel, Field
+from typing import List, Dict, Optional
+from datetime import date, datetime # For date_checked
 
 class AvailabilityResponse(BaseModel):
     available_slots: List[str] # List of "HH:MM" strings
@@ -9,3 +9,39 @@ class AvailabilityResponse(BaseModel):
     timezone_queried: str      # The tenant's timezone string (e.g., "America/New_York")
     # Optional: could include total duration of services checked for context
     # services_duration_minutes: int 
+
+
+class AvailabilityRangeResponse(BaseModel):
+    start_date: date
+    end_date: date             # Inclusive
+    timezone_queried: str
+    mode: str                  # "slots" | "summary"
+    # Exactly one of these is filled depending on mode
+    available_slots: Optional[Dict[date, List[str]]] = None # date -> ["HH:MM", ...]
+    slot_counts: Optional[Dict[date, int]] = None           # date -> number of free slots
+
+
+class NextAvailableSlot(BaseModel):
+    local_date: date           # Tenant-local date of the slot
+    local_time: str            # "HH:MM" in the tenant's timezone
+    start_utc: datetime        # Exact start, usable as appointment_time when booking
+
+
+class NextAvailabilityResponse(BaseModel):
+    slots: List[NextAvailableSlot] # Earliest free slots first, at most `limit`
+    timezone_queried: str
+    searched_from: date
+    searched_through: Optional[date] = None # Last day actually examined
+    search_complete: bool      # False if the latency budget stopped the search before max_days
+
+
+class SlotHoldCreate(BaseModel):
+    service_ids: List[int] = Field(..., min_length=1)
+    start_time: datetime       # Slot start (timezone-aware; naive values are treated as UTC)
+
+
+class SlotHoldOut(BaseModel):
+    hold_id: str               # Pass back as hold_id when booking (and to /availability/ to keep seeing the slot)
+    start_utc: datetime
+    end_utc: datetime
+    expires_at: datetime
@@ -1,11 +1,18 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+
+from app.schemas.tenant import validate_reminder_offsets
 
 class ServiceBase(BaseModel):
     name: str
     description: Optional[str] = None
     duration_minutes: int
     price: float
+    reminder_offsets_hours: Optional[List[int]] = Field(
+        None, description="Reminder offsets (hours) for appointments including this service; null uses the tenant's."
+    )
+
+    _check_reminder_offsets = field_validator('reminder_offsets_hours')(validate_reminder_offsets)
 
 class ServiceCreate(ServiceBase):
     tenant_id: Optional[int] = None
@@ -1,10 +1,26 @@
 # app/schemas/tenant.py
 # --- MODIFIED ---
 
-from pydantic import BaseModel, Field, EmailStr, HttpUrl
-from typing import Optional, Dict, Any, Union # Added Dict, Any, Union for JSON fields
+from pydantic import BaseModel, Field, EmailStr, HttpUrl, field_validator
+from typing import Optional, Dict, Any, List, Union # Added Dict, Any, Union for JSON fields
 from datetime import datetime
 
+MAX_REMINDER_OFFSETS = 5
+MAX_REMINDER_OFFSET_HOURS = 336 # Two weeks
+
+
+def validate_reminder_offsets(value: Optional[List[int]]) -> Optional[List[int]]:
+    """Shared by tenant and service schemas: None keeps the fallback, [] disables reminders."""
+    if value is None:
+        return None
+    offsets = sorted(set(value), reverse=True)
+    if len(offsets) > MAX_REMINDER_OFFSETS:
+        raise ValueError(f"At most {MAX_REMINDER_OFFSETS} reminder offsets are allowed.")
+    if any(offset < 1 or offset > MAX_REMINDER_OFFSET_HOURS for offset in offsets):
+        raise ValueError(f"Reminder offsets must be between 1 and {MAX_REMINDER_OFFSET_HOURS} hours.")
+    return offsets
+
+
 # --- Base Schema ---
 # Defines all fields corresponding to the Tenant model columns
 # Useful for inheritance and internal representation
@@ -46,6 +62,16 @@ class TenantBase(BaseModel):
         None, ge=1, le=168, # Example validation: 1 hour to 1 week (168 hours)
         description="Hours before appointment to send reminder (null or 0 to disable)"
     )
+    reminder_offsets_hours: Optional[List[int]] = Field(
+        None,
+        description="Several reminders, in hours before the appointment (e.g. [48, 2]). Overrides reminder_interval_hours; [] disables reminders."
+    )
+    admin_digest_interval_minutes: Optional[int] = Field(
+        None, ge=15, le=1440,
+        description="Send admins one digest of new bookings/cancellations every N minutes (e.g. 60). Null: one email per booking."
+    )
+
+    _check_reminder_offsets = field_validator('reminder_offsets_hours')(validate_reminder_offsets)
 
     # Commercial billing controls (manual cash/bank flow)
     billing_plan: Optional[str] = Field(None, description="starter | growth | pro")
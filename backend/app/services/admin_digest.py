@@ -0,0 +1,155 @@
+# app/services/admin_digest.py
+# --- NEW FILE ---
+#
+# Admin booking digest: instead of one APPOINTMENT_BOOKED_ADMIN email per booking,
+# tenants with admin_digest_interval_minutes set get one email every N minutes
+# listing the window's new bookings and cancellations.
+# A window is [admin_digest_last_sent_at, now - DIGEST_SETTLE_SECONDS): the lag lets
+# booking transactions that started before the cut-off (created_at is the
+# transaction's now()) commit before the window is read. The digest goes out
+# through the outbox (rate limits, retries, ONE CommunicationsLog entry whose notes
+# reference the batch), enqueued in the same transaction that advances the window.
+
+from datetime import datetime, timedelta, timezone as pytimezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.appointment import Appointment
+from app.models.communications_log import CommunicationType
+from app.models.tenant import Tenant
+from app.services import outbox, template_cache
+from app.services.business_hours import get_tenant_schedule
+
+import logging
+logger = logging.getLogger(__name__)
+
+DIGEST_SETTLE_SECONDS = 60
+DIGEST_IDS_IN_LOG = 50 # Appointment ids listed in the log notes before truncating
+DIGEST_TEMPLATE_KEY = "ADMIN_BOOKING_DIGEST"
+
+DIGEST_TEMPLATE = {
+    "subject": "{{ business_name }}: {{ booked|length }} new booking(s), {{ cancelled|length }} cancellation(s)",
+    "body": """<p>Bookings activity for {{ business_name }} between {{ window_start }} and {{ window_end }}.</p>
+               {% if booked %}
+               <p><strong>New bookings ({{ booked|length }})</strong></p>
+               <ul>
+               {% for item in booked %}<li>{{ item.time }} - {{ item.client }}{% if item.email %} ({{ item.email }}){% endif %} - {{ item.services }}</li>
+               {% endfor %}
+               </ul>
+               {% endif %}
+               {% if cancelled %}
+               <p><strong>Cancellations ({{ cancelled|length }})</strong></p>
+               <ul>
+               {% for item in cancelled %}<li>{{ item.time }} - {{ item.client }}{% if item.email %} ({{ item.email }}){% endif %} - {{ item.services }}</li>
+               {% endfor %}
+               </ul>
+               {% endif %}"""
+}
+template_cache.precompile_defaults({DIGEST_TEMPLATE_KEY: DIGEST_TEMPLATE})
+
+
+def digest_enabled(tenant: Tenant) -> bool:
+    return bool(tenant.admin_digest_interval_minutes)
+
+
+def apply_digest_setting(tenant: Tenant) -> None:
+    """
+    Call after admin_digest_interval_minutes changed. Switching digests on starts the first
+    window now (earlier bookings were emailed one by one); switching off forgets the window.
+    Changing the interval while on keeps the current window.
+    """
+    if not digest_enabled(tenant):
+        tenant.admin_digest_last_sent_at = None
+    elif tenant.admin_digest_last_sent_at is None:
+        tenant.admin_digest_last_sent_at = datetime.now(pytimezone.utc)
+
+
+def claim_due_tenants(db: Session, now_utc: datetime) -> List[Tenant]:
+    """Tenants whose digest window is over, locked (SKIP LOCKED) so overlapping runs never double-send."""
+    cutoff = now_utc - timedelta(seconds=DIGEST_SETTLE_SECONDS)
+    # The due check is in SQL so that only due rows are locked (until the run's commit)
+    window_end = Tenant.admin_digest_last_sent_at + func.make_interval(
+        0, 0, 0, 0, 0, Tenant.admin_digest_interval_minutes # years, months, weeks, days, hours, mins
+    )
+    return db.query(Tenant).filter(
+        Tenant.is_active == True,
+        Tenant.admin_digest_interval_minutes.isnot(None),
+        Tenant.admin_digest_last_sent_at.isnot(None),
+        window_end <= cutoff,
+    ).with_for_update(skip_locked=True).all()
+
+
+def window_activity(db: Session, tenant_id: int, start: datetime, end: datetime) -> Tuple[List[Appointment], List[Appointment]]:
+    """(booked, cancelled) in [start, end), from ONE query over the created_at / cancelled_at indexes."""
+    appointments = db.query(Appointment).options(
+        joinedload(Appointment.client),
+        joinedload(Appointment.services),
+    ).filter(
+        Appointment.tenant_id == tenant_id,
+        or_(
+            and_(Appointment.created_at >= start, Appointment.created_at < end),
+            and_(Appointment.cancelled_at >= start, Appointment.cancelled_at < end),
+        ),
+    ).order_by(Appointment.appointment_time).all()
+    booked = [a for a in appointments if start <= a.created_at < end]
+    cancelled = [a for a in appointments if a.cancelled_at is not None and start <= a.cancelled_at < end]
+    return booked, cancelled
+
+
+def _digest_line(appointment: Appointment, tz) -> dict:
+    client = appointment.client
+    return {
+        "time": appointment.appointment_time.astimezone(tz).strftime('%Y-%m-%d %H:%M'),
+        "client": f"{client.first_name or ''} {client.last_name or ''}".strip() if client else "Unknown client",
+        "email": client.email if client else "",
+        "services": ", ".join(s.name for s in appointment.services) or "-",
+    }
+
+
+def _log_notes(start: datetime, end: datetime, booked: List[Appointment], cancelled: List[Appointment]) -> str:
+    def ids(items: List[Appointment]) -> str:
+        listed = ", ".join(str(a.id) for a in items[:DIGEST_IDS_IN_LOG])
+        return listed + (f", ... (+{len(items) - DIGEST_IDS_IN_LOG})" if len(items) > DIGEST_IDS_IN_LOG else "")
+    return (
+        f"Admin booking digest {start.isoformat()} - {end.isoformat()}: "
+        f"{len(booked)} booking(s) [{ids(booked)}], {len(cancelled)} cancellation(s) [{ids(cancelled)}]"
+    )
+
+
+def enqueue_digest(db: Session, tenant: Tenant, now_utc: datetime) -> Optional[int]:
+    """
+    Builds the tenant's digest for the window ending now - DIGEST_SETTLE_SECONDS, adds it to the
+    outbox and advances the window. DOES NOT COMMIT. Returns the number of appointments reported
+    (None if there was nothing to send or nowhere to send it).
+    """
+    start = tenant.admin_digest_last_sent_at
+    end = now_utc - timedelta(seconds=DIGEST_SETTLE_SECONDS)
+    tenant.admin_digest_last_sent_at = end
+
+    booked, cancelled = window_activity(db, tenant.id, start, end)
+    if not booked and not cancelled:
+        return None
+    if not tenant.contact_email:
+        logger.warning(f"Tenant {tenant.id} has admin digests on but no contact email; {len(booked) + len(cancelled)} item(s) dropped.")
+        return None
+
+    tz = get_tenant_schedule(tenant).tz
+    context = {
+        "business_name": tenant.name,
+        "window_start": start.astimezone(tz).strftime('%Y-%m-%d %H:%M'),
+        "window_end": end.astimezone(tz).strftime('%Y-%m-%d %H:%M %Z'),
+        "booked": [_digest_line(a, tz) for a in booked],
+        "cancelled": [_digest_line(a, tz) for a in cancelled],
+    }
+    outbox.enqueue_email(
+        db,
+        tenant_id=tenant.id,
+        to_email=tenant.contact_email,
+        subject=template_cache.default_template(DIGEST_TEMPLATE_KEY, "subject").render(context),
+        html_body=template_cache.default_template(DIGEST_TEMPLATE_KEY, "body").render(context),
+        log_type=CommunicationType.SYSTEM_ALERT,
+        log_notes=_log_notes(start, end, booked, cancelled),
+    )
+    return len(booked) + len(cancelled)
@@ -0,0 +1,130 @@
+# app/services/availability_cache.py
+# --- NEW FILE ---
+#
+# Redis cache of computed free slots per tenant-day.
+# Layout: one hash per tenant-day, "availability:{tenant_id}:{YYYY-MM-DD}",
+# with one field per "{duration}:{step}" holding the UTC slot starts (epoch seconds).
+# Invalidating a tenant-day is a single DEL regardless of how many service
+# combinations were cached for it.
+
+from datetime import datetime, date as DDate, timezone as pytimezone
+from typing import Dict, Iterable, List, Optional
+import json
+import logging
+
+import redis
+
+from app.config import settings
+from app.core import metrics
+from app.core.redis_client import get_redis
+from app.services.availability_engine import to_utc
+from app.services.business_hours import get_tenant_schedule
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "availability"
+
+
+def _day_key(tenant_id: int, day: DDate) -> str:
+    return f"{KEY_PREFIX}:{tenant_id}:{day.isoformat()}"
+
+
+def _field(duration_minutes: int, step_minutes: int) -> str:
+    return f"{duration_minutes}:{step_minutes}"
+
+
+def _enabled():
+    if settings.availability_cache_ttl_seconds <= 0:
+        return None
+    return get_redis()
+
+
+def _decode(raw: str) -> List[datetime]:
+    return [datetime.fromtimestamp(ts, tz=pytimezone.utc) for ts in json.loads(raw)]
+
+
+def _encode(slots_utc: Iterable[datetime]) -> str:
+    return json.dumps([int(slot.timestamp()) for slot in slots_utc])
+
+
+def get_cached_days(tenant_id: int, days: List[DDate], duration_minutes: int, step_minutes: int) -> Dict[DDate, List[datetime]]:
+    """Returns cached UTC slot lists for the given days (missing days are simply absent). Records hit/miss counters."""
+    client = _enabled()
+    if client is None or not days:
+        return {}
+    field = _field(duration_minutes, step_minutes)
+    try:
+        pipe = client.pipeline(transaction=False)
+        for day in days:
+            pipe.hget(_day_key(tenant_id, day), field)
+        raw_values = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Availability cache read failed for tenant {tenant_id}: {e}")
+        return {}
+
+    found = {day: _decode(raw) for day, raw in zip(days, raw_values) if raw is not None}
+    if found:
+        metrics.incr("availability_cache.hit", len(found))
+    if len(found) < len(days):
+        metrics.incr("availability_cache.miss", len(days) - len(found))
+    return found
+
+
+def get_cached_slots(tenant_id: int, day: DDate, duration_minutes: int, step_minutes: int) -> Optional[List[datetime]]:
+    return get_cached_days(tenant_id, [day], duration_minutes, step_minutes).get(day)
+
+
+def store_days(tenant_id: int, slots_by_day: Dict[DDate, List[datetime]], duration_minutes: int, step_minutes: int) -> None:
+    """Stores computed UTC slot lists; each tenant-day hash gets the configured TTL."""
+    client = _enabled()
+    if client is None or not slots_by_day:
+        return
+    field = _field(duration_minutes, step_minutes)
+    ttl = settings.availability_cache_ttl_seconds
+    try:
+        pipe = client.pipeline(transaction=False)
+        for day, slots in slots_by_day.items():
+            key = _day_key(tenant_id, day)
+            pipe.hset(key, field, _encode(slots))
+            pipe.expire(key, ttl)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Availability cache write failed for tenant {tenant_id}: {e}")
+
+
+def store_slots(tenant_id: int, day: DDate, duration_minutes: int, step_minutes: int, slots_utc: List[datetime]) -> None:
+    store_days(tenant_id, {day: slots_utc}, duration_minutes, step_minutes)
+
+
+def invalidate_days(tenant_id: int, days: Iterable[DDate]) -> None:
+    """Drops every cached duration/step combination for the given tenant-days."""
+    client = get_redis()
+    keys = {_day_key(tenant_id, day) for day in days}
+    if client is None or not keys:
+        return
+    try:
+        client.delete(*keys)
+        metrics.incr("availability_cache.invalidate_day", len(keys))
+    except redis.RedisError as e:
+        logger.warning(f"Availability cache invalidation failed for tenant {tenant_id}: {e}")
+
+
+def invalidate_for_times(tenant, *times_utc: Optional[datetime]) -> None:
+    """Invalidates the tenant-local days on which the given times fall (pass an appointment's start and end)."""
+    tenant_tz = get_tenant_schedule(tenant).tz
+    days = {to_utc(t).astimezone(tenant_tz).date() for t in times_utc if t is not None}
+    invalidate_days(tenant.id, days)
+
+
+def invalidate_tenant(tenant_id: int) -> None:
+    """Drops all cached days for a tenant (business hours or timezone changed)."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        keys = list(client.scan_iter(match=f"{KEY_PREFIX}:{tenant_id}:*", count=500))
+        if keys:
+            client.delete(*keys)
+        metrics.incr("availability_cache.invalidate_tenant")
+    except redis.RedisError as e:
+        logger.warning(f"Availability cache tenant invalidation failed for tenant {tenant_id}: {e}")
@@ -0,0 +1,198 @@
+# app/services/availability_engine.py
+# --- NEW FILE ---
+#
+# Pure slot computation shared by the availability endpoints (and anything else
+# that needs "which start times are free on this day"). No DB or request access
+# here: callers pass the compiled schedule (app.services.business_hours) and busy
+# intervals, the engine does the math.
+
+from bisect import bisect_right
+from datetime import datetime, date as DDate, time, timedelta, timezone as pytimezone
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.business_hours import WeeklySchedule
+
+import logging
+logger = logging.getLogger(__name__)
+
+# (start_utc, end_utc) pair, both timezone-aware UTC datetimes
+Interval = Tuple[datetime, datetime]
+
+
+def to_utc(value: datetime) -> datetime:
+    """Normalizes a datetime to an aware datetime using datetime.timezone.utc (naive values are assumed UTC)."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=pytimezone.utc)
+    return value.astimezone(pytimezone.utc)
+
+
+def build_work_intervals_utc(
+    target_date: DDate,
+    schedule: WeeklySchedule,
+    tenant_id: Optional[int] = None,
+) -> List[Interval]:
+    """
+    Converts the tenant's compiled business hours for target_date into UTC intervals.
+    Business hours must be within the same calendar day locally; intervals that
+    collapse across a DST transition are skipped.
+    """
+    local_intervals = schedule.intervals_for(target_date)
+    if not local_intervals:
+        logger.debug(f"Tenant {tenant_id} is closed or has no intervals on {target_date}.")
+        return []
+
+    work_intervals_utc: List[Interval] = []
+    for start_minute, end_minute in local_intervals:
+        start_dt_local = datetime.combine(target_date, time(start_minute // 60, start_minute % 60), tzinfo=schedule.tz)
+        end_dt_local = datetime.combine(target_date, time(end_minute // 60, end_minute % 60), tzinfo=schedule.tz)
+        start_utc = start_dt_local.astimezone(pytimezone.utc)
+        end_utc = end_dt_local.astimezone(pytimezone.utc)
+
+        # DST transitions can make end_utc <= start_utc even if local times were valid.
+        if end_utc <= start_utc:
+            logger.warning(
+                f"Skipping work interval due to invalid UTC times after conversion: "
+                f"{start_utc.isoformat()} to {end_utc.isoformat()} "
+                f"(from local {start_dt_local.isoformat()} to {end_dt_local.isoformat()})."
+            )
+            continue
+        work_intervals_utc.append((start_utc, end_utc))
+
+    return work_intervals_utc
+
+
+def local_day_bounds_utc(target_date: DDate, tenant_tz) -> Interval:
+    """Returns [local midnight, next local midnight) of target_date expressed in UTC."""
+    day_start_local = datetime.combine(target_date, time.min, tzinfo=tenant_tz)
+    next_day_start_local = datetime.combine(target_date + timedelta(days=1), time.min, tzinfo=tenant_tz)
+    return day_start_local.astimezone(pytimezone.utc), next_day_start_local.astimezone(pytimezone.utc)
+
+
+def busy_intervals_from_appointments(appointments: Iterable[Any]) -> List[Interval]:
+    """Extracts (start_utc, end_utc) pairs from appointment rows. Rows without an end time are skipped."""
+    busy: List[Interval] = []
+    for appt in appointments:
+        if appt.appointment_time is None or appt.end_datetime_utc is None:
+            logger.warning(f"Appointment {getattr(appt, 'id', '?')} has no end_datetime_utc; ignoring it for availability.")
+            continue
+        busy.append((to_utc(appt.appointment_time), to_utc(appt.end_datetime_utc)))
+    return busy
+
+
+def merge_busy_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """
+    Sorts and merges overlapping/touching busy intervals.
+    Empty or inverted intervals can never conflict with a slot, so they are dropped.
+    """
+    ordered = sorted((s, e) for s, e in intervals if e > s)
+    merged: List[Interval] = []
+    for start, end in ordered:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def compute_available_slots(
+    work_intervals_utc: Sequence[Interval],
+    merged_busy_utc: Sequence[Interval],
+    duration_minutes: int,
+    step_minutes: int,
+) -> List[datetime]:
+    """
+    Single pass over each work interval against the merged busy list.
+    A candidate start s is free when [s, s + duration) does not overlap any busy
+    interval. On a conflict the cursor jumps straight past the busy interval
+    (every step in between overlaps it as well), so the cost is
+    O(slots + busy) per work interval instead of O(slots * busy).
+    """
+    if duration_minutes <= 0 or step_minutes <= 0:
+        return []
+
+    duration = timedelta(minutes=duration_minutes)
+    step = timedelta(minutes=step_minutes)
+    busy_ends = [end for _, end in merged_busy_utc]
+    available: List[datetime] = []
+
+    for work_start, work_end in work_intervals_utc:
+        slot_start = work_start
+        # First busy interval that ends after the cursor
+        idx = bisect_right(busy_ends, slot_start)
+
+        while slot_start + duration <= work_end:
+            while idx < len(busy_ends) and busy_ends[idx] <= slot_start:
+                idx += 1
+
+            if idx < len(merged_busy_utc) and merged_busy_utc[idx][0] < slot_start + duration:
+                # Conflict: skip every step that still starts before this busy interval ends
+                busy_end = merged_busy_utc[idx][1]
+                steps_to_skip = -((slot_start - busy_end) // step) # ceil((busy_end - slot_start) / step)
+                slot_start += step * max(steps_to_skip, 1)
+                continue
+
+            available.append(slot_start)
+            slot_start += step
+
+    return available
+
+
+def is_slot_start(
+    work_intervals_utc: Sequence[Interval],
+    slot_start: datetime,
+    duration_minutes: int,
+    step_minutes: int,
+) -> bool:
+    """
+    True when slot_start is one of the starts compute_available_slots() would consider
+    (busy intervals aside): on the step grid of a work interval, with the whole duration inside it.
+    """
+    if duration_minutes <= 0 or step_minutes <= 0:
+        return False
+    duration = timedelta(minutes=duration_minutes)
+    step = timedelta(minutes=step_minutes)
+    return any(
+        work_start <= slot_start and slot_start + duration <= work_end and (slot_start - work_start) % step == timedelta(0)
+        for work_start, work_end in work_intervals_utc
+    )
+
+
+def exclude_overlapping_slots(
+    slots_utc: Iterable[datetime],
+    duration_minutes: int,
+    busy_utc: Iterable[Interval],
+) -> List[datetime]:
+    """Drops slots whose [start, start + duration) overlaps any of the given busy intervals."""
+    merged = merge_busy_intervals(busy_utc)
+    if not merged:
+        return list(slots_utc)
+    duration = timedelta(minutes=duration_minutes)
+    busy_ends = [end for _, end in merged]
+    kept: List[datetime] = []
+    for slot_start in slots_utc:
+        idx = bisect_right(busy_ends, slot_start)
+        if idx < len(merged) and merged[idx][0] < slot_start + duration:
+            continue
+        kept.append(slot_start)
+    return kept
+
+
+def format_slots_local(slots_utc: Iterable[datetime], tenant_tz) -> List[str]:
+    """Formats UTC slot starts as sorted, de-duplicated "HH:MM" strings in the tenant's timezone."""
+    return sorted(set(slot_utc.astimezone(tenant_tz).strftime("%H:%M") for slot_utc in slots_utc))
+
+
+def compute_day_slots(
+    target_date: DDate,
+    schedule: WeeklySchedule,
+    busy_utc: Iterable[Interval],
+    duration_minutes: int,
+    step_minutes: int,
+    tenant_id: Optional[int] = None,
+) -> List[datetime]:
+    """Convenience wrapper: compiled business hours + busy intervals -> free UTC slot starts for one local day."""
+    work_intervals_utc = build_work_intervals_utc(target_date, schedule, tenant_id)
+    if not work_intervals_utc:
+        return []
+    return compute_available_slots(work_intervals_utc, merge_busy_intervals(busy_utc), duration_minutes, step_minutes)
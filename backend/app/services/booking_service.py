@@ -0,0 +1,121 @@
+# app/services/booking_service.py
+# --- NEW FILE ---
+#
+# Atomic slot reservation for bookings.
+# Bookings of the same tenant that touch the same UTC day are serialized with
+# transaction-scoped Postgres advisory locks, then checked for overlap before
+# the insert. Two overlapping ranges always share at least one UTC day, so they
+# always contend for a common lock; other tenants and other days never wait.
+# Locks are released automatically on commit/rollback.
+
+from datetime import datetime, date as DDate, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.appointment import Appointment as AppointmentModel
+from app.schemas.enums import AppointmentStatus
+from app.services.availability_engine import to_utc
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Statuses that occupy a slot (same as the availability endpoints)
+BLOCKING_STATUSES = (AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED)
+
+
+class SlotUnavailableError(Exception):
+    """Raised when the requested range overlaps an existing PENDING/CONFIRMED appointment."""
+
+    def __init__(self, conflicting_appointment_id: Optional[int] = None):
+        self.conflicting_appointment_id = conflicting_appointment_id
+        super().__init__(f"Requested time overlaps appointment {conflicting_appointment_id}.")
+
+
+def _utc_days_touched(start_utc: datetime, end_utc: datetime) -> List[DDate]:
+    """UTC calendar days covered by [start_utc, end_utc), ascending (lock order prevents deadlocks)."""
+    last_instant = end_utc - timedelta(microseconds=1) if end_utc > start_utc else start_utc
+    day = start_utc.date()
+    days = []
+    while day <= last_instant.date():
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def lock_tenant_days(db: Session, tenant_id: int, start_utc: datetime, end_utc: datetime) -> None:
+    """Takes pg_advisory_xact_lock(tenant_id, day) for every UTC day the range touches. No-op off Postgres."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for day in _utc_days_touched(start_utc, end_utc):
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:tenant_key, :day_key)"),
+            {"tenant_key": tenant_id, "day_key": day.toordinal()},
+        )
+
+
+def time_range_overlaps(start_utc: datetime, end_utc: datetime):
+    """SQL filter: appointment's [start, end) intersects [start_utc, end_utc). Served by ix_appointments_tenant_time_range."""
+    return AppointmentModel.time_range.op("&&")(func.tstzrange(start_utc, end_utc, "[)"))
+
+
+def _conflicting_appointment_query(
+    tenant_id: int,
+    start_utc: datetime,
+    end_utc: datetime,
+    exclude_appointment_id: Optional[int] = None,
+):
+    query = select(AppointmentModel).where(
+        AppointmentModel.tenant_id == tenant_id,
+        AppointmentModel.status.in_(BLOCKING_STATUSES),
+        # Rows without an end time have an empty range and never conflict
+        time_range_overlaps(start_utc, end_utc),
+    )
+    if exclude_appointment_id is not None:
+        query = query.where(AppointmentModel.id != exclude_appointment_id)
+    return query.order_by(AppointmentModel.appointment_time).limit(1)
+
+
+def find_conflicting_appointment(
+    db: Session,
+    tenant_id: int,
+    start_utc: datetime,
+    end_utc: datetime,
+    exclude_appointment_id: Optional[int] = None,
+) -> Optional[AppointmentModel]:
+    """First blocking appointment of the tenant overlapping [start_utc, end_utc), if any."""
+    return db.scalars(_conflicting_appointment_query(tenant_id, start_utc, end_utc, exclude_appointment_id)).first()
+
+
+async def find_conflicting_appointment_async(
+    db: AsyncSession,
+    tenant_id: int,
+    start_utc: datetime,
+    end_utc: datetime,
+    exclude_appointment_id: Optional[int] = None,
+) -> Optional[AppointmentModel]:
+    """find_conflicting_appointment for async routes."""
+    return (await db.scalars(_conflicting_appointment_query(tenant_id, start_utc, end_utc, exclude_appointment_id))).first()
+
+
+def reserve_slot(
+    db: Session,
+    tenant_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    exclude_appointment_id: Optional[int] = None,
+) -> None:
+    """
+    Serializes against concurrent bookings for the same tenant/days and verifies the
+    range is still free. Must run inside the transaction that inserts/updates the
+    appointment; the lock is held until that transaction ends.
+    Raises SlotUnavailableError on overlap.
+    """
+    start_utc, end_utc = to_utc(start_time), to_utc(end_time)
+    lock_tenant_days(db, tenant_id, start_utc, end_utc)
+    conflict = find_conflicting_appointment(db, tenant_id, start_utc, end_utc, exclude_appointment_id)
+    if conflict is not None:
+        logger.info(f"Slot {start_utc.isoformat()} - {end_utc.isoformat()} for tenant {tenant_id} conflicts with Appt ID {conflict.id}.")
+        raise SlotUnavailableError(conflict.id)
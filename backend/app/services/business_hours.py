@@ -0,0 +1,144 @@
+# app/services/business_hours.py
+# --- NEW FILE ---
+#
+# Compiled form of Tenant.business_hours_config.
+# The JSONB config ({"monday": {"isOpen": true, "intervals": [{"start": "09:00", "end": "17:00"}]}, ...})
+# is validated and parsed once into minute offsets per weekday, together with the
+# resolved tzinfo. The result is cached per tenant and versioned by a hash of the
+# config + timezone, so it is only rebuilt after the tenant's settings change.
+# The hash is computed on the write path (stamp_schedule_version(), stored in
+# tenants.business_hours_version), never per request.
+# Availability, reminders and reports should read schedules through get_tenant_schedule().
+
+from dataclasses import dataclass
+from datetime import date as DDate, datetime, tzinfo
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+
+try:
+    import zoneinfo
+except ImportError:
+    from backports import zoneinfo
+
+from app.utils.cache import LRUCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Index matches date.weekday(): 0 = Monday ... 6 = Sunday
+WEEKDAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# (start_minute, end_minute) offsets from local midnight, start < end
+MinuteInterval = Tuple[int, int]
+
+_schedule_cache = LRUCache(maxsize=4096)
+_tz_cache = LRUCache(maxsize=512)
+
+
+@dataclass(frozen=True)
+class WeeklySchedule:
+    version: str
+    timezone_name: str
+    tz: tzinfo
+    days: Tuple[Tuple[MinuteInterval, ...], ...] # 7 entries, indexed by weekday()
+
+    def intervals_for(self, target_date: DDate) -> Tuple[MinuteInterval, ...]:
+        return self.days[target_date.weekday()]
+
+    def is_open(self, target_date: DDate) -> bool:
+        return bool(self.days[target_date.weekday()])
+
+
+def get_timezone_object(tz_string: str):
+    """Helper to get a timezone object (resolved once per name, unknown names fall back to UTC)."""
+    tz = _tz_cache.get(tz_string)
+    if tz is None:
+        try:
+            tz = zoneinfo.ZoneInfo(tz_string)
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"Tenant timezone '{tz_string}' not found, defaulting to UTC.")
+            tz = zoneinfo.ZoneInfo("UTC")
+        _tz_cache.set(tz_string, tz)
+    return tz
+
+
+def schedule_version(business_hours_config: Optional[Dict[str, Any]], timezone_name: str) -> str:
+    """Stable hash of the raw config + timezone; changes whenever either one does."""
+    payload = json.dumps([business_hours_config, timezone_name], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _parse_minutes(value: str) -> int:
+    parsed = datetime.strptime(value, "%H:%M")
+    return parsed.hour * 60 + parsed.minute
+
+
+def compile_schedule(
+    business_hours_config: Optional[Dict[str, Any]],
+    timezone_name: str,
+    tenant_id: Optional[int] = None,
+    version: Optional[str] = None,
+) -> WeeklySchedule:
+    """
+    Validates the config and converts it to minute offsets per weekday.
+    Closed days, malformed intervals and intervals that do not end after they
+    start (same calendar day only) are dropped, with the same logging as before.
+    """
+    days = []
+    for day_name in WEEKDAY_NAMES:
+        day_config = business_hours_config.get(day_name) if isinstance(business_hours_config, dict) else None
+        if not isinstance(day_config, dict) or not day_config.get("isOpen") or not day_config.get("intervals"):
+            days.append(())
+            continue
+
+        intervals = []
+        for interval_str_obj in day_config["intervals"]:
+            try:
+                start_minute = _parse_minutes(interval_str_obj["start"])
+                end_minute = _parse_minutes(interval_str_obj["end"])
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Error parsing time interval '{interval_str_obj}' for tenant {tenant_id}: {e}")
+                continue # Skip this malformed interval
+
+            if end_minute <= start_minute:
+                logger.warning(
+                    f"Skipping invalid business interval on {day_name} (tenant {tenant_id}): "
+                    f"end time {interval_str_obj['end']} is not after start time {interval_str_obj['start']} for same-day operation."
+                )
+                continue
+            intervals.append((start_minute, end_minute))
+        days.append(tuple(intervals))
+
+    return WeeklySchedule(
+        version=version or schedule_version(business_hours_config, timezone_name),
+        timezone_name=timezone_name,
+        tz=get_timezone_object(timezone_name),
+        days=tuple(days),
+    )
+
+
+def stamp_schedule_version(tenant) -> None:
+    """Stores the version of the tenant's current config + timezone. Call on create and whenever either one changes."""
+    tenant.business_hours_version = schedule_version(tenant.business_hours_config, tenant.timezone or "UTC")
+
+
+def get_tenant_schedule(tenant) -> WeeklySchedule:
+    """
+    Returns the compiled schedule for a tenant (ORM Tenant or TenantSnapshot), recompiling
+    only when its stored business_hours_version changed.
+    """
+    timezone_name = tenant.timezone or "UTC"
+    # Unstamped tenants (not written since the column was added) are hashed on the spot
+    version = tenant.business_hours_version or schedule_version(tenant.business_hours_config, timezone_name)
+    schedule = _schedule_cache.get(tenant.id)
+    if schedule is None or schedule.version != version:
+        schedule = compile_schedule(tenant.business_hours_config, timezone_name, tenant.id, version)
+        _schedule_cache.set(tenant.id, schedule)
+        logger.debug(f"Compiled business hours for tenant {tenant.id} (version {version[:8]}).")
+    return schedule
+
+
+def invalidate_tenant_schedule(tenant_id: int) -> None:
+    """Drops this process's compiled schedule; other processes notice the new version hash on next use."""
+    _schedule_cache.pop(tenant_id)
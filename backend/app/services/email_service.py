@@ -10,6 +10,7 @@ from typing import Optional
 from fastapi.concurrency import run_in_threadpool
 
 from app.config import settings # Import your settings
+from app.services.email_transport import get_transport
 import logging
 logger = logging.getLogger(__name__)
 
@@ -26,9 +27,11 @@ async def send_email( # <--- Make async
 ) -> bool:
     """
     Sends an email using configured SMTP settings (Mailtrap). Runs blocking
-    SMTP calls in a threadpool to avoid blocking the event loop.
+    SMTP calls in a threadpool to avoid blocking the event loop, on a pooled
+    connection that stays logged in across messages.
     """
-    if not all([settings.mail_server, settings.mail_username, settings.mail_password]):
+    transport = get_transport() # smtp, or a local sink for load tests (settings.mail_transport)
+    if transport.name == "smtp" and not all([settings.mail_server, settings.mail_username, settings.mail_password]):
         logger.error("Mail server settings are not configured.")
         return False
 
@@ -48,23 +51,14 @@ async def send_email( # <--- Make async
 
     def blocking_smtp_send(): # <--- Define the blocking part
         try:
-            use_ssl = settings.mail_use_ssl or settings.mail_port == 465
-            smtp_class = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
-            with smtp_class(settings.mail_server, settings.mail_port) as server:
-                server.set_debuglevel(0)
-                server.ehlo()
-                if not use_ssl and server.has_extn('starttls'):
-                    server.starttls()
-                    server.ehlo()
-                if settings.mail_username and settings.mail_password:
-                    server.login(settings.mail_username, settings.mail_password)
-                server.sendmail(
-                    from_addr=sender_email,
-                    to_addrs=[to_email],
-                    msg=message.as_string()
-                )
-                logger.info(f"Email successfully sent (accepted by server) to {to_email}.")
-                return True
+            # SMTP: pooled, already logged-in connection (see app/services/smtp_pool.py)
+            transport.send(
+                from_addr=sender_email,
+                to_addrs=[to_email],
+                msg=message.as_string()
+            )
+            logger.info(f"Email successfully sent (accepted by {transport.name} transport) to {to_email}.")
+            return True
         except smtplib.SMTPException as e:
             logger.error(f"SMTP error occurred sending email to {to_email}: {e}", exc_info=True)
             return False
@@ -0,0 +1,117 @@
+# app/services/email_transport.py
+# --- NEW FILE ---
+#
+# Where send_email hands a finished message, selected by settings.mail_transport:
+#   "smtp"    - the configured SMTP server through the connection pool (default)
+#   "maildir" - one file per message in a Maildir at settings.mail_maildir_path
+#   "memory"  - kept in this process (last MEMORY_TRANSPORT_KEPT messages)
+# maildir/memory never touch the network, so booking and reminder throughput can be
+# load-tested end to end. settings.mail_transport_latency_ms and
+# settings.mail_transport_failure_rate simulate a relay's response time and
+# rejections. A simulated rejection is an SMTPException, so it is retried and
+# logged as FAILED like a real one; an accepted message is logged as SIMULATED.
+
+from abc import ABC, abstractmethod
+import mailbox
+import os
+import random
+import smtplib
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.services.smtp_pool import get_smtp_pool
+
+import logging
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ("smtp", "maildir", "memory")
+MEMORY_TRANSPORT_KEPT = 10000
+
+
+class SimulatedSendFailure(smtplib.SMTPException):
+    """Rejection drawn by settings.mail_transport_failure_rate (maildir/memory only)."""
+
+
+class SmtpTransport:
+    name = "smtp"
+
+    def send(self, from_addr: str, to_addrs: Sequence[str], msg: str) -> None:
+        get_smtp_pool().send(from_addr=from_addr, to_addrs=to_addrs, msg=msg)
+
+
+class _SimulatedTransport(ABC):
+    """Shared latency/failure simulation for the local transports; subclasses only store the message."""
+    name = ""
+
+    def send(self, from_addr: str, to_addrs: Sequence[str], msg: str) -> None:
+        if settings.mail_transport_latency_ms > 0:
+            time.sleep(settings.mail_transport_latency_ms / 1000) # send_email runs this in a threadpool
+        if settings.mail_transport_failure_rate > 0 and random.random() < settings.mail_transport_failure_rate:
+            raise SimulatedSendFailure(f"Simulated rejection ({self.name} transport)")
+        self._store(from_addr, to_addrs, msg)
+
+    @abstractmethod
+    def _store(self, from_addr: str, to_addrs: Sequence[str], msg: str) -> None:
+        """Keeps an accepted message."""
+
+
+class MaildirTransport(_SimulatedTransport):
+    name = "maildir"
+
+    def __init__(self, path: str):
+        for subdir in ("tmp", "new", "cur"): # Maildir(create=True) skips these if `path` already exists
+            os.makedirs(os.path.join(path, subdir), exist_ok=True)
+        self.maildir = mailbox.Maildir(path, create=False)
+        self._lock = threading.Lock()
+
+    def _store(self, from_addr: str, to_addrs: Sequence[str], msg: str) -> None:
+        with self._lock:
+            self.maildir.add(msg)
+
+
+class MemoryTransport(_SimulatedTransport):
+    name = "memory"
+
+    def __init__(self, kept: int = MEMORY_TRANSPORT_KEPT):
+        self.messages: Deque[Tuple[str, List[str], str]] = deque(maxlen=kept)
+        self._lock = threading.Lock()
+
+    def _store(self, from_addr: str, to_addrs: Sequence[str], msg: str) -> None:
+        with self._lock:
+            self.messages.append((from_addr, list(to_addrs), msg))
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """This process's transport. An unknown settings.mail_transport raises instead of falling back to real SMTP."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            name = (settings.mail_transport or "smtp").lower()
+            if name == "smtp":
+                _transport = SmtpTransport()
+            elif name == "maildir":
+                _transport = MaildirTransport(settings.mail_maildir_path)
+            elif name == "memory":
+                _transport = MemoryTransport()
+            else:
+                raise ValueError(f"Unknown MAIL_TRANSPORT '{settings.mail_transport}', expected one of {TRANSPORTS}.")
+            if name != "smtp":
+                logger.warning(
+                    f"Email transport is '{name}' (latency {settings.mail_transport_latency_ms}ms, "
+                    f"failure rate {settings.mail_transport_failure_rate}): no email leaves this machine."
+                )
+        return _transport
+
+
+def simulated_transport_name() -> Optional[str]:
+    """'maildir'/'memory' when emails are not really sent, else None (for log notes)."""
+    name = (settings.mail_transport or "smtp").lower()
+    return None if name == "smtp" else name
+
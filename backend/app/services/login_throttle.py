@@ -0,0 +1,177 @@
+# app/services/login_throttle.py
+# --- NEW FILE ---
+#
+# Failed-login throttling, so a credential-stuffing burst cannot keep the bcrypt
+# pool (app/services/password_hashing.py) busy for every tenant.
+# Failures are kept per email and per client IP in Redis sorted sets
+# ("login:fail:{kind}:{value}", one member per failure, scored by time), i.e. a
+# sliding window of settings.login_throttle_window_seconds. Reaching the limit for
+# a key (login_throttle_max_failures_per_email / _per_ip) sets
+# "login:lock:{kind}:{value}" for settings.login_throttle_lockout_seconds; the
+# login endpoint checks the locks BEFORE any database query or bcrypt.
+# A successful login clears its email's failures (not the IP's).
+# No Redis, or a Redis error: logins are not throttled (fail open), like the caches.
+
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+
+from app.config import settings
+from app.core import metrics
+from app.core.redis_client import get_redis
+
+import logging
+logger = logging.getLogger(__name__)
+
+EMAIL = "email"
+IP = "ip"
+
+FAIL_KEY_PREFIX = "login:fail"
+LOCK_KEY_PREFIX = "login:lock"
+
+# KEYS: failure set, lock key. ARGV: now, window seconds, max failures, lockout seconds, member.
+# Records one failure; returns 1 if the key is now locked out, else 0.
+RECORD_FAILURE_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+redis.call('ZADD', KEYS[1], now, ARGV[5])
+redis.call('EXPIRE', KEYS[1], math.ceil(window))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    redis.call('SET', KEYS[2], now, 'EX', tonumber(ARGV[4]))
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+_script = None
+
+
+def _limits() -> Dict[str, int]:
+    """Enabled limits by key kind (0 disables one)."""
+    limits = {EMAIL: settings.login_throttle_max_failures_per_email, IP: settings.login_throttle_max_failures_per_ip}
+    return {kind: limit for kind, limit in limits.items() if limit > 0}
+
+
+def _keys(email: str, ip: Optional[str]) -> List[Tuple[str, str]]:
+    """(kind, value) pairs to check for this attempt."""
+    limits = _limits()
+    keys = []
+    if EMAIL in limits and email:
+        keys.append((EMAIL, email.strip().lower()))
+    if IP in limits and ip:
+        keys.append((IP, ip))
+    return keys
+
+
+def _enabled():
+    if settings.login_throttle_lockout_seconds <= 0:
+        return None
+    return get_redis()
+
+
+def locked_for(email: str, ip: Optional[str]) -> int:
+    """Seconds until this email/IP may try again (0: not locked). One Redis round trip."""
+    client = _enabled()
+    keys = _keys(email, ip)
+    if client is None or not keys:
+        return 0
+    try:
+        pipe = client.pipeline(transaction=False)
+        for kind, value in keys:
+            pipe.ttl(f"{LOCK_KEY_PREFIX}:{kind}:{value}")
+        ttls = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Login throttle unavailable, not checking locks: {e}")
+        return 0
+    locked = [(kind, ttl) for (kind, _), ttl in zip(keys, ttls) if ttl and ttl > 0]
+    for kind, _ in locked:
+        metrics.incr(f"login_throttle.rejected.{kind}")
+    return max((ttl for _, ttl in locked), default=0)
+
+
+def record_failure(email: str, ip: Optional[str]) -> None:
+    """Counts a failed login for the email and the IP; locks whichever reached its limit."""
+    global _script
+    metrics.incr("login_throttle.failed")
+    client = _enabled()
+    keys = _keys(email, ip)
+    if client is None or not keys:
+        return
+    limits = _limits()
+    try:
+        if _script is None:
+            _script = client.register_script(RECORD_FAILURE_LUA)
+        now = time.time()
+        for kind, value in keys:
+            locked = _script(
+                keys=[f"{FAIL_KEY_PREFIX}:{kind}:{value}", f"{LOCK_KEY_PREFIX}:{kind}:{value}"],
+                args=[now, settings.login_throttle_window_seconds, limits[kind],
+                      settings.login_throttle_lockout_seconds, uuid.uuid4().hex],
+            )
+            if int(locked):
+                metrics.incr(f"login_throttle.locked.{kind}")
+                logger.warning(
+                    f"Login locked for {settings.login_throttle_lockout_seconds}s: {kind} '{value}' "
+                    f"reached {limits[kind]} failures in {settings.login_throttle_window_seconds}s."
+                )
+    except redis.RedisError as e:
+        logger.warning(f"Login throttle unavailable, failure not recorded: {e}")
+
+
+def record_success(email: str) -> None:
+    """Clears the email's failure window after a successful login."""
+    client = _enabled()
+    if client is None or not email:
+        return
+    try:
+        client.delete(f"{FAIL_KEY_PREFIX}:{EMAIL}:{email.strip().lower()}")
+    except redis.RedisError as e:
+        logger.debug(f"Could not clear login failures for {email}: {e}")
+
+
+def active_lockouts(limit: int = 100) -> List[Dict[str, Any]]:
+    """Current lockouts (kind, value, seconds left), for the super-admin dashboard. Requires Redis."""
+    client = _enabled()
+    if client is None:
+        return []
+    lockouts = []
+    try:
+        for key in client.scan_iter(match=f"{LOCK_KEY_PREFIX}:*", count=500):
+            _, _, kind, value = key.split(":", 3)
+            lockouts.append({"kind": kind, "value": value, "seconds_left": client.ttl(key)})
+            if len(lockouts) >= limit:
+                break
+    except redis.RedisError as e:
+        logger.warning(f"Could not list login lockouts: {e}")
+    return sorted(lockouts, key=lambda item: -item["seconds_left"])
+
+
+def unlock(kind: str, value: str) -> bool:
+    """Lifts a lockout early (and forgets its failures). True if there was one."""
+    client = _enabled()
+    if client is None:
+        return False
+    if kind == EMAIL:
+        value = value.strip().lower()
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.delete(f"{LOCK_KEY_PREFIX}:{kind}:{value}")
+        pipe.delete(f"{FAIL_KEY_PREFIX}:{kind}:{value}")
+        removed, _ = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not unlock login {kind} '{value}': {e}")
+        return False
+    return bool(removed)
+
+
+def policy() -> Dict[str, int]:
+    return {
+        "window_seconds": settings.login_throttle_window_seconds,
+        "max_failures_per_email": settings.login_throttle_max_failures_per_email,
+        "max_failures_per_ip": settings.login_throttle_max_failures_per_ip,
+        "lockout_seconds": settings.login_throttle_lockout_seconds,
+    }
@@ -2,9 +2,10 @@
 # --- FULL REPLACEMENT ---
 
 from sqlalchemy.orm import Session
-from jinja2 import Environment, BaseLoader, select_autoescape
+from jinja2 import Template as JinjaTemplate
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Awaitable, Callable, Dict, Any, Hashable, Optional
 import pytz # For timezone handling
 import asyncio # For running async function if needed
 
@@ -27,26 +28,29 @@ from app.models.communications_log import ( # Import all needed enums/model
 
 # Service Imports
 from app.services.email_service import send_email # Import the async function
+from app.services.email_transport import simulated_transport_name
 from app.services.communication_service import create_communication_log # Import log creation utility
-
-
-# --- Jinja2 Environment Setup ---
-jinja_env = Environment(
-    loader=BaseLoader(),
-    autoescape=select_autoescape(['html', 'xml']) # Enable autoescaping for security
-)
+from app.services.business_hours import get_tenant_schedule
+from app.services import template_cache
+from app.services.template_cache import jinja_env # Compiled templates are cached in template_cache
 
 # --- Helper Functions ---
 
-def _get_template(db: Session, tenant_id: int, event_trigger: TemplateEventTrigger) -> Optional[Template]:
-    """Fetches the active email template for a given tenant and trigger."""
-    try:
-        template = db.query(Template).filter(
+def _get_template(db: Session, tenant_id: int, event_trigger: TemplateEventTrigger) -> Optional[template_cache.CachedTemplate]:
+    """
+    Fetches the active email template for a given tenant and trigger.
+    Cached per process, including "no custom template" (see template_cache.lookup_template).
+    """
+    def load() -> Optional[Template]:
+        return db.query(Template).filter(
             Template.tenant_id == tenant_id,
             Template.event_trigger == event_trigger,
             Template.type == TemplateType.EMAIL, # Hardcoded to EMAIL for now
             Template.is_active == True
         ).first()
+
+    try:
+        template = template_cache.lookup_template(tenant_id, event_trigger, load)
         if template:
             logger.debug(f"Found active template ID {template.id} for trigger {event_trigger.value}, tenant {tenant_id}")
         else:
@@ -88,8 +92,7 @@ def _prepare_context(appointment: Appointment) -> Dict[str, Any]:
     appointment_time_utc = appointment.appointment_time
 
     try:
-        tenant_tz_str = tenant.timezone or 'UTC'
-        tenant_tz = pytz.timezone(tenant_tz_str)
+        tenant_tz = get_tenant_schedule(tenant).tz # Cached tzinfo shared with availability
         # Ensure UTC time has timezone info before converting
         if appointment_time_utc.tzinfo is None:
              appointment_time_utc = pytz.utc.localize(appointment_time_utc)
@@ -120,12 +123,15 @@ def _prepare_context(appointment: Appointment) -> Dict[str, Any]:
     logger.debug(f"Prepared context keys for Appt ID {appointment.id}: {list(context.keys())}")
     return context
 
-def _render_template(template_string: str, context: Dict[str, Any]) -> str:
-    """Renders a template string using Jinja2."""
+def _render_template(template_string: str, context: Dict[str, Any], compiled: Optional[Callable[[], JinjaTemplate]] = None) -> str:
+    """
+    Renders a template string using Jinja2. `compiled` returns the cached compiled
+    form of template_string (see template_cache); without it the string is compiled here.
+    """
     if not template_string:
         return ""
     try:
-        template = jinja_env.from_string(template_string)
+        template = compiled() if compiled else jinja_env.from_string(template_string)
         rendered = template.render(context)
         return rendered
     except Exception as e:
@@ -194,22 +200,43 @@ DEFAULT_TEMPLATES = {
     },
     # Add defaults for other triggers as needed
 }
-
-# --- Main Notification Function ---
-
-async def send_appointment_notification(
+DEFAULT_SUBJECT = "Appointment Update"
+
+# Built-in templates are compiled once per process
+template_cache.precompile_defaults(DEFAULT_TEMPLATES)
+template_cache.precompile_defaults({None: {"subject": DEFAULT_SUBJECT}})
+
+# --- Main Notification Functions ---
+
+@dataclass
+class PreparedNotification:
+    """A rendered appointment email plus what its CommunicationsLog entry needs."""
+    tenant: Any # Tenant, used by send_email for Reply-To
+    appointment_id: int
+    client_id: Optional[int]
+    event_trigger: TemplateEventTrigger
+    recipient_email: str
+    subject: str
+    html_body: str
+    log_comm_type: LogCommType
+    log_direction: CommunicationDirection
+    template_name: str
+
+
+def prepare_appointment_notification(
     db: Session,
     appointment: Appointment,
     event_trigger: TemplateEventTrigger,
     recipient_override: Optional[str] = None
-):
+) -> Optional[PreparedNotification]:
     """
-    Fetches template, renders, sends email, and logs communication for an appointment event.
-    Adds log entry to session but DOES NOT COMMIT.
+    Resolves recipient and template and renders the email for an appointment event.
+    Returns None if there is nothing to send (no recipient, no template...).
+    Touches the DB (template lookup, relationship refresh) but sends nothing.
     """
     if not appointment:
-         logger.error("send_appointment_notification called with None appointment.")
-         return
+         logger.error("prepare_appointment_notification called with None appointment.")
+         return None
 
     # Eager load relationships if not already loaded (belt-and-suspenders)
     # This requires the db session to be active.
@@ -233,7 +260,7 @@ async def send_appointment_notification(
 
     if not tenant or not client:
         logger.error(f"Cannot send notification for Appt ID {appointment.id}: Missing Tenant or Client relationship even after refresh.")
-        return
+        return None
 
     # --- Determine recipient and log direction/type ---
     recipient_email = recipient_override
@@ -268,11 +295,11 @@ async def send_appointment_notification(
             elif event_trigger == TemplateEventTrigger.APPOINTMENT_UPDATED_ADMIN: log_comm_type = LogCommType.UPDATE
         else:
             logger.warning(f"No recipient logic defined for event trigger: {event_trigger.value} for Appt ID {appointment.id}")
-            return
+            return None
 
     if not recipient_email:
         logger.warning(f"No recipient email address found (Client Email or Tenant Contact Email empty?) for notification trigger {event_trigger.value}, Appt ID {appointment.id}. Skipping send.")
-        return
+        return None
 
     # --- Get template or use default ---
     template = _get_template(db, tenant.id, event_trigger)
@@ -280,19 +307,31 @@ async def send_appointment_notification(
 
     subject_template = ""
     body_template = ""
+    subject_compiled = body_compiled = None
     template_name_for_log = "Default"
 
     if template:
         logger.info(f"Using template ID {template.id} ('{template.name}') for trigger {event_trigger.value}, Appt ID {appointment.id}")
         template_name_for_log = template.name
-        subject_template = template.email_subject or DEFAULT_TEMPLATES.get(event_trigger, {}).get("subject", "Appointment Update")
         body_template = template.email_body
+        body_compiled = lambda: template_cache.tenant_template(template, "body", body_template)
+        if template.email_subject:
+            subject_template = template.email_subject
+            subject_compiled = lambda: template_cache.tenant_template(template, "subject", subject_template)
+        elif event_trigger in DEFAULT_TEMPLATES:
+            subject_template = DEFAULT_TEMPLATES[event_trigger]["subject"]
+            subject_compiled = lambda: template_cache.default_template(event_trigger, "subject")
+        else:
+            subject_template = DEFAULT_SUBJECT
+            subject_compiled = lambda: template_cache.default_template(None, "subject")
     else:
         logger.warning(f"No active custom template for trigger {event_trigger.value}, tenant {tenant.id}. Using default content.")
         default_content = DEFAULT_TEMPLATES.get(event_trigger)
         if default_content:
             subject_template = default_content["subject"]
             body_template = default_content["body"]
+            subject_compiled = lambda: template_cache.default_template(event_trigger, "subject")
+            body_compiled = lambda: template_cache.default_template(event_trigger, "body")
         else:
              logger.error(f"FATAL: No default template content defined for trigger {event_trigger.value}! Cannot send notification for Appt ID {appointment.id}.")
              # Log this failure explicitly?
@@ -301,40 +340,107 @@ async def send_appointment_notification(
                  type=log_comm_type, channel=CommunicationChannel.EMAIL, direction=log_direction,
                  status=CommunicationStatus.FAILED, notes="Configuration Error: No template (custom or default) found for trigger.",
              )
-             return # Cannot proceed
+             return None # Cannot proceed
 
     # --- Render template ---
-    rendered_subject = _render_template(subject_template, context)
-    rendered_plain_body = _render_template(body_template, context)
+    rendered_subject = _render_template(subject_template, context, subject_compiled)
+    rendered_plain_body = _render_template(body_template, context, body_compiled)
     # Convert plain text newlines to HTML breaks AFTER rendering placeholders
     html_compatible_body = rendered_plain_body.replace('\n', '<br />\n')
 
-    # --- Send email (asynchronously) ---
-    send_success = await send_email(
-        to_email=recipient_email,
+    return PreparedNotification(
+        tenant=tenant,
+        appointment_id=appointment.id,
+        client_id=client.id if log_direction == CommunicationDirection.OUTBOUND else None,
+        event_trigger=event_trigger,
+        recipient_email=recipient_email,
         subject=rendered_subject,
         html_body=html_compatible_body,
-        tenant=tenant,
+        log_comm_type=log_comm_type,
+        log_direction=log_direction,
+        template_name=template_name_for_log,
     )
 
-    # --- Log the communication attempt ---
+
+async def deliver_notification(prepared: PreparedNotification) -> bool:
+    """Sends a prepared notification. No DB access, so several can be awaited concurrently."""
+    return await send_email(
+        to_email=prepared.recipient_email,
+        subject=prepared.subject,
+        html_body=prepared.html_body,
+        tenant=prepared.tenant,
+    )
+
+
+async def deliver_notifications(
+    items: Dict[Hashable, Any],
+    concurrency: int,
+    send: Callable[[Any], Awaitable[bool]] = deliver_notification,
+) -> Dict[Hashable, bool]:
+    """
+    Sends many items (PreparedNotifications by default; the outbox passes its own `send`) with
+    at most `concurrency` in flight and returns key -> accepted. An exception counts as a
+    failed send, so one bad email cannot sink the batch.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def deliver(key: Hashable, item: Any):
+        async with semaphore:
+            try:
+                return key, bool(await send(item))
+            except Exception as e:
+                logger.error(f"Error sending notification {key}: {e}", exc_info=True)
+                return key, False
+
+    results = await asyncio.gather(*(deliver(key, item) for key, item in items.items()))
+    return dict(results)
+
+
+def log_notification_result(db: Session, prepared: PreparedNotification, send_success: bool) -> None:
+    """Adds the CommunicationsLog entry for a delivery attempt. DOES NOT COMMIT."""
     log_status = CommunicationStatus.SENT if send_success else CommunicationStatus.FAILED
-    log_notes = f"Template: '{template_name_for_log}'. Subject: {rendered_subject}"
+    log_notes = f"Template: '{prepared.template_name}'. Subject: {prepared.subject}"
     if not send_success:
         log_notes += ". Status: FAILED. Check email service logs/status."
+    simulated = simulated_transport_name()
+    if simulated:
+        # Load test: accepted by a local sink, never sent (a simulated rejection stays FAILED)
+        log_status = CommunicationStatus.SIMULATED if send_success else log_status
+        log_notes += f". Simulated delivery ({simulated} transport)."
 
     create_communication_log(
         db=db,
-        tenant_id=tenant.id,
-        client_id=client.id if log_direction == CommunicationDirection.OUTBOUND else None,
-        appointment_id=appointment.id,
+        tenant_id=prepared.tenant.id,
+        client_id=prepared.client_id,
+        appointment_id=prepared.appointment_id,
         user_id=None, # System generated, no specific user action triggered this directly
-        type=log_comm_type,
+        type=prepared.log_comm_type,
         channel=CommunicationChannel.EMAIL,
         status=log_status,
-        direction=log_direction, # Pass the determined direction
-        subject=rendered_subject, # Log the rendered subject
+        direction=prepared.log_direction, # Pass the determined direction
+        subject=prepared.subject, # Log the rendered subject
         notes=log_notes # Use notes for summary/status
     )
+    logger.info(f"Notification attempt logged for Appt ID {prepared.appointment_id}, Trigger {prepared.event_trigger.value}, Direction {prepared.log_direction.value}, Status {log_status.value}, Recipient: {prepared.recipient_email}")
+
+
+async def send_appointment_notification(
+    db: Session,
+    appointment: Appointment,
+    event_trigger: TemplateEventTrigger,
+    recipient_override: Optional[str] = None
+) -> Optional[bool]:
+    """
+    Fetches template, renders, sends email, and logs communication for an appointment event.
+    Adds log entry to session but DOES NOT COMMIT.
+    Returns True if the email was accepted, False if sending failed (worth retrying),
+    None if nothing was sent for a non-transient reason (no recipient, no template...).
+    """
+    prepared = prepare_appointment_notification(db, appointment, event_trigger, recipient_override)
+    if prepared is None:
+        return None
+
+    send_success = await deliver_notification(prepared)
+    log_notification_result(db, prepared, send_success)
     # --- IMPORTANT: No db.commit() here ---
-    logger.info(f"Notification attempt logged for Appt ID {appointment.id}, Trigger {event_trigger.value}, Direction {log_direction.value}, Status {log_status.value}, Recipient: {recipient_email}")
+    return send_success
@@ -0,0 +1,152 @@
+# app/services/outbox.py
+# --- NEW FILE ---
+#
+# Transactional outbox: callers add OutboxMessage rows to their own session, so a
+# notification exists if and only if the business change it belongs to committed.
+# Delivery (claiming, sending, logging) is done by app/tasks/outbox_tasks.py.
+
+from datetime import datetime, timedelta, timezone as pytimezone
+from typing import List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.appointment import Appointment
+from app.models.communications_log import CommunicationType
+from app.models.outbox import OutboxMessage, OutboxKind, OutboxStatus
+from app.models.template import TemplateEventTrigger
+
+import logging
+logger = logging.getLogger(__name__)
+
+OUTBOX_RETRY_BASE_SECONDS = 30 # 30s, 1m, 2m, 4m, 8m...
+OUTBOX_RETRY_MAX_SECONDS = 15 * 60
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt after `attempts` failed sends."""
+    return timedelta(seconds=min(OUTBOX_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), OUTBOX_RETRY_MAX_SECONDS))
+
+
+def enqueue_appointment_notification(db: Session, appointment: Appointment, event_trigger: TemplateEventTrigger) -> OutboxMessage:
+    """
+    Adds an appointment notification to the caller's transaction. DOES NOT COMMIT.
+    The email is rendered at send time, so template edits made before delivery apply.
+    """
+    if appointment.id is None:
+        db.flush() # Need the appointment id; stays inside the caller's transaction
+    message = OutboxMessage(
+        tenant_id=appointment.tenant_id,
+        kind=OutboxKind.APPOINTMENT_NOTIFICATION,
+        appointment_id=appointment.id,
+        event_trigger=event_trigger.value,
+    )
+    db.add(message)
+    return message
+
+
+def enqueue_email(
+    db: Session,
+    tenant_id: int,
+    to_email: str,
+    subject: str,
+    html_body: str,
+    user_id: Optional[int] = None,
+    log_type: CommunicationType = CommunicationType.SYSTEM_ALERT,
+    log_notes: Optional[str] = None,
+) -> OutboxMessage:
+    """
+    Adds a pre-rendered email (e.g. a staff invitation) to the caller's transaction. DOES NOT COMMIT.
+    log_notes is appended to the CommunicationsLog entry written once the email is processed.
+    """
+    message = OutboxMessage(
+        tenant_id=tenant_id,
+        kind=OutboxKind.EMAIL,
+        payload={
+            "to_email": to_email,
+            "subject": subject,
+            "html_body": html_body,
+            "user_id": user_id,
+            "log_type": log_type.value,
+            "log_notes": log_notes,
+        },
+    )
+    db.add(message)
+    return message
+
+
+def claim_batch(db: Session, run_id: str, limit: int) -> List[int]:
+    """
+    Claims up to `limit` due rows for this dispatcher run, COMMITS the claim and returns their ids.
+    FOR UPDATE SKIP LOCKED lets any number of dispatchers claim concurrently without
+    waiting on (or double-claiming) each other's rows. Rows left in 'sending' by a
+    crashed run become claimable again after settings.outbox_lease_seconds.
+    """
+    now_utc = datetime.now(pytimezone.utc)
+    lease_cutoff = now_utc - timedelta(seconds=settings.outbox_lease_seconds)
+
+    rows = db.query(OutboxMessage).filter(
+        or_(
+            and_(OutboxMessage.status == OutboxStatus.PENDING, OutboxMessage.available_at <= now_utc),
+            and_(OutboxMessage.status == OutboxStatus.SENDING, OutboxMessage.locked_at < lease_cutoff),
+        )
+    ).order_by(OutboxMessage.available_at).limit(limit).with_for_update(skip_locked=True).all()
+
+    for row in rows:
+        row.status = OutboxStatus.SENDING
+        row.locked_by = run_id
+        row.locked_at = now_utc
+        row.attempts = (row.attempts or 0) + 1
+    ids = [row.id for row in rows]
+    db.commit()
+    return ids
+
+
+def lock_claimed(db: Session, run_id: str, ids: List[int]) -> List[OutboxMessage]:
+    """
+    Re-locks rows this run still owns before recording results. A row whose lease
+    expired and was re-claimed by another run is skipped, so each result is logged once.
+    """
+    if not ids:
+        return []
+    return db.query(OutboxMessage).filter(
+        OutboxMessage.id.in_(ids),
+        OutboxMessage.locked_by == run_id,
+        OutboxMessage.status == OutboxStatus.SENDING,
+    ).with_for_update().all()
+
+
+def mark_sent(row: OutboxMessage) -> None:
+    row.status = OutboxStatus.SENT
+    row.processed_at = datetime.now(pytimezone.utc)
+    row.locked_by = None
+    row.last_error = None
+
+
+def mark_skipped(row: OutboxMessage, reason: str) -> None:
+    row.status = OutboxStatus.SKIPPED
+    row.processed_at = datetime.now(pytimezone.utc)
+    row.locked_by = None
+    row.last_error = reason
+
+
+def defer(row: OutboxMessage, seconds: float) -> None:
+    """Puts a claimed row back (rate limited): not an attempt, due again in `seconds`."""
+    row.status = OutboxStatus.PENDING
+    row.locked_by = None
+    row.attempts = max((row.attempts or 1) - 1, 0)
+    row.available_at = datetime.now(pytimezone.utc) + timedelta(seconds=seconds)
+
+
+def mark_failed_attempt(row: OutboxMessage, error: str) -> bool:
+    """Schedules a retry with backoff, or gives up. Returns True if the row is now permanently FAILED."""
+    row.locked_by = None
+    row.last_error = error
+    if row.attempts >= settings.outbox_max_attempts:
+        row.status = OutboxStatus.FAILED
+        row.processed_at = datetime.now(pytimezone.utc)
+        return True
+    row.status = OutboxStatus.PENDING
+    row.available_at = datetime.now(pytimezone.utc) + retry_delay(row.attempts)
+    return False
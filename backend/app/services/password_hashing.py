@@ -0,0 +1,177 @@
+# app/services/password_hashing.py
+# --- NEW FILE ---
+#
+# bcrypt off the request threadpool. Hashing and verification run in a small
+# per-process pool of worker processes (settings.password_hash_workers), so a login
+# burst uses at most that many cores, and at most settings.password_hash_max_pending
+# calls may be queued or running at once: beyond that PasswordHashingBusy is raised
+# immediately (routers answer 429) instead of parking more threadpool threads
+# behind ~250ms jobs.
+# The cost factor is settings.password_bcrypt_rounds. verify_and_update() returns a
+# new hash when the stored one has another cost, for the caller to save.
+# Timings (queue wait, bcrypt time) are kept per process (stats(), /ops/password-hashing)
+# and per operation in app.core.metrics as password_hash.*.
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.config import settings
+from app.core import metrics
+
+import logging
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.password_bcrypt_rounds,
+    # Hashes with any other cost "need update", so a cost change is applied at next login
+    bcrypt__min_rounds=settings.password_bcrypt_rounds,
+    bcrypt__max_rounds=settings.password_bcrypt_rounds,
+)
+
+
+class PasswordHashingBusy(Exception):
+    """Too many hash/verify calls pending in this process; retry after retry_after_seconds."""
+
+    def __init__(self, retry_after_seconds: int = 1):
+        super().__init__("Password hashing is saturated")
+        self.retry_after_seconds = retry_after_seconds
+
+
+# --- Run in the worker processes ---
+
+def _hash_in_worker(password: str) -> Tuple[str, float]:
+    started = time.perf_counter()
+    hashed = pwd_context.hash(password)
+    return hashed, time.perf_counter() - started
+
+
+def _verify_in_worker(password: str, hashed: str) -> Tuple[Tuple[bool, Optional[str]], float]:
+    started = time.perf_counter()
+    result = pwd_context.verify_and_update(password, hashed)
+    return result, time.perf_counter() - started
+
+
+# --- Pool (this process) ---
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+_slots: Optional[threading.BoundedSemaphore] = None
+
+_stats: Counter = Counter()
+_stats_lock = threading.Lock()
+
+
+def _get_executor() -> Tuple[ProcessPoolExecutor, threading.BoundedSemaphore]:
+    """This process's pool; a forked child gets a fresh one. Workers are spawned, not forked."""
+    global _executor, _executor_pid, _slots
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=max(settings.password_hash_workers, 1),
+                mp_context=multiprocessing.get_context("spawn"), # Forking a threaded server is unsafe
+            )
+            _executor_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(max(settings.password_hash_max_pending, 1))
+        return _executor, _slots
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _record(operation: str, wait_seconds: float, work_seconds: float) -> None:
+    wait_ms, work_ms = int(wait_seconds * 1000), int(work_seconds * 1000)
+    with _stats_lock:
+        _stats[f"{operation}.count"] += 1
+        _stats[f"{operation}.wait_ms_total"] += wait_ms
+        _stats[f"{operation}.work_ms_total"] += work_ms
+        _stats[f"{operation}.wait_ms_max"] = max(_stats[f"{operation}.wait_ms_max"], wait_ms)
+        _stats[f"{operation}.work_ms_max"] = max(_stats[f"{operation}.work_ms_max"], work_ms)
+    metrics.incr(f"password_hash.{operation}.count")
+    metrics.incr(f"password_hash.{operation}.wait_ms_total", wait_ms)
+    metrics.incr(f"password_hash.{operation}.work_ms_total", work_ms)
+
+
+def _reject() -> PasswordHashingBusy:
+    with _stats_lock:
+        _stats["rejected"] += 1
+    metrics.incr("password_hash.rejected")
+    return PasswordHashingBusy()
+
+
+def _run(operation: str, fn: Callable[..., Tuple[Any, float]], *args: Any) -> Any:
+    """Runs fn in the pool and waits for it (the calling thread only waits). Retries once on a broken pool."""
+    for attempt in (1, 2):
+        executor, slots = _get_executor()
+        if not slots.acquire(blocking=False):
+            raise _reject()
+        started = time.perf_counter()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            slots.release()
+            _discard_executor(executor)
+            if attempt == 2:
+                raise
+            continue
+        future.add_done_callback(lambda _: slots.release()) # The slot stays taken until the job really ends
+
+        try:
+            result, work_seconds = future.result(timeout=settings.password_hash_timeout_seconds)
+        except FutureTimeoutError:
+            logger.warning(f"Password {operation} took over {settings.password_hash_timeout_seconds}s; rejecting.")
+            raise _reject()
+        except BrokenProcessPool:
+            logger.error(f"Password hashing worker died during {operation}; restarting the pool.")
+            _discard_executor(executor)
+            if attempt == 2:
+                raise
+            continue
+        _record(operation, time.perf_counter() - started - work_seconds, work_seconds)
+        return result
+
+
+def hash_password(password: str) -> str:
+    """bcrypt hash at the configured cost. Raises PasswordHashingBusy when saturated."""
+    return _run("hash", _hash_in_worker, password)
+
+
+def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    (matches, new_hash). new_hash is set when the password matches but the stored hash
+    has another cost factor: store it. Raises PasswordHashingBusy when saturated.
+    """
+    return _run("verify", _verify_in_worker, password, hashed)
+
+
+def stats() -> Dict[str, Any]:
+    """This process's counters, with average wait/bcrypt times per operation."""
+    with _stats_lock:
+        counts = dict(_stats)
+    result: Dict[str, Any] = {
+        "workers": settings.password_hash_workers,
+        "max_pending": settings.password_hash_max_pending,
+        "rounds": settings.password_bcrypt_rounds,
+        **counts,
+    }
+    for operation in ("hash", "verify"):
+        count = counts.get(f"{operation}.count", 0)
+        for part in ("wait", "work"):
+            total = counts.get(f"{operation}.{part}_ms_total", 0)
+            result[f"{operation}.{part}_ms_avg"] = round(total / count, 1) if count else None
+    return result
@@ -0,0 +1,231 @@
+# app/services/principal_cache.py
+# --- NEW FILE ---
+#
+# Cache behind get_current_user: token subject (email) -> Principal, a small frozen
+# snapshot of the user (id, tenant, role, active flags), so authenticated requests
+# skip the users query and routers never lazy-load the ORM User or its tenant.
+# Two entries per principal, so a tenant suspension is one invalidation:
+#   - user:   email -> (id, email, name, tenant_id, role, is_active)
+#   - tenant: tenant_id -> is_active
+# Two tiers:
+#   - in-process LRU, settings.principal_cache_local_ttl_seconds (short: other
+#     processes only see an invalidation once their entry expires)
+#   - Redis "principal:user:{email}" / "principal:tenant:{id}",
+#     settings.principal_cache_ttl_seconds, deleted on invalidation (shared by all workers)
+# Invalidate after the commit of: user update/deletion, (de)activation, role change,
+# tenant suspension/reactivation. Redis errors fall back to the database.
+# Hit/miss counts are kept per process (stats()) and pushed to app.core.metrics as
+# principal_cache.* every METRICS_FLUSH_SECONDS by the lookups themselves.
+
+from collections import Counter
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+import json
+import time
+
+import redis
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core import metrics
+from app.core.redis_client import get_redis
+from app.models.tenant import Tenant
+from app.models.user import User
+from app.utils.cache import LRUCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+USER_KEY_PREFIX = "principal:user"
+TENANT_KEY_PREFIX = "principal:tenant"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as routers see it. Not attached to any session."""
+    id: int
+    email: str
+    name: str
+    tenant_id: int
+    role: str
+    is_active: bool
+    tenant_is_active: bool
+
+
+_UserEntry = Tuple[int, str, str, int, str, bool] # id, email, name, tenant_id, role, is_active
+
+_users = LRUCache(maxsize=4096, ttl_seconds=settings.principal_cache_local_ttl_seconds)
+_tenants = LRUCache(maxsize=1024, ttl_seconds=settings.principal_cache_local_ttl_seconds)
+
+METRICS_FLUSH_SECONDS = 10 # Counts reach app.core.metrics in batches, not one Redis call per lookup
+
+_counters: Counter = Counter()
+_reported: Counter = Counter() # Part of _counters already added to app.core.metrics
+_counters_lock = Lock()
+_last_flush = 0.0
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def _metrics_due() -> bool:
+    return time.monotonic() - _last_flush >= METRICS_FLUSH_SECONDS
+
+
+def flush_metrics() -> None:
+    """Adds the counts since the last flush to app.core.metrics as principal_cache.*."""
+    global _last_flush
+    with _counters_lock:
+        _last_flush = time.monotonic()
+        deltas = {name: value - _reported[name] for name, value in _counters.items() if value != _reported[name]}
+        _reported.update(deltas)
+    for name, delta in deltas.items():
+        metrics.incr(f"principal_cache.{name}", delta)
+
+
+def _redis():
+    if settings.principal_cache_ttl_seconds <= 0:
+        return None
+    return get_redis()
+
+
+def _local_enabled() -> bool:
+    return settings.principal_cache_local_ttl_seconds > 0
+
+
+def _user_key(email: str) -> str:
+    return f"{USER_KEY_PREFIX}:{email}"
+
+
+def _tenant_key(tenant_id: int) -> str:
+    return f"{TENANT_KEY_PREFIX}:{tenant_id}"
+
+
+def _cached_user(email: str) -> Optional[_UserEntry]:
+    if _local_enabled():
+        entry = _users.get(email)
+        if entry is not None:
+            _count("local.hit")
+            return entry
+    client = _redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(_user_key(email))
+    except redis.RedisError as e:
+        logger.warning(f"Principal cache read failed for {email}: {e}")
+        return None
+    if raw is None:
+        return None
+    _count("redis.hit")
+    entry = tuple(json.loads(raw))
+    if _local_enabled():
+        _users.set(email, entry)
+    return entry
+
+
+def _cached_tenant_active(tenant_id: int) -> Optional[bool]:
+    if _local_enabled():
+        active = _tenants.get(tenant_id)
+        if active is not None:
+            return active
+    client = _redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(_tenant_key(tenant_id))
+    except redis.RedisError as e:
+        logger.warning(f"Principal cache read failed for tenant {tenant_id}: {e}")
+        return None
+    if raw is None:
+        return None
+    active = raw == "1"
+    if _local_enabled():
+        _tenants.set(tenant_id, active)
+    return active
+
+
+def _store(user: Optional[_UserEntry], tenant_id: int, tenant_active: Optional[bool]) -> None:
+    if _local_enabled():
+        if user is not None:
+            _users.set(user[1], user)
+        if tenant_active is not None:
+            _tenants.set(tenant_id, tenant_active)
+    client = _redis()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        if user is not None:
+            pipe.set(_user_key(user[1]), json.dumps(user), ex=settings.principal_cache_ttl_seconds)
+        if tenant_active is not None:
+            pipe.set(_tenant_key(tenant_id), "1" if tenant_active else "0", ex=settings.principal_cache_ttl_seconds)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Principal cache write failed for tenant {tenant_id}: {e}")
+
+
+def get_principal(db: Session, email: str) -> Optional[Principal]:
+    """The Principal for a token subject, or None if no such user exists (not cached)."""
+    if _metrics_due():
+        flush_metrics()
+    user = _cached_user(email)
+    tenant_active = _cached_tenant_active(user[3]) if user is not None else None
+
+    if user is None:
+        _count("miss")
+        row = db.query(
+            User.id, User.email, User.name, User.tenant_id, User.role, User.is_active, Tenant.is_active
+        ).outerjoin(Tenant, Tenant.id == User.tenant_id).filter(User.email == email).first()
+        if row is None:
+            return None
+        user = (row[0], row[1], row[2], row[3], row[4], bool(row[5]))
+        tenant_active = bool(row[6])
+        _store(user, user[3], tenant_active)
+    elif tenant_active is None:
+        _count("tenant_miss")
+        tenant_active = bool(db.query(Tenant.is_active).filter(Tenant.id == user[3]).scalar())
+        _store(None, user[3], tenant_active)
+
+    return Principal(*user, tenant_is_active=tenant_active)
+
+
+def invalidate_user(*emails: Optional[str]) -> None:
+    """Drops the cached principal(s); pass both the old and new email when an email changes."""
+    emails = tuple(email for email in emails if email)
+    for email in emails:
+        _users.pop(email)
+    client = _redis()
+    if client is None or not emails:
+        return
+    try:
+        client.delete(*(_user_key(email) for email in emails))
+    except redis.RedisError as e:
+        logger.warning(f"Principal cache invalidation failed for {emails}: {e}")
+
+
+def invalidate_tenant(tenant_id: int) -> None:
+    """Drops a tenant's active flag (suspension/reactivation applies to all of its users)."""
+    _tenants.pop(tenant_id)
+    client = _redis()
+    if client is None:
+        return
+    try:
+        client.delete(_tenant_key(tenant_id))
+    except redis.RedisError as e:
+        logger.warning(f"Principal cache invalidation failed for tenant {tenant_id}: {e}")
+
+
+def stats() -> Dict[str, Any]:
+    """This process's counters and sizes."""
+    with _counters_lock:
+        counts = dict(_counters)
+    lookups = sum(counts.get(name, 0) for name in ("local.hit", "redis.hit", "miss"))
+    hits = counts.get("local.hit", 0) + counts.get("redis.hit", 0)
+    return {
+        "users_size": len(_users), "tenants_size": len(_tenants), **counts,
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+    }
@@ -0,0 +1,107 @@
+# app/services/rate_limiter.py
+# --- NEW FILE ---
+#
+# Redis token buckets that workers consult before each email, so one tenant's
+# reminder burst cannot eat the shared SMTP quota:
+#   - a global bucket (settings.email_rate_global_per_second / _burst)
+#   - one bucket per tenant (settings.email_rate_tenant_per_minute / _burst)
+# A send takes one token from the tenant's bucket AND the global one, atomically
+# (Lua), or from neither. Bulk sends (reminders) must leave
+# settings.email_rate_bulk_reserve of each bucket untouched, which keeps headroom
+# for transactional mail (booking confirmations, invitations) during a burst.
+# Callers defer (retry later) when refused; nothing is failed because of a limit.
+# No Redis, or a Redis error: every send is allowed (fail open), like the caches.
+
+import time
+from typing import List, Optional
+
+import redis
+
+from app.config import settings
+from app.core import metrics
+from app.core.redis_client import get_redis
+
+import logging
+logger = logging.getLogger(__name__)
+
+TRANSACTIONAL = "transactional"
+BULK = "bulk"
+
+GLOBAL_BUCKET_KEY = "ratelimit:email:global"
+TENANT_BUCKET_KEY_PREFIX = "ratelimit:email:tenant"
+
+# KEYS: bucket keys. ARGV: now, then (rate per second, burst, min level) per key.
+# Returns 0 when a token was taken from every bucket, else the seconds until the
+# emptiest bucket can give one (nothing is taken in that case).
+TOKEN_BUCKET_LUA = """
+local now = tonumber(ARGV[1])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 + (i - 1) * 3])
+    local burst = tonumber(ARGV[3 + (i - 1) * 3])
+    local min_level = tonumber(ARGV[4 + (i - 1) * 3])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens - 1 < min_level then
+        wait = math.max(wait, (1 + min_level - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 + (i - 1) * 3])
+    local burst = tonumber(ARGV[3 + (i - 1) * 3])
+    redis.call('HSET', key, 'tokens', levels[i] - 1, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 60)
+end
+return '0'
+"""
+
+_script = None
+
+
+def _buckets(tenant_id: Optional[int], priority: str):
+    """(key, rate per second, burst, min level) of each enabled bucket for this send."""
+    reserve = settings.email_rate_bulk_reserve if priority == BULK else 0.0
+    buckets = []
+    if settings.email_rate_global_per_second > 0:
+        burst = max(settings.email_rate_global_burst, 1)
+        buckets.append((GLOBAL_BUCKET_KEY, settings.email_rate_global_per_second, burst, burst * reserve))
+    if tenant_id is not None and settings.email_rate_tenant_per_minute > 0:
+        burst = max(settings.email_rate_tenant_burst, 1)
+        buckets.append((f"{TENANT_BUCKET_KEY_PREFIX}:{tenant_id}", settings.email_rate_tenant_per_minute / 60, burst, burst * reserve))
+    return buckets
+
+
+def acquire_send(tenant_id: Optional[int], priority: str = TRANSACTIONAL) -> float:
+    """
+    Takes a send token for the tenant (None: system email, global bucket only).
+    Returns 0.0 if the email may go out now, else the seconds to wait before trying again.
+    """
+    global _script
+    buckets = _buckets(tenant_id, priority)
+    client = get_redis()
+    if not buckets or client is None:
+        return 0.0
+    try:
+        if _script is None:
+            _script = client.register_script(TOKEN_BUCKET_LUA)
+        args: List[float] = [time.time()]
+        for _, rate, burst, min_level in buckets:
+            args.extend((rate, burst, min_level))
+        wait = float(_script(keys=[key for key, *_ in buckets], args=args))
+    except redis.RedisError as e:
+        logger.warning(f"Email rate limiter unavailable, allowing send: {e}")
+        return 0.0
+    return wait
+
+
+def record_deferred(priority: str, count: int) -> None:
+    """Counts sends pushed back by the limiter (rate_limit.deferred.* in /ops/metrics)."""
+    if count:
+        metrics.incr(f"rate_limit.deferred.{priority}", count)
@@ -0,0 +1,124 @@
+# app/services/reminder_runs.py
+# --- NEW FILE ---
+#
+# Per-run bookkeeping for the reminder scan. A run is split into chunk tasks that
+# may execute on different workers, so counters for a run live in a Redis hash
+# ("reminders:run:{run_id}") that every chunk increments; the chunk that finishes
+# last stamps the run's duration. Global totals also go to app.core.metrics.
+
+from datetime import datetime, timezone as pytimezone
+from typing import Any, Dict, List
+import logging
+import time
+
+import redis
+
+from app.core import metrics
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+RUN_KEY_PREFIX = "reminders:run"
+RECENT_RUNS_KEY = "reminders:runs"
+RECENT_RUNS_KEPT = 50
+RUN_TTL_SECONDS = 7 * 24 * 3600
+
+
+def _run_key(run_id: str) -> str:
+    return f"{RUN_KEY_PREFIX}:{run_id}"
+
+
+def start_run(run_id: str, found: int, chunks: int, scan_seconds: float) -> None:
+    """Records the scan result. With no chunks to run, the run is finished right away."""
+    metrics.incr("reminders.runs")
+    if found:
+        metrics.incr("reminders.found", found)
+    client = get_redis()
+    if client is None:
+        return
+    now = time.time()
+    fields = {
+        "run_id": run_id,
+        "started_at": now,
+        "scan_ms": int(scan_seconds * 1000),
+        "found": found,
+        "chunks": chunks,
+        "chunks_done": 0,
+        "sent": 0,
+        "failed": 0,
+        "skipped": 0,
+        "deferred": 0,
+    }
+    if chunks == 0:
+        fields["finished_at"] = now
+        fields["duration_ms"] = fields["scan_ms"]
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(_run_key(run_id), mapping=fields)
+        pipe.expire(_run_key(run_id), RUN_TTL_SECONDS)
+        pipe.lpush(RECENT_RUNS_KEY, run_id)
+        pipe.ltrim(RECENT_RUNS_KEY, 0, RECENT_RUNS_KEPT - 1)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record reminder run {run_id}: {e}")
+
+
+def record_chunk(run_id: str, sent: int, failed: int, skipped: int, deferred: int = 0, continued: bool = False) -> None:
+    """
+    Adds a finished chunk's results to its run; the last chunk marks the run finished.
+    continued=True: the chunk queued a follow-up chunk (rate-limited reminders), which the run waits for.
+    """
+    if sent:
+        metrics.incr("reminders.sent", sent)
+    if failed:
+        metrics.incr("reminders.failed", failed)
+    if skipped:
+        metrics.incr("reminders.skipped", skipped)
+    client = get_redis()
+    if client is None or not run_id:
+        return
+    key = _run_key(run_id)
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.hincrby(key, "sent", sent)
+        pipe.hincrby(key, "failed", failed)
+        pipe.hincrby(key, "skipped", skipped)
+        pipe.hincrby(key, "deferred", deferred)
+        pipe.hincrby(key, "chunks", 1 if continued else 0)
+        pipe.hincrby(key, "chunks_done", 1)
+        pipe.hmget(key, "chunks", "started_at")
+        *_, chunks_done, (chunks, started_at) = pipe.execute()
+        if chunks is not None and started_at is not None and chunks_done >= int(chunks):
+            now = time.time()
+            client.hset(key, mapping={"finished_at": now, "duration_ms": int((now - float(started_at)) * 1000)})
+            logger.info(f"Reminder run {run_id} finished in {now - float(started_at):.1f}s.")
+    except redis.RedisError as e:
+        logger.warning(f"Could not record reminder chunk for run {run_id}: {e}")
+
+
+def recent_runs(limit: int = 20) -> List[Dict[str, Any]]:
+    """Most recent runs first. Empty when Redis is not configured."""
+    client = get_redis()
+    if client is None:
+        return []
+    try:
+        run_ids = client.lrange(RECENT_RUNS_KEY, 0, max(limit, 1) - 1)
+        pipe = client.pipeline(transaction=False)
+        for run_id in run_ids:
+            pipe.hgetall(_run_key(run_id))
+        raw_runs = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not read reminder runs: {e}")
+        return []
+
+    runs = []
+    for raw in raw_runs:
+        if not raw:
+            continue # Expired
+        run: Dict[str, Any] = {"run_id": raw.get("run_id")}
+        for name in ("scan_ms", "found", "chunks", "chunks_done", "sent", "failed", "skipped", "deferred", "duration_ms"):
+            run[name] = int(raw[name]) if raw.get(name) is not None else None
+        for name in ("started_at", "finished_at"):
+            run[name] = datetime.fromtimestamp(float(raw[name]), tz=pytimezone.utc).isoformat() if raw.get(name) else None
+        runs.append(run)
+    return runs
@@ -0,0 +1,153 @@
+# app/services/reminder_schedule.py
+# --- NEW FILE ---
+#
+# Keeps appointment_reminders (one row per appointment and offset) in step with
+# appointment times, tenant offsets and per-service offsets, so the reminder
+# scheduler only has to read `due_at <= now()` from a partial index.
+# Offsets: the services' own reminder_offsets_hours if any service of the
+# appointment defines them, else the tenant's reminder_offsets_hours, else
+# [tenant.reminder_interval_hours]. None of these commit.
+# An offset whose moment has already passed when the appointment is booked or
+# moved (booked 2h ahead, 24h offset) gets no row: it is never sent late.
+
+from datetime import datetime, timedelta, timezone as pytimezone
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, delete, exists, func, literal, select, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.appointment import Appointment
+from app.models.appointment_reminder import AppointmentReminder
+from app.models.association_tables import appointment_services_table
+from app.models.service import Service
+from app.services.availability_engine import to_utc
+from app.schemas.enums import AppointmentStatus
+
+import logging
+logger = logging.getLogger(__name__)
+
+REMINDABLE_STATUSES = (AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED)
+
+
+def normalize_offsets(values: Optional[Iterable[Optional[int]]]) -> List[int]:
+    """Positive, de-duplicated offsets, largest (earliest reminder) first."""
+    return sorted({int(v) for v in (values or []) if v is not None and int(v) > 0}, reverse=True)
+
+
+def tenant_reminder_offsets(tenant) -> List[int]:
+    if tenant.reminder_offsets_hours is not None:
+        return normalize_offsets(tenant.reminder_offsets_hours)
+    return normalize_offsets([tenant.reminder_interval_hours])
+
+
+def appointment_reminder_offsets(tenant, services: Iterable[Service]) -> List[int]:
+    """Union of the per-service offsets when any service overrides them, else the tenant's."""
+    overriding = [s.reminder_offsets_hours for s in services if s.reminder_offsets_hours is not None]
+    if overriding:
+        return normalize_offsets(offset for offsets in overriding for offset in offsets)
+    return tenant_reminder_offsets(tenant)
+
+
+def schedule_reminders(appointment: Appointment, tenant, reset_sent: bool = True) -> None:
+    """
+    Creates/updates/removes the appointment's reminder rows for its current time and offsets.
+    reset_sent=True (create, reschedule): a new time means every reminder goes out again.
+    reset_sent=False (offset settings changed): reminders already processed are left alone.
+    Offsets already past (due_at <= now) get no row, so no late reminder goes out.
+    """
+    now_utc = datetime.now(pytimezone.utc)
+    offsets = appointment_reminder_offsets(tenant, appointment.services)
+    existing = {reminder.offset_hours: reminder for reminder in appointment.reminders}
+
+    for offset, reminder in existing.items():
+        if offset not in offsets and (reset_sent or reminder.sent_at is None):
+            appointment.reminders.remove(reminder) # delete-orphan
+
+    for offset in offsets:
+        due_at = to_utc(appointment.appointment_time) - timedelta(hours=offset)
+        reminder = existing.get(offset)
+        if reminder is not None and not reset_sent:
+            continue # Same time: the row stands, whether processed or still due
+        if due_at <= now_utc:
+            if reminder is not None:
+                appointment.reminders.remove(reminder) # Moved inside the offset: too late for this one
+            continue
+        if reminder is None:
+            appointment.reminders.append(AppointmentReminder(tenant_id=appointment.tenant_id, offset_hours=offset, due_at=due_at))
+        else:
+            reminder.due_at = due_at
+            reminder.sent_at = None
+            reminder.outcome = None
+            reminder.claimed_until = None
+
+
+def _upcoming_appointment_ids(tenant_id: int, now_utc: datetime):
+    """Upcoming active appointments of the tenant that follow the tenant offsets (no service override)."""
+    has_service_override = exists().where(
+        appointment_services_table.c.appointment_id == Appointment.id,
+        appointment_services_table.c.service_id == Service.id,
+        Service.reminder_offsets_hours.isnot(None),
+    )
+    return select(Appointment.id).where(
+        Appointment.tenant_id == tenant_id,
+        Appointment.appointment_time > now_utc,
+        Appointment.status.in_(REMINDABLE_STATUSES),
+        ~has_service_override,
+    )
+
+
+def reschedule_tenant_reminders(db: Session, tenant) -> None:
+    """
+    Applies changed tenant offsets to its upcoming appointments, set-based:
+    one DELETE for offsets no longer configured (unsent only) and one
+    INSERT ... ON CONFLICT DO NOTHING per offset for missing rows.
+    As in schedule_reminders(), offsets already past get no row: adding a 48h
+    offset does not email everyone booked in the next 48 hours.
+    """
+    now_utc = datetime.now(pytimezone.utc)
+    offsets = tenant_reminder_offsets(tenant)
+    upcoming = _upcoming_appointment_ids(tenant.id, now_utc)
+
+    deleted = db.execute(
+        delete(AppointmentReminder).where(
+            AppointmentReminder.appointment_id.in_(upcoming),
+            AppointmentReminder.sent_at.is_(None),
+            AppointmentReminder.offset_hours.notin_(offsets) if offsets else true(),
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+
+    inserted = 0
+    for offset in offsets:
+        due_at = Appointment.appointment_time - func.make_interval(0, 0, 0, 0, offset)
+        rows = select(
+            Appointment.id,
+            Appointment.tenant_id,
+            literal(offset),
+            due_at,
+        ).where(Appointment.id.in_(upcoming), due_at > now_utc)
+        stmt = pg_insert(AppointmentReminder).from_select(
+            ["appointment_id", "tenant_id", "offset_hours", "due_at"], rows
+        ).on_conflict_do_nothing(constraint="uq_appointment_reminders_appointment_offset")
+        inserted += db.execute(stmt).rowcount
+    logger.info(f"Tenant {tenant.id} reminder offsets {offsets}: {inserted} reminder(s) added, {deleted} removed.")
+
+
+def reschedule_service_reminders(db: Session, service: Service) -> int:
+    """Re-derives reminders of upcoming appointments that include the service (its offsets changed)."""
+    now_utc = datetime.now(pytimezone.utc)
+    appointments = db.query(Appointment).join(
+        appointment_services_table, and_(
+            appointment_services_table.c.appointment_id == Appointment.id,
+            appointment_services_table.c.service_id == service.id,
+        )
+    ).filter(
+        Appointment.appointment_time > now_utc,
+        Appointment.status.in_(REMINDABLE_STATUSES),
+    ).options(
+        selectinload(Appointment.services),
+        selectinload(Appointment.reminders),
+    ).all()
+    for appointment in appointments:
+        schedule_reminders(appointment, appointment.tenant, reset_sent=False)
+    return len(appointments)
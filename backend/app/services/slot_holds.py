@@ -0,0 +1,239 @@
+# app/services/slot_holds.py
+# --- NEW FILE ---
+#
+# Short-lived slot holds (leases) for the public booking flow, stored only in Redis.
+# Layout:
+#   "hold:{hold_id}"            -> JSON {tenant_id, start, end, ip} with EX = hold TTL (lookup/consume by id)
+#   "holds:{tenant_id}"         -> ZSET, member "{start}:{end}:{hold_id}" (epoch seconds), score = expiry
+#   "holds:{tenant_id}:ip:{ip}" -> ZSET, same members, the holds one client IP has on the tenant
+# Expired holds simply stop matching (score < now) and are pruned on the next hold
+# creation; nothing is ever written to Postgres for a hold.
+# Holds are public, so they are capped: a client IP keeps at most
+# settings.slot_hold_max_per_ip holds per tenant (a new hold releases its oldest one),
+# and a tenant at most settings.slot_hold_max_per_tenant (further holds are refused).
+
+from dataclasses import dataclass
+from datetime import datetime, timezone as pytimezone
+from typing import List, Optional, Tuple
+import json
+import logging
+import secrets
+import time
+
+import redis
+
+from app.config import settings
+from app.core import metrics
+from app.core.redis_client import get_redis
+from app.services.availability_engine import Interval, to_utc
+
+logger = logging.getLogger(__name__)
+
+HOLD_KEY_PREFIX = "hold"
+TENANT_HOLDS_PREFIX = "holds"
+
+
+# create_hold() outcomes
+CREATED = 1
+OVERLAP = 0
+TENANT_LIMIT = -1
+
+
+class SlotHoldUnavailableError(Exception):
+    """Raised when holds cannot be used (Redis not configured or unreachable)."""
+
+
+class SlotHoldLimitError(Exception):
+    """Raised when the tenant already has settings.slot_hold_max_per_tenant active holds."""
+
+
+@dataclass(frozen=True)
+class SlotHold:
+    tenant_id: int
+    start_utc: datetime
+    end_utc: datetime
+
+
+# KEYS: tenant holds, new hold key, client IP holds.
+# ARGV: now, start, end, expiry, hold_id, payload, ttl, max per IP (0: no cap), max per tenant (0: no cap), hold key prefix.
+# Prunes expired members, refuses if an active hold overlaps [start, end) (OVERLAP) or the tenant is
+# full (TENANT_LIMIT), releases the client's oldest holds beyond its cap, then adds the hold (CREATED).
+# Runs atomically in Redis, so two visitors can never hold overlapping ranges.
+_CREATE_HOLD_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+local new_start = tonumber(ARGV[2])
+local new_end = tonumber(ARGV[3])
+for _, member in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    local s, e = string.match(member, '^(%d+):(%d+):')
+    if tonumber(s) < new_end and tonumber(e) > new_start then
+        return 0
+    end
+end
+
+local max_per_ip = tonumber(ARGV[8])
+local max_per_tenant = tonumber(ARGV[9])
+local evict = 0
+if max_per_ip > 0 then
+    evict = math.max(redis.call('ZCARD', KEYS[3]) - max_per_ip + 1, 0)
+end
+if max_per_tenant > 0 and redis.call('ZCARD', KEYS[1]) - evict >= max_per_tenant then
+    return -1
+end
+if evict > 0 then
+    -- Lowest expiry first: the client's oldest holds
+    for _, member in ipairs(redis.call('ZRANGE', KEYS[3], 0, evict - 1)) do
+        local old_id = string.match(member, '^%d+:%d+:(.+)$')
+        redis.call('ZREM', KEYS[1], member)
+        redis.call('ZREM', KEYS[3], member)
+        redis.call('DEL', ARGV[10] .. ':' .. old_id)
+    end
+end
+
+local new_member = ARGV[2] .. ':' .. ARGV[3] .. ':' .. ARGV[5]
+redis.call('ZADD', KEYS[1], ARGV[4], new_member)
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+if max_per_ip > 0 then
+    redis.call('ZADD', KEYS[3], ARGV[4], new_member)
+    redis.call('EXPIRE', KEYS[3], ARGV[7])
+end
+redis.call('SET', KEYS[2], ARGV[6], 'EX', ARGV[7])
+return 1
+"""
+
+
+def _hold_key(hold_id: str) -> str:
+    return f"{HOLD_KEY_PREFIX}:{hold_id}"
+
+
+def _tenant_key(tenant_id: int) -> str:
+    return f"{TENANT_HOLDS_PREFIX}:{tenant_id}"
+
+
+def _client_ip_key(tenant_id: int, client_ip: Optional[str]) -> str:
+    # Unknown client addresses share one bucket
+    return f"{TENANT_HOLDS_PREFIX}:{tenant_id}:ip:{client_ip or 'unknown'}"
+
+
+def _client() -> redis.Redis:
+    client = get_redis()
+    if client is None:
+        raise SlotHoldUnavailableError("Redis is not configured.")
+    return client
+
+
+def create_hold(
+    tenant_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    client_ip: Optional[str] = None,
+) -> Optional[Tuple[str, datetime]]:
+    """
+    Places a hold on [start_time, end_time) for the tenant on behalf of client_ip, releasing
+    that client's oldest hold(s) on the tenant beyond settings.slot_hold_max_per_ip.
+    Returns (hold_id, expires_at), or None if another active hold overlaps.
+    Raises SlotHoldLimitError when the tenant has too many active holds, and
+    SlotHoldUnavailableError when Redis is unavailable.
+    """
+    client = _client()
+    start_ts, end_ts = int(to_utc(start_time).timestamp()), int(to_utc(end_time).timestamp())
+    ttl = settings.slot_hold_ttl_seconds
+    now = int(time.time())
+    expires_at = now + ttl
+    hold_id = secrets.token_urlsafe(16)
+    payload = json.dumps({"tenant_id": tenant_id, "start": start_ts, "end": end_ts, "ip": client_ip})
+    try:
+        outcome = int(client.eval(
+            _CREATE_HOLD_LUA, 3, _tenant_key(tenant_id), _hold_key(hold_id), _client_ip_key(tenant_id, client_ip),
+            now, start_ts, end_ts, expires_at, hold_id, payload, ttl,
+            max(settings.slot_hold_max_per_ip, 0), max(settings.slot_hold_max_per_tenant, 0), HOLD_KEY_PREFIX,
+        ))
+    except redis.RedisError as e:
+        logger.warning(f"Could not create slot hold for tenant {tenant_id}: {e}")
+        raise SlotHoldUnavailableError(str(e))
+
+    if outcome == TENANT_LIMIT:
+        metrics.incr("slot_holds.tenant_limit")
+        logger.warning(f"Tenant {tenant_id} has {settings.slot_hold_max_per_tenant} active slot holds; refusing another (client {client_ip}).")
+        raise SlotHoldLimitError()
+    if outcome == OVERLAP:
+        metrics.incr("slot_holds.rejected")
+        return None
+    metrics.incr("slot_holds.created")
+    return hold_id, datetime.fromtimestamp(expires_at, tz=pytimezone.utc)
+
+
+def active_holds(
+    tenant_id: int,
+    window_start: datetime,
+    window_end: datetime,
+    exclude_hold_id: Optional[str] = None,
+) -> List[Interval]:
+    """Unexpired holds of the tenant overlapping the window, as UTC intervals. Fails open (no holds) on Redis errors."""
+    client = get_redis()
+    if client is None:
+        return []
+    try:
+        members = client.zrangebyscore(_tenant_key(tenant_id), f"({int(time.time())}", "+inf")
+    except redis.RedisError as e:
+        logger.warning(f"Could not read slot holds for tenant {tenant_id}: {e}")
+        return []
+
+    window_start_ts, window_end_ts = to_utc(window_start).timestamp(), to_utc(window_end).timestamp()
+    holds: List[Interval] = []
+    for member in members:
+        start_ts, end_ts, hold_id = member.split(":", 2)
+        if hold_id == exclude_hold_id:
+            continue
+        start_ts, end_ts = int(start_ts), int(end_ts)
+        if start_ts < window_end_ts and end_ts > window_start_ts:
+            holds.append((
+                datetime.fromtimestamp(start_ts, tz=pytimezone.utc),
+                datetime.fromtimestamp(end_ts, tz=pytimezone.utc),
+            ))
+    return holds
+
+
+def get_hold(hold_id: str) -> Optional[SlotHold]:
+    """
+    The active hold with this id (any tenant), or None if it expired, was released or never existed.
+    Raises SlotHoldUnavailableError when Redis is unavailable.
+    """
+    client = _client()
+    try:
+        raw = client.get(_hold_key(hold_id))
+    except redis.RedisError as e:
+        logger.warning(f"Could not read slot hold {hold_id}: {e}")
+        raise SlotHoldUnavailableError(str(e))
+    if raw is None:
+        return None
+    hold = json.loads(raw)
+    return SlotHold(
+        tenant_id=hold["tenant_id"],
+        start_utc=datetime.fromtimestamp(hold["start"], tz=pytimezone.utc),
+        end_utc=datetime.fromtimestamp(hold["end"], tz=pytimezone.utc),
+    )
+
+
+def release_hold(tenant_id: int, hold_id: str) -> bool:
+    """Removes a hold (booking completed or visitor picked another slot). Returns False if it was already gone."""
+    client = get_redis()
+    if client is None or not hold_id:
+        return False
+    try:
+        raw = client.get(_hold_key(hold_id))
+        if raw is None:
+            return False
+        hold = json.loads(raw)
+        if hold.get("tenant_id") != tenant_id:
+            return False
+        member = f"{hold['start']}:{hold['end']}:{hold_id}"
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(_hold_key(hold_id))
+        pipe.zrem(_tenant_key(tenant_id), member)
+        pipe.zrem(_client_ip_key(tenant_id, hold.get("ip")), member)
+        pipe.execute()
+        return True
+    except redis.RedisError as e:
+        logger.warning(f"Could not release slot hold {hold_id} for tenant {tenant_id}: {e}")
+        return False
@@ -0,0 +1,220 @@
+# app/services/smtp_pool.py
+# --- NEW FILE ---
+#
+# Per-process pool of authenticated SMTP connections for email_service.send_email.
+# Opening a connection costs TCP + TLS + EHLO + LOGIN, which dominates the time
+# to send one email; the pool keeps up to `max_size` sessions alive and reuses them.
+#  - A reused connection gets RSET first; if the server dropped it meanwhile, it is
+#    discarded and the message goes out on a fresh connection (one retry).
+#  - A connection is closed after `max_messages` messages or `idle_seconds` idle,
+#    since relays cap messages per session and drop idle ones anyway.
+#  - Pools are not shared across fork(): a Celery prefork child builds its own.
+# Connection events also go to app.core.metrics; /ops/smtp-pool shows this process's pool.
+
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from app.config import settings
+from app.core import metrics
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    """
+    True if the connection is unusable (dropped, timed out, 421 closing), as opposed to
+    the server rejecting this message. SMTPException subclasses OSError, hence the order.
+    """
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code == 421
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+@dataclass
+class _PooledConnection:
+    server: smtplib.SMTP
+    created_at: float = field(default_factory=time.monotonic)
+    last_used_at: float = field(default_factory=time.monotonic)
+    messages_sent: int = 0
+
+
+class SmtpConnectionPool:
+    """Thread-safe (send_email runs in a threadpool) pool of logged-in SMTP sessions."""
+
+    def __init__(self, max_size: int, max_messages: int, idle_seconds: float, timeout: float = 30.0):
+        self.max_size = max(max_size, 1)
+        self.max_messages = max(max_messages, 1)
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self._idle: List[_PooledConnection] = []
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._stats: Dict[str, int] = {
+            "opened": 0, "reused": 0, "recycled": 0, "expired_idle": 0,
+            "reconnects": 0, "discarded": 0, "messages_sent": 0,
+        }
+
+    # --- Connections ---
+
+    def _open(self) -> _PooledConnection:
+        use_ssl = settings.mail_use_ssl or settings.mail_port == 465
+        smtp_class = smtplib.SMTP_SSL if use_ssl else smtplib.SMTP
+        server = smtp_class(settings.mail_server, settings.mail_port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if not use_ssl and server.has_extn('starttls'):
+                server.starttls()
+                server.ehlo()
+            if settings.mail_username and settings.mail_password:
+                server.login(settings.mail_username, settings.mail_password)
+        except Exception:
+            self._close(server)
+            raise
+        self._count("opened")
+        return _PooledConnection(server=server)
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+        if name in ("opened", "recycled", "reconnects"):
+            metrics.incr(f"smtp_pool.{name}")
+
+    def _checkout(self) -> _PooledConnection:
+        """An idle connection (RSET and ready), or a new one once a slot is free."""
+        while True:
+            with self._available:
+                while not self._idle and self._in_use >= self.max_size:
+                    self._available.wait()
+                conn = self._idle.pop() if self._idle else None
+                self._in_use += 1
+            if conn is None:
+                try:
+                    return self._open()
+                except Exception:
+                    self._release_slot()
+                    raise
+            if time.monotonic() - conn.last_used_at > self.idle_seconds:
+                self._count("expired_idle")
+                self._close(conn.server)
+                self._release_slot()
+                continue
+            try:
+                conn.server.rset() # Clean envelope; also detects a connection the server dropped
+                self._count("reused")
+                return conn
+            except OSError: # Any failure here, SMTP or socket, means the session is done
+                self._count("discarded")
+                self._close(conn.server)
+                self._release_slot()
+
+    def _release_slot(self) -> None:
+        with self._available:
+            self._in_use -= 1
+            self._available.notify()
+
+    def _checkin(self, conn: _PooledConnection, healthy: bool) -> None:
+        if not healthy:
+            self._count("discarded")
+            self._close(conn.server)
+        elif conn.messages_sent >= self.max_messages:
+            self._count("recycled")
+            self._close(conn.server)
+        else:
+            conn.last_used_at = time.monotonic()
+            with self._available:
+                self._idle.append(conn)
+        self._release_slot()
+
+    @contextmanager
+    def connection(self) -> Iterator[_PooledConnection]:
+        conn = self._checkout()
+        healthy = True
+        try:
+            yield conn
+        except Exception as e:
+            healthy = not is_connection_error(e)
+            raise
+        finally:
+            self._checkin(conn, healthy)
+
+    # --- Public API ---
+
+    def send(self, from_addr: str, to_addrs: Sequence[str], msg: str) -> None:
+        """
+        Sends one message on a pooled connection. A connection that turns out to be dead
+        is replaced once; SMTP rejections (SMTPRecipientsRefused, ...) are raised as-is.
+        """
+        for attempt in (1, 2):
+            try:
+                with self.connection() as conn:
+                    conn.server.sendmail(from_addr=from_addr, to_addrs=list(to_addrs), msg=msg)
+                    conn.messages_sent += 1
+                break
+            except OSError as e:
+                if attempt == 2 or not is_connection_error(e):
+                    raise
+                self._count("reconnects")
+                logger.info("SMTP connection dropped by the server; retrying on a new connection.")
+        with self._lock:
+            self._stats["messages_sent"] += 1
+
+    def close_all(self) -> None:
+        with self._available:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn.server)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self._stats,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max_size": self.max_size,
+                "max_messages": self.max_messages,
+            }
+
+
+_pool: Optional[SmtpConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SmtpConnectionPool:
+    """This process's pool; a forked child (Celery prefork) gets a fresh one."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = SmtpConnectionPool(
+                max_size=settings.smtp_pool_size,
+                max_messages=settings.smtp_pool_max_messages,
+                idle_seconds=settings.smtp_pool_idle_seconds,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def pool_stats() -> Optional[Dict[str, int]]:
+    """Stats of this process's pool, or None if it has not sent anything yet."""
+    if _pool is None or _pool_pid != os.getpid():
+        return None
+    return _pool.stats()
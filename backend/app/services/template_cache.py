@@ -0,0 +1,152 @@
+# app/services/template_cache.py
+# --- NEW FILE ---
+#
+# Compiled Jinja2 templates for notification rendering, so a batch of reminders
+# parses and compiles each template once instead of once per email.
+#  - Tenant templates: LRU keyed by (template id, updated_at, part). An edited
+#    template has a new updated_at, so no process can render a stale version; the
+#    templates router also drops the old entries right away (invalidate_template).
+#  - DEFAULT_TEMPLATES (notification_service) are compiled once at import
+#    (precompile_defaults) and never evicted.
+#  - Lookups: (tenant_id, trigger) -> the tenant's active template, or "use the
+#    default" (negative entry, the common case), for settings.template_lookup_ttl_seconds.
+#    The templates router invalidates its own process right away; other processes
+#    (workers) see a change after at most the TTL.
+# Hit/miss counts are kept per process and pushed to app.core.metrics as
+# template_cache.* by flush_metrics() at the end of each send batch.
+
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from jinja2 import Environment, BaseLoader, Template as JinjaTemplate, select_autoescape
+
+from app.config import settings
+from app.core import metrics
+from app.utils.cache import LRUCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+# --- Jinja2 Environment Setup ---
+jinja_env = Environment(
+    loader=BaseLoader(),
+    autoescape=select_autoescape(['html', 'xml']) # Enable autoescaping for security
+)
+
+_compiled = LRUCache(maxsize=1024)
+_defaults: Dict[Hashable, JinjaTemplate] = {}
+_lookups = LRUCache(maxsize=4096, ttl_seconds=settings.template_lookup_ttl_seconds)
+_USE_DEFAULT = object() # Negative entry: the tenant has no active template for the trigger
+
+_counters: Counter = Counter()
+_reported: Counter = Counter()
+_counters_lock = Lock()
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def precompile_defaults(defaults: Dict[Any, Dict[str, str]]) -> None:
+    """Compiles the built-in templates ({trigger: {"subject": ..., "body": ...}}) once."""
+    for trigger, parts in defaults.items():
+        for part, source in parts.items():
+            _defaults[(trigger, part)] = jinja_env.from_string(source)
+
+
+def default_template(trigger: Any, part: str) -> Optional[JinjaTemplate]:
+    return _defaults.get((trigger, part))
+
+
+def tenant_template(template, part: str, source: str) -> JinjaTemplate:
+    """Compiled `source` of a tenant Template ('subject' or 'body'). Compile errors propagate and are not cached."""
+    key = (template.id, template.updated_at, part)
+    compiled = _compiled.get(key)
+    if compiled is not None:
+        _count("compiled.hit")
+        return compiled
+    _count("compiled.miss")
+    compiled = jinja_env.from_string(source)
+    _compiled.set(key, compiled)
+    return compiled
+
+
+def invalidate_template(template) -> None:
+    """
+    Drops a tenant template's compiled parts and its tenant/trigger lookup.
+    Call with the row as it was BEFORE the update/delete.
+    """
+    for part in ("subject", "body"):
+        _compiled.pop((template.id, template.updated_at, part))
+    invalidate_lookup(template.tenant_id, template.event_trigger)
+
+
+@dataclass(frozen=True)
+class CachedTemplate:
+    """What rendering needs from a Template row; safe to share across sessions and threads."""
+    id: int
+    name: str
+    updated_at: datetime
+    email_subject: Optional[str]
+    email_body: str
+
+
+def lookup_template(tenant_id: int, trigger: Any, load: Callable[[], Any]) -> Optional[CachedTemplate]:
+    """
+    The tenant's active template for the trigger, or None to use the default. `load` runs the
+    query on a miss; its exceptions propagate and nothing is cached for them.
+    """
+    if settings.template_lookup_ttl_seconds <= 0:
+        template = load()
+        return _snapshot(template) if template is not None else None
+
+    key = (tenant_id, trigger)
+    cached = _lookups.get(key)
+    if cached is not None:
+        _count("lookup.hit")
+        return None if cached is _USE_DEFAULT else cached
+    _count("lookup.miss")
+    template = load()
+    snapshot = _snapshot(template) if template is not None else None
+    _lookups.set(key, snapshot if snapshot is not None else _USE_DEFAULT)
+    return snapshot
+
+
+def _snapshot(template) -> CachedTemplate:
+    return CachedTemplate(
+        id=template.id,
+        name=template.name,
+        updated_at=template.updated_at,
+        email_subject=template.email_subject,
+        email_body=template.email_body,
+    )
+
+
+def invalidate_lookup(tenant_id: int, trigger: Any) -> None:
+    _lookups.pop((tenant_id, trigger))
+
+
+def stats() -> Dict[str, Any]:
+    """This process's counters and sizes, with hit rates."""
+    with _counters_lock:
+        counts = dict(_counters)
+    result: Dict[str, Any] = {
+        "compiled_size": len(_compiled), "defaults_size": len(_defaults), "lookup_size": len(_lookups), **counts
+    }
+    for name in ("compiled", "lookup"):
+        hits, misses = counts.get(f"{name}.hit", 0), counts.get(f"{name}.miss", 0)
+        result[f"{name}.hit_rate"] = round(hits / (hits + misses), 4) if hits + misses else None
+    return result
+
+
+def flush_metrics() -> None:
+    """Adds the counts since the last flush to app.core.metrics (one Redis call per counter, per batch)."""
+    with _counters_lock:
+        deltas = {name: value - _reported[name] for name, value in _counters.items() if value != _reported[name]}
+        _reported.update(deltas)
+    for name, delta in deltas.items():
+        metrics.incr(f"template_cache.{name}", delta)
@@ -0,0 +1,205 @@
+# app/services/tenant_cache.py
+# --- NEW FILE ---
+#
+# Subdomain -> TenantSnapshot cache for the public endpoints (services list,
+# /availability, booking), which resolve the tenant on every call.
+# Two tiers, like principal_cache:
+#   - in-process LRU, settings.tenant_cache_local_ttl_seconds (short: other
+#     processes only see an invalidation once their entry expires)
+#   - Redis "tenant:subdomain:{subdomain}", settings.tenant_cache_ttl_seconds,
+#     deleted on invalidation
+# Keys are the lowercased subdomain. Unknown subdomains are not cached.
+# Invalidate (by subdomain, old and new) after the commit of any tenant update,
+# suspension or reactivation. Redis errors fall back to the database.
+# get_tenant_snapshot_async() (async routes) runs the Redis tier in the threadpool.
+# Hit/miss counts are kept per process (stats()) and pushed to app.core.metrics as
+# tenant_cache.* every METRICS_FLUSH_SECONDS by the lookups themselves.
+
+from collections import Counter
+from dataclasses import dataclass, asdict
+from threading import Lock
+from typing import Any, Dict, Optional
+import json
+import time
+
+import redis
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core import metrics
+from app.core.redis_client import get_redis
+from app.models.tenant import Tenant
+from app.utils.cache import LRUCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "tenant:subdomain"
+
+
+@dataclass(frozen=True)
+class TenantSnapshot:
+    """What public endpoints read from a tenant. Works with get_tenant_schedule()."""
+    id: int
+    name: str
+    subdomain: str
+    timezone: str
+    business_hours_config: Optional[Dict[str, Any]]
+    is_active: bool
+    business_hours_version: Optional[str] = None # Optional: entries cached before it existed lack it
+
+
+_snapshots = LRUCache(maxsize=2048, ttl_seconds=settings.tenant_cache_local_ttl_seconds)
+
+METRICS_FLUSH_SECONDS = 10 # Counts reach app.core.metrics in batches, not one Redis call per lookup
+
+_counters: Counter = Counter()
+_reported: Counter = Counter() # Part of _counters already added to app.core.metrics
+_counters_lock = Lock()
+_last_flush = 0.0
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def _metrics_due() -> bool:
+    return time.monotonic() - _last_flush >= METRICS_FLUSH_SECONDS
+
+
+def flush_metrics() -> None:
+    """Adds the counts since the last flush to app.core.metrics as tenant_cache.*."""
+    global _last_flush
+    with _counters_lock:
+        _last_flush = time.monotonic()
+        deltas = {name: value - _reported[name] for name, value in _counters.items() if value != _reported[name]}
+        _reported.update(deltas)
+    for name, delta in deltas.items():
+        metrics.incr(f"tenant_cache.{name}", delta)
+
+
+def _redis():
+    if settings.tenant_cache_ttl_seconds <= 0:
+        return None
+    return get_redis()
+
+
+def _local_enabled() -> bool:
+    return settings.tenant_cache_local_ttl_seconds > 0
+
+
+def _key(subdomain: str) -> str:
+    return f"{KEY_PREFIX}:{subdomain}"
+
+
+def snapshot_of(tenant: Tenant) -> TenantSnapshot:
+    return TenantSnapshot(
+        id=tenant.id,
+        name=tenant.name,
+        subdomain=tenant.subdomain,
+        timezone=tenant.timezone or "UTC",
+        business_hours_config=tenant.business_hours_config,
+        is_active=bool(tenant.is_active),
+        business_hours_version=tenant.business_hours_version,
+    )
+
+
+def _local_snapshot(subdomain: str) -> Optional[TenantSnapshot]:
+    if not _local_enabled():
+        return None
+    snapshot = _snapshots.get(subdomain)
+    if snapshot is not None:
+        _count("local.hit")
+    return snapshot
+
+
+def _redis_snapshot(subdomain: str) -> Optional[TenantSnapshot]:
+    client = _redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(_key(subdomain))
+    except redis.RedisError as e:
+        logger.warning(f"Tenant cache read failed for '{subdomain}': {e}")
+        return None
+    if raw is None:
+        return None
+    _count("redis.hit")
+    snapshot = TenantSnapshot(**json.loads(raw))
+    if _local_enabled():
+        _snapshots.set(subdomain, snapshot)
+    return snapshot
+
+
+def _tenant_query(subdomain: str):
+    # func.lower(subdomain) is served by ix_tenants_subdomain_lower
+    return select(Tenant).where(func.lower(Tenant.subdomain) == subdomain).limit(1)
+
+
+def _store_loaded(subdomain: str, tenant: Optional[Tenant]) -> Optional[TenantSnapshot]:
+    if tenant is None:
+        return None
+    snapshot = snapshot_of(tenant)
+    if _local_enabled():
+        _snapshots.set(subdomain, snapshot)
+    client = _redis()
+    if client is not None:
+        try:
+            client.set(_key(subdomain), json.dumps(asdict(snapshot)), ex=settings.tenant_cache_ttl_seconds)
+        except redis.RedisError as e:
+            logger.warning(f"Tenant cache write failed for '{subdomain}': {e}")
+    return snapshot
+
+
+def get_tenant_snapshot(db: Session, subdomain: str) -> Optional[TenantSnapshot]:
+    """The tenant for an already normalized (lowercased) subdomain, or None if there is none."""
+    if _metrics_due():
+        flush_metrics()
+    snapshot = _local_snapshot(subdomain) or _redis_snapshot(subdomain)
+    if snapshot is not None:
+        return snapshot
+    _count("miss")
+    return _store_loaded(subdomain, db.scalars(_tenant_query(subdomain)).first())
+
+
+async def get_tenant_snapshot_async(db: AsyncSession, subdomain: str) -> Optional[TenantSnapshot]:
+    """get_tenant_snapshot for async routes: local hits stay on the event loop, Redis goes through the threadpool."""
+    if _metrics_due():
+        await run_in_threadpool(flush_metrics)
+    snapshot = _local_snapshot(subdomain)
+    if snapshot is None and _redis() is not None:
+        snapshot = await run_in_threadpool(_redis_snapshot, subdomain)
+    if snapshot is not None:
+        return snapshot
+    _count("miss")
+    tenant = (await db.scalars(_tenant_query(subdomain))).first()
+    if tenant is None:
+        return None
+    return await run_in_threadpool(_store_loaded, subdomain, tenant)
+
+
+def invalidate_subdomain(*subdomains: Optional[str]) -> None:
+    """Drops the cached tenant(s); pass both the old and new subdomain when it changes."""
+    keys = tuple({subdomain.strip().lower() for subdomain in subdomains if subdomain})
+    for subdomain in keys:
+        _snapshots.pop(subdomain)
+    client = _redis()
+    if client is None or not keys:
+        return
+    try:
+        client.delete(*(_key(subdomain) for subdomain in keys))
+    except redis.RedisError as e:
+        logger.warning(f"Tenant cache invalidation failed for {keys}: {e}")
+
+
+def stats() -> Dict[str, Any]:
+    """This process's counters and size."""
+    with _counters_lock:
+        counts = dict(_counters)
+    lookups = sum(counts.get(name, 0) for name in ("local.hit", "redis.hit", "miss"))
+    hits = counts.get("local.hit", 0) + counts.get("redis.hit", 0)
+    return {"size": len(_snapshots), **counts, "hit_rate": round(hits / lookups, 4) if lookups else None}
@@ -1,11 +1,25 @@
 # app/tasks/appointment_tasks.py
 # --- NEW FILE ---
+#
+# Appointment reminders. The beat task only scans: every appointment has one
+# appointment_reminders row per offset (app.services.reminder_schedule), so ONE
+# indexed query finds all due reminders across tenants and offsets, and the ids
+# are fanned out as chunk tasks on the 'reminders' queue so several workers share
+# the sending. The scan stamps a claim lease (claimed_until) on the rows it queues,
+# so a backlogged queue or a rate-limit retry is not queued again every minute. Inside a chunk, emails go out concurrently (settings.reminder_send_concurrency)
+# and the chunk's logs are committed together.
+# Per-run counters (found/sent/failed/duration) are kept by app.services.reminder_runs.
 
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, select
+from sqlalchemy import or_, select, update
 from datetime import datetime, timedelta, timezone
-import pytz
+from typing import Dict, List, Optional, Set
+import asyncio
+import math
+import time
+import uuid
 
+from app.config import settings
 from app.core.celery_app import celery_app # Import the Celery app instance
 from app.database import SessionLocal # Import SessionLocal to create new sessions
 import logging
@@ -13,132 +27,218 @@ import logging
 from app.schemas.enums import AppointmentStatus
 logger = logging.getLogger(__name__)
 from app.models.appointment import Appointment
-from app.models.tenant import Tenant
-from app.models.communications_log import CommunicationsLog, CommunicationType, CommunicationStatus # Import necessary enums etc.
-from app.services.notification_service import send_appointment_notification # Import the service function
+from app.models.appointment_reminder import AppointmentReminder, ReminderOutcome
+from app.services.notification_service import (
+    PreparedNotification, prepare_appointment_notification, deliver_notifications, log_notification_result
+)
+from app.services import rate_limiter, reminder_runs, template_cache
 from app.models.template import TemplateEventTrigger
 
-# Define constants for buffer time around reminder checks
-REMINDER_CHECK_BUFFER_MINUTES = 10 # Check +/- 10 minutes around the exact interval
+REMINDER_CHUNK_SIZE = 100 # Appointments per send_reminder_chunk task
+REMINDER_SCAN_LIMIT = 5000 # Due reminders fanned out per run; the rest wait for the next minute
+REMINDER_DEFER_MAX_SECONDS = 60 # Rate-limited reminders are retried within this, even if the wait is longer
+REMINDABLE_STATUSES = (AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED)
+
+
+def find_due_reminder_ids(db: Session, now_utc: datetime, limit: int = REMINDER_SCAN_LIMIT) -> List[int]:
+    """
+    Unsent, unclaimed reminder rows (any tenant, any offset) with due_at <= now for future,
+    active appointments, locked FOR UPDATE SKIP LOCKED so overlapping scans split them.
+    Served by the partial index on unsent rows, so cost is O(due reminders).
+    """
+    stmt = select(AppointmentReminder.id).join(
+        Appointment, Appointment.id == AppointmentReminder.appointment_id
+    ).where(
+        AppointmentReminder.sent_at.is_(None),
+        AppointmentReminder.due_at <= now_utc,
+        or_(AppointmentReminder.claimed_until.is_(None), AppointmentReminder.claimed_until <= now_utc),
+        Appointment.appointment_time > now_utc, # Never remind after the fact
+        Appointment.status.in_(REMINDABLE_STATUSES),
+    ).order_by(AppointmentReminder.due_at).limit(limit).with_for_update(of=AppointmentReminder, skip_locked=True)
+    return list(db.execute(stmt).scalars().all())
+
+
+def claim_due_reminders(db: Session, now_utc: datetime, limit: int = REMINDER_SCAN_LIMIT) -> List[int]:
+    """
+    Finds the due reminders and COMMITS a claim lease (settings.reminder_claim_seconds) on them,
+    so scans running before their chunk does skip them. A chunk that dies leaves the rows
+    unsent; they are found again once the lease expires.
+    """
+    due_ids = find_due_reminder_ids(db, now_utc, limit)
+    if due_ids:
+        db.execute(
+            update(AppointmentReminder).where(AppointmentReminder.id.in_(due_ids)).values(
+                claimed_until=now_utc + timedelta(seconds=settings.reminder_claim_seconds)
+            ).execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return due_ids
+
+
+def expire_stale_reminders(db: Session, now_utc: datetime) -> int:
+    """Closes unsent reminders of appointments that already started (e.g. cancelled ones), keeping the partial index small."""
+    started = select(Appointment.id).where(Appointment.appointment_time <= now_utc)
+    result = db.execute(
+        update(AppointmentReminder).where(
+            AppointmentReminder.sent_at.is_(None),
+            AppointmentReminder.due_at <= now_utc,
+            AppointmentReminder.appointment_id.in_(started),
+        ).values(sent_at=now_utc, outcome=ReminderOutcome.SKIPPED).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
 
 @celery_app.task(bind=True, name='app.tasks.appointment_tasks.send_appointment_reminders')
 def send_appointment_reminders(self):
     """
-    Celery task to find appointments needing reminders and trigger notifications.
+    Celery beat task (every minute): reads the due reminders from the appointment_reminders
+    index and fans the work out as send_reminder_chunk tasks of REMINDER_CHUNK_SIZE.
     """
-    logger.info("Starting send_appointment_reminders task...")
+    run_id = uuid.uuid4().hex
+    started = time.monotonic()
     db: Session = SessionLocal() # Create a new session for this task run
-    processed_count = 0
-    error_count = 0
 
     try:
         now_utc = datetime.now(timezone.utc)
-
-        # Find tenants with reminder intervals set
-        tenants_with_reminders = db.query(Tenant).filter(
-            Tenant.reminder_interval_hours.isnot(None),
-            Tenant.reminder_interval_hours > 0
-        ).all()
-
-        if not tenants_with_reminders:
-            logger.info("No tenants found with active reminder intervals configured.")
-            return "No tenants configured for reminders."
-
-        for tenant in tenants_with_reminders:
-            interval_hours = tenant.reminder_interval_hours
-            if not interval_hours: continue # Skip if somehow None here
-
-            # Calculate target reminder time window in UTC
-            reminder_time_utc = now_utc + timedelta(hours=interval_hours)
-            window_start = reminder_time_utc - timedelta(minutes=REMINDER_CHECK_BUFFER_MINUTES)
-            window_end = reminder_time_utc + timedelta(minutes=REMINDER_CHECK_BUFFER_MINUTES)
-
-            logger.debug(f"Tenant {tenant.id}: Checking for reminders between {window_start} and {window_end} (Interval: {interval_hours} hrs)")
-
-            # Subquery to find appointments already reminded recently
-            # Check logs within the last X hours (slightly more than interval) to prevent re-sending after failures
-            # This subquery could be refined based on exact needs
-            recent_reminder_logs = select(CommunicationsLog.appointment_id).where(
-                CommunicationsLog.tenant_id == tenant.id,
-                CommunicationsLog.type == CommunicationType.REMINDER, # Use model enum directly
-                CommunicationsLog.status == CommunicationStatus.SENT, # Check for SENT status
-                CommunicationsLog.timestamp >= now_utc - timedelta(hours=interval_hours + 1) # Check slightly past interval
-            ).distinct().subquery()
-
-            # Query for appointments needing reminders for this tenant
-            appointments_to_remind = db.query(Appointment).filter(
-                Appointment.tenant_id == tenant.id,
-                Appointment.status.in_([AppointmentStatus.PENDING, AppointmentStatus.CONFIRMED]),
-                Appointment.appointment_time >= window_start,
-                Appointment.appointment_time < window_end,
-                # Exclude appointments that have a successful reminder log recently
-                Appointment.id.notin_(select(recent_reminder_logs.c.appointment_id))
-            ).options(
-                # Eager load relationships needed by notification service
-                joinedload(Appointment.client),
-                joinedload(Appointment.tenant),
-                joinedload(Appointment.services)
-            ).all()
-
-            if appointments_to_remind:
-                logger.info(f"Tenant {tenant.id}: Found {len(appointments_to_remind)} appointments needing reminders.")
-
-            for appt in appointments_to_remind:
-                logger.debug(f"Processing reminder for Appt ID: {appt.id}, Client ID: {appt.client_id}")
-                try:
-                    # Run the notification sending logic (which adds log to session)
-                    # Run it synchronously within the task for now
-                    # If send_appointment_notification becomes truly async with async DB calls,
-                    # this task would need to be async too.
-                    # For now, using run_in_threadpool inside send_email handles blocking IO.
-
-                    # *** NOTE: If send_appointment_notification needs to be async native,
-                    # this task should be async and use asyncio.run() or integrate with Celery's async support ***
-                    # For simplicity with run_in_threadpool in send_email, keep task sync for now.
-
-                     # We need to run the async function - how depends on Celery/event loop context
-                     # Simplest (but potentially blocking worker slightly if many emails per run):
-                    import asyncio
-                    try:
-                        asyncio.run(send_appointment_notification(
-                            db=db,
-                            appointment=appt,
-                            event_trigger=TemplateEventTrigger.APPOINTMENT_REMINDER_CLIENT
-                         ))
-                    except RuntimeError as e:
-                         # Handle case where event loop is already running (e.g., nested asyncio.run)
-                         # This might require integrating with Celery's event loop if available
-                         # or using a different method like asyncio.get_event_loop().run_until_complete()
-                         # if run within an appropriate async context setup by Celery.
-                         # For now, log and potentially skip or try another approach.
-                         logger.error(f"RuntimeError running async notification for Appt {appt.id}: {e}. Consider Celery async integration.")
-                         # Fallback or re-raise depending on desired behavior
-                         error_count += 1
-                         continue # Skip this appointment
-
-                    processed_count += 1
-                except Exception as notification_err:
-                    logger.error(f"Error triggering notification for Appt ID {appt.id}: {notification_err}", exc_info=True)
-                    db.rollback() # Rollback potential partial log additions from failed send
-                    error_count += 1
-                    # Continue to next appointment
-                else:
-                     # Commit logs for successfully processed notification *immediately*
-                     # Or commit in batches outside the inner loop for performance
-                    try:
-                        db.commit()
-                    except Exception as commit_err:
-                        logger.error(f"Error committing communication log for Appt ID {appt.id} reminder: {commit_err}", exc_info=True)
-                        db.rollback()
-                        error_count += 1
-
-        logger.info(f"send_appointment_reminders task finished. Processed: {processed_count}, Errors: {error_count}")
-        return f"Processed: {processed_count}, Errors: {error_count}"
-
+        expire_stale_reminders(db, now_utc)
+        due_ids = claim_due_reminders(db, now_utc)
     except Exception as e:
-        logger.error(f"General error in send_appointment_reminders task: {e}", exc_info=True)
-        db.rollback() # Rollback any partial changes
-        # Re-raise the exception so Celery knows the task failed
+        logger.error(f"Reminder scan failed: {e}", exc_info=True)
         raise self.retry(exc=e, countdown=60) # Example retry after 60s
     finally:
         db.close() # Ensure session is closed
+
+    chunks = [due_ids[i:i + REMINDER_CHUNK_SIZE] for i in range(0, len(due_ids), REMINDER_CHUNK_SIZE)]
+    reminder_runs.start_run(run_id, found=len(due_ids), chunks=len(chunks), scan_seconds=time.monotonic() - started)
+
+    for chunk in chunks:
+        send_reminder_chunk.apply_async(args=[chunk, run_id], queue='reminders', routing_key='reminders.send')
+
+    logger.info(f"Reminder run {run_id}: {len(due_ids)} due, {len(chunks)} chunk(s) queued in {time.monotonic() - started:.2f}s.")
+    return {"run_id": run_id, "found": len(due_ids), "chunks": len(chunks)}
+
+
+def _claim_chunk(db: Session, reminder_ids: List[int], now_utc: datetime) -> Dict[int, AppointmentReminder]:
+    """
+    Locks the chunk's still-unsent, due reminder rows (FOR UPDATE SKIP LOCKED) in one query.
+    Rows already sent or held by another worker are simply not returned.
+    """
+    reminders = db.query(AppointmentReminder).filter(
+        AppointmentReminder.id.in_(reminder_ids),
+        AppointmentReminder.sent_at.is_(None),
+        AppointmentReminder.due_at <= now_utc,
+    ).with_for_update(skip_locked=True).populate_existing().all()
+    return {reminder.id: reminder for reminder in reminders}
+
+
+def _load_remindable_appointments(db: Session, appointment_ids: Set[int], now_utc: datetime) -> Dict[int, Appointment]:
+    """Future, active appointments with everything the notification service renders, in one query."""
+    if not appointment_ids:
+        return {}
+    appointments = db.query(Appointment).options(
+        # Eager load relationships needed by notification service
+        joinedload(Appointment.client),
+        joinedload(Appointment.tenant),
+        joinedload(Appointment.services)
+    ).filter(
+        Appointment.id.in_(appointment_ids),
+        Appointment.appointment_time > now_utc,
+        Appointment.status.in_(REMINDABLE_STATUSES),
+    ).all()
+    return {appointment.id: appointment for appointment in appointments}
+
+
+@celery_app.task(bind=True, name='app.tasks.appointment_tasks.send_reminder_chunk')
+def send_reminder_chunk(self, reminder_ids: List[int], run_id: Optional[str] = None):
+    """
+    Sends one chunk of due reminders:
+      1. claims the chunk's reminder rows (FOR UPDATE SKIP LOCKED) and loads their appointments,
+      2. renders every reminder (sequential, it uses the session),
+      3. takes a bulk send token per reminder (app.services.rate_limiter); refused ones are left
+         unsent and re-queued as a follow-up chunk once tokens are expected,
+      4. sends the rest concurrently on one event loop, at most settings.reminder_send_concurrency at a time,
+      5. adds all CommunicationsLog entries and sent_at/outcome updates, then commits ONCE.
+    The row locks are held until that commit, so overlapping runs or duplicate chunks never
+    send the same reminder twice.
+    """
+    db: Session = SessionLocal()
+    sent_count = failed_count = skipped_count = 0
+    deferred: Dict[int, float] = {} # reminder id -> seconds until the rate limiter has a token
+    loop = asyncio.new_event_loop() # One loop per chunk instead of one per email
+
+    try:
+        now_utc = datetime.now(timezone.utc)
+        reminders = _claim_chunk(db, reminder_ids, now_utc)
+        appointments = _load_remindable_appointments(db, {r.appointment_id for r in reminders.values()}, now_utc)
+        # Sent, rescheduled, cancelled or being handled by another worker
+        skipped_count += len(reminder_ids) - len(reminders)
+
+        prepared: Dict[int, PreparedNotification] = {}
+        for reminder_id, reminder in reminders.items():
+            appt = appointments.get(reminder.appointment_id)
+            if appt is None:
+                skipped_count += 1 # Left unsent: picked up again (after the lease) if the appointment becomes remindable
+                continue
+            try:
+                notification = prepare_appointment_notification(db, appt, TemplateEventTrigger.APPOINTMENT_REMINDER_CLIENT)
+            except Exception as prepare_err:
+                logger.error(f"Error preparing {reminder.offset_hours}h reminder for Appt ID {appt.id}: {prepare_err}", exc_info=True)
+                failed_count += 1 # Left unsent; a run after the lease retries it
+                continue
+            if notification is None:
+                # Nothing to send (no client email, no template): processed for good
+                reminder.sent_at = now_utc
+                reminder.outcome = ReminderOutcome.SKIPPED
+                skipped_count += 1
+                continue
+            prepared[reminder_id] = notification
+
+        # Bulk mail: reminders the rate limiter refuses go to a follow-up chunk instead of failing
+        for reminder_id, notification in list(prepared.items()):
+            wait = rate_limiter.acquire_send(notification.tenant.id, rate_limiter.BULK)
+            if wait > 0:
+                deferred[reminder_id] = wait
+                del prepared[reminder_id]
+        countdown = min(max(math.ceil(min(deferred.values())), 1), REMINDER_DEFER_MAX_SECONDS) if deferred else 0
+        for reminder_id in deferred:
+            # Still claimed by the follow-up chunk below, so scans do not queue it as well
+            reminders[reminder_id].claimed_until = now_utc + timedelta(seconds=countdown + settings.reminder_claim_seconds)
+
+        results = loop.run_until_complete(
+            deliver_notifications(prepared, settings.reminder_send_concurrency)
+        ) if prepared else {}
+
+        # Processed either way: a FAILED log is re-sent via /tenants/{id}/reminders/retry-failed
+        for reminder_id, notification in prepared.items():
+            sent = results.get(reminder_id, False)
+            log_notification_result(db, notification, sent)
+            reminders[reminder_id].sent_at = now_utc
+            reminders[reminder_id].outcome = ReminderOutcome.SENT if sent else ReminderOutcome.FAILED
+            if sent:
+                sent_count += 1
+            else:
+                failed_count += 1
+        db.commit() # Logs, sent_at, outcomes and deferred leases of the whole chunk; releases the row locks
+
+        if deferred:
+            send_reminder_chunk.apply_async(
+                args=[list(deferred), run_id], countdown=countdown, queue='reminders', routing_key='reminders.send'
+            )
+            logger.info(f"Reminder run {run_id}: {len(deferred)} reminder(s) rate limited, retrying in {countdown}s.")
+    except Exception as e:
+        db.rollback() # Nothing is marked; the rows are found again once their claim lease expires
+        deferred.clear()
+        logger.error(f"Reminder chunk of run {run_id} failed: {e}", exc_info=True)
+        raise
+    finally:
+        loop.close()
+        db.close()
+        reminder_runs.record_chunk(
+            run_id, sent=sent_count, failed=failed_count, skipped=skipped_count,
+            deferred=len(deferred), continued=bool(deferred)
+        )
+        rate_limiter.record_deferred(rate_limiter.BULK, len(deferred))
+        template_cache.flush_metrics()
+
+    return {"run_id": run_id, "sent": sent_count, "failed": failed_count, "skipped": skipped_count, "deferred": len(deferred)}
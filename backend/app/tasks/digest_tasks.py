@@ -0,0 +1,53 @@
+# app/tasks/digest_tasks.py
+# --- NEW FILE ---
+#
+# Beat task for admin booking digests (app/services/admin_digest.py). Due tenants
+# are locked, and each one's digest is enqueued in the outbox and its window
+# advanced under a savepoint, so one broken tenant does not hold back the others.
+# The outbox dispatcher then sends and logs the digests.
+
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from app.core.celery_app import celery_app
+from app.database import SessionLocal
+from app.services import admin_digest
+from app.tasks.outbox_tasks import kick_dispatcher
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name='app.tasks.digest_tasks.send_admin_digests')
+def send_admin_digests():
+    """Enqueues the digest of every tenant whose window is over (beat, every 5 minutes)."""
+    db: Session = SessionLocal()
+    enqueued = empty = failed = 0
+    try:
+        now_utc = datetime.now(timezone.utc)
+        for tenant in admin_digest.claim_due_tenants(db, now_utc):
+            savepoint = db.begin_nested()
+            try:
+                if admin_digest.enqueue_digest(db, tenant, now_utc) is None:
+                    empty += 1
+                else:
+                    enqueued += 1
+                savepoint.commit()
+            except Exception as e:
+                savepoint.rollback() # Window not advanced: retried on the next run
+                failed += 1
+                logger.error(f"Admin digest for tenant {tenant.id} failed: {e}", exc_info=True)
+        db.commit() # Digests and advanced windows together; releases the tenant locks
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Admin digest run failed: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
+
+    if enqueued:
+        kick_dispatcher()
+    if enqueued or failed:
+        logger.info(f"Admin digests: {enqueued} enqueued, {empty} empty window(s), {failed} failed.")
+    return {"enqueued": enqueued, "empty": empty, "failed": failed}
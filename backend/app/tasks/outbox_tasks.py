@@ -0,0 +1,247 @@
+# app/tasks/outbox_tasks.py
+# --- NEW FILE ---
+#
+# Dispatcher for the notification outbox (app/services/outbox.py).
+# Each run claims due rows in batches (FOR UPDATE SKIP LOCKED, so any number of
+# workers can run it at once), renders them, takes a send token per row from the
+# rate limiter (refused rows are deferred, not failed), sends with bounded concurrency,
+# then writes the CommunicationsLog entry and the row's final status in one
+# transaction. Sending is at-least-once (a worker dying between send and commit
+# re-sends after the lease expires); logging is exactly-once.
+#
+# Runs from beat every minute and is kicked right after commits that enqueue rows.
+# Worker: celery -A app.core.celery_app worker -Q notifications,default,reminders (see celery_app.py)
+
+import asyncio
+import logging
+import math
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.config import settings
+from app.core import metrics
+from app.core.celery_app import celery_app
+from app.database import SessionLocal
+from app.models.appointment import Appointment
+from app.models.communications_log import (
+    CommunicationChannel, CommunicationDirection, CommunicationStatus, CommunicationType
+)
+from app.models.outbox import OutboxMessage, OutboxKind
+from app.models.template import TemplateEventTrigger
+from app.models.tenant import Tenant
+from app.services import outbox, rate_limiter, template_cache
+from app.services.communication_service import create_communication_log
+from app.services.email_service import send_email
+from app.services.email_transport import simulated_transport_name
+from app.services.notification_service import (
+    prepare_appointment_notification, deliver_notification, deliver_notifications, log_notification_result
+)
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS_QUEUE = 'notifications'
+OUTBOX_MAX_BATCHES_PER_RUN = 20 # Bounds a single run; beat/kicks pick up the rest
+
+# row id -> what to send: a rendered appointment email, or (tenant, payload) for a pre-rendered email
+Job = Tuple[str, object]
+
+
+def kick_dispatcher() -> None:
+    """Asks a worker to dispatch now (after a commit that enqueued rows). Beat covers a failed kick."""
+    try:
+        dispatch_outbox.apply_async(queue=NOTIFICATIONS_QUEUE, routing_key='notifications.dispatch')
+    except Exception as e:
+        logger.warning(f"Could not kick outbox dispatcher (beat will pick the rows up): {e}")
+
+
+def _prepare_jobs(db: Session, rows: List[OutboxMessage]) -> Tuple[Dict[int, Job], Dict[int, str]]:
+    """Renders every claimed row that has something to send. Sequential: it uses the session."""
+    jobs: Dict[int, Job] = {}
+    skipped: Dict[int, str] = {}
+
+    appointment_ids = {row.appointment_id for row in rows if row.kind == OutboxKind.APPOINTMENT_NOTIFICATION and row.appointment_id}
+    appointments = {}
+    if appointment_ids:
+        appointments = {a.id: a for a in db.query(Appointment).options(
+            joinedload(Appointment.client),
+            joinedload(Appointment.tenant),
+            joinedload(Appointment.services)
+        ).filter(Appointment.id.in_(appointment_ids)).all()}
+
+    tenant_ids = {row.tenant_id for row in rows if row.kind == OutboxKind.EMAIL}
+    tenants = {t.id: t for t in db.query(Tenant).filter(Tenant.id.in_(tenant_ids)).all()} if tenant_ids else {}
+
+    for row in rows:
+        try:
+            if row.kind == OutboxKind.APPOINTMENT_NOTIFICATION:
+                appointment = appointments.get(row.appointment_id)
+                if appointment is None:
+                    skipped[row.id] = "Appointment no longer exists."
+                    continue
+                prepared = prepare_appointment_notification(db, appointment, TemplateEventTrigger(row.event_trigger))
+                if prepared is None:
+                    skipped[row.id] = "Nothing to send (no recipient or template)."
+                    continue
+                jobs[row.id] = ("appointment", prepared)
+            else:
+                payload = row.payload or {}
+                tenant = tenants.get(row.tenant_id)
+                if tenant is None or not payload.get("to_email"):
+                    skipped[row.id] = "Missing tenant or recipient."
+                    continue
+                jobs[row.id] = ("email", (tenant, payload))
+        except Exception as e:
+            logger.error(f"Could not prepare outbox row {row.id}: {e}", exc_info=True)
+            skipped[row.id] = f"Prepare error: {e}"
+    return jobs, skipped
+
+
+def _job_tenant_id(job: Job) -> int:
+    kind, data = job
+    return data.tenant.id if kind == "appointment" else data[0].id
+
+
+def _take_send_tokens(jobs: Dict[int, Job]) -> Dict[int, float]:
+    """
+    Takes a transactional send token per job (app.services.rate_limiter). Refused jobs are
+    removed from `jobs` and returned as row id -> seconds to wait; their rows are deferred, not failed.
+    """
+    deferred: Dict[int, float] = {}
+    for row_id, job in list(jobs.items()):
+        wait = rate_limiter.acquire_send(_job_tenant_id(job), rate_limiter.TRANSACTIONAL)
+        if wait > 0:
+            deferred[row_id] = wait
+            del jobs[row_id]
+    return deferred
+
+
+async def _send_job(job: Job) -> bool:
+    kind, data = job
+    if kind == "appointment":
+        return await deliver_notification(data)
+    tenant, payload = data
+    return await send_email(
+        to_email=payload["to_email"],
+        subject=payload.get("subject") or "",
+        html_body=payload.get("html_body") or "",
+        tenant=tenant,
+    )
+
+
+def _log_email_result(db: Session, row: OutboxMessage, sent: bool) -> None:
+    payload = row.payload or {}
+    status = CommunicationStatus.SENT if sent else CommunicationStatus.FAILED
+    notes = f"To: {payload.get('to_email')}" + ("" if sent else ". Status: FAILED after retries.")
+    if payload.get("log_notes"):
+        notes += f". {payload['log_notes']}"
+    simulated = simulated_transport_name()
+    if simulated:
+        # Load test: accepted by a local sink, never sent (a simulated rejection stays FAILED)
+        status = CommunicationStatus.SIMULATED if sent else status
+        notes += f". Simulated delivery ({simulated} transport)."
+    create_communication_log(
+        db=db,
+        tenant_id=row.tenant_id,
+        user_id=payload.get("user_id"),
+        type=CommunicationType(payload.get("log_type") or CommunicationType.SYSTEM_ALERT.value),
+        channel=CommunicationChannel.EMAIL,
+        direction=CommunicationDirection.OUTBOUND,
+        status=status,
+        subject=payload.get("subject"),
+        notes=notes,
+    )
+
+
+def _record_results(
+    db: Session, run_id: str, ids: List[int], jobs: Dict[int, Job], skipped: Dict[int, str],
+    results: Dict[int, bool], deferred: Dict[int, float]
+) -> Dict[str, int]:
+    """Writes logs and final statuses for the rows this run still owns, in ONE commit."""
+    counts = {"sent": 0, "retry": 0, "failed": 0, "skipped": 0, "deferred": 0}
+    for row in outbox.lock_claimed(db, run_id, ids):
+        if row.id in deferred:
+            outbox.defer(row, deferred[row.id])
+            counts["deferred"] += 1
+            continue
+        job = jobs.get(row.id)
+        if job is None:
+            outbox.mark_skipped(row, skipped.get(row.id, "Nothing to send."))
+            counts["skipped"] += 1
+            continue
+
+        sent = results.get(row.id, False)
+        if sent:
+            outbox.mark_sent(row)
+            counts["sent"] += 1
+        elif outbox.mark_failed_attempt(row, "Send failed; see worker logs."):
+            counts["failed"] += 1
+        else:
+            counts["retry"] += 1 # Not logged yet: only the final outcome gets a CommunicationsLog entry
+            continue
+
+        kind, data = job
+        if kind == "appointment":
+            log_notification_result(db, data, sent)
+        else:
+            _log_email_result(db, row, sent)
+    db.commit()
+    return counts
+
+
+@celery_app.task(name='app.tasks.outbox_tasks.dispatch_outbox')
+def dispatch_outbox(batch_size: Optional[int] = None):
+    """Claims and delivers due outbox rows until none are left (or the per-run batch cap is hit)."""
+    run_id = uuid.uuid4().hex
+    limit = batch_size or settings.outbox_batch_size
+    totals = {"sent": 0, "retry": 0, "failed": 0, "skipped": 0, "deferred": 0}
+    next_token_in: Optional[float] = None # Shortest rate-limit wait seen in this run
+    started = time.monotonic()
+    db: Session = SessionLocal()
+    loop = asyncio.new_event_loop() # One loop for the whole run instead of one per email
+    try:
+        for _ in range(OUTBOX_MAX_BATCHES_PER_RUN):
+            ids = outbox.claim_batch(db, run_id, limit)
+            if not ids:
+                break
+            rows = db.query(OutboxMessage).filter(OutboxMessage.id.in_(ids)).all()
+            jobs, skipped = _prepare_jobs(db, rows)
+            deferred = _take_send_tokens(jobs)
+            results = loop.run_until_complete(
+                deliver_notifications(jobs, settings.outbox_send_concurrency, send=_send_job)
+            ) if jobs else {}
+            counts = _record_results(db, run_id, ids, jobs, skipped, results, deferred)
+            for key, value in counts.items():
+                totals[key] += value
+            if deferred:
+                next_token_in = min([next_token_in or float("inf"), *deferred.values()])
+            if len(ids) < limit or counts["deferred"] == len(ids):
+                break # Done, or rate limited across the board: claiming more would only defer more
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Outbox dispatcher run {run_id} failed: {e}", exc_info=True)
+        raise # Claimed rows are re-claimed after the lease expires
+    finally:
+        loop.close()
+        db.close()
+        template_cache.flush_metrics()
+
+    if next_token_in is not None:
+        # Rows were deferred by the rate limiter: come back when tokens are expected (beat is the fallback)
+        try:
+            dispatch_outbox.apply_async(
+                countdown=min(max(math.ceil(next_token_in), 1), 60),
+                queue=NOTIFICATIONS_QUEUE, routing_key='notifications.dispatch'
+            )
+        except Exception as e:
+            logger.warning(f"Could not schedule outbox follow-up run: {e}")
+        rate_limiter.record_deferred(rate_limiter.TRANSACTIONAL, totals["deferred"])
+
+    for key, value in totals.items():
+        if value and key != "deferred":
+            metrics.incr(f"outbox.{key}", value)
+    if any(totals.values()):
+        logger.info(f"Outbox run {run_id}: {totals} in {time.monotonic() - started:.2f}s")
+    return totals
@@ -1,6 +1,8 @@
 # app/utils/permissions.py
 from fastapi import HTTPException
+from typing import Union
 from app.models.user import User
+from app.services.principal_cache import Principal
 
 def is_super_admin(user: User) -> bool:
     return user.role == "super_admin"
@@ -11,7 +13,7 @@ def is_admin(user: User) -> bool:
 def is_staff(user: User) -> bool:
     return user.role == "staff"
 
-def can_edit_user(current_user: User, target_user: User) -> bool:
+def can_edit_user(current_user: Union[User, Principal], target_user: User) -> bool:
     # Super admin can edit anyone
     if is_super_admin(current_user):
         return True
@@ -0,0 +1,69 @@
+# scripts/backfill_appointment_time_ranges.py
+# --- NEW FILE --- (replaces backfill_appointment_end_times.py)
+#
+# Fills appointments.end_datetime_utc from the sum of the booked services' durations.
+# appointments.time_range is a generated column, so Postgres recomputes it as part
+# of the same UPDATE; nothing else needs to be written.
+#
+# Set-based and batched by id so locks stay short on large tables. Safe to re-run:
+# rows that already have the right end are not touched.
+#
+# Usage:
+#   python scripts/backfill_appointment_time_ranges.py                 # only rows with no end time
+#   python scripts/backfill_appointment_time_ranges.py --fix-upcoming  # also repair stale ends of upcoming appointments
+import argparse
+import os
+import sys
+
+from sqlalchemy import text
+
+# Add project root to Python path to import app modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import engine
+
+BACKFILL_SQL = text("""
+    UPDATE appointments AS a
+    SET end_datetime_utc = a.appointment_time + make_interval(mins => d.total_minutes)
+    FROM (
+        SELECT aps.appointment_id, SUM(s.duration_minutes)::int AS total_minutes
+        FROM appointment_services AS aps
+        JOIN services AS s ON s.id = aps.service_id
+        WHERE aps.appointment_id >= :id_from AND aps.appointment_id < :id_to
+        GROUP BY aps.appointment_id
+    ) AS d
+    WHERE a.id = d.appointment_id
+      AND d.total_minutes > 0
+      AND (
+          a.end_datetime_utc IS NULL
+          OR (:fix_upcoming AND a.appointment_time >= now()
+              AND a.end_datetime_utc <> a.appointment_time + make_interval(mins => d.total_minutes))
+      )
+""")
+
+
+def run_backfill(batch_size: int, fix_upcoming: bool) -> None:
+    with engine.connect() as conn:
+        max_id = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM appointments")).scalar()
+    print(f"Scanning appointment ids 1..{max_id} in batches of {batch_size} (fix upcoming: {fix_upcoming})...")
+
+    updated_total = 0
+    for id_from in range(1, max_id + 1, batch_size):
+        # One short transaction per batch
+        with engine.begin() as conn:
+            result = conn.execute(BACKFILL_SQL, {"id_from": id_from, "id_to": id_from + batch_size, "fix_upcoming": fix_upcoming})
+        if result.rowcount:
+            print(f"  ids {id_from}..{id_from + batch_size - 1}: updated {result.rowcount}")
+            updated_total += result.rowcount
+
+    with engine.connect() as conn:
+        remaining = conn.execute(text("SELECT COUNT(*) FROM appointments WHERE end_datetime_utc IS NULL")).scalar()
+    print(f"Backfill finished: {updated_total} appointments updated, {remaining} still without an end time (no services / zero duration).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill appointment end times (and thereby time_range).")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--fix-upcoming", action="store_true", help="Also recompute ends of upcoming appointments that disagree with their services")
+    args = parser.parse_args()
+    run_backfill(args.batch_size, args.fix_upcoming)
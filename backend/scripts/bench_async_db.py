@@ -0,0 +1,159 @@
+# scripts/bench_async_db.py
+# --- NEW FILE ---
+#
+# Event-loop check for the async routes: runs N concurrent "requests" on one event
+# loop, each doing one query that takes --query-ms on the server (pg_sleep), first
+# through the sync Session (what the async availability routes used to do), then
+# through the AsyncSession from get_async_db. A heartbeat task ticks every 10ms and
+# records how late it wakes up: with the sync Session every query stalls the whole
+# loop, so lag grows with the query time and requests run one after another.
+# With --subdomain, the same measurement is made for a real route: N concurrent
+# GET /availability/range calls through the ASGI app (tenant resolution, service
+# and appointment queries, availability cache and slot holds in Redis), in-process,
+# without a server. The first round fills the availability cache, the second is
+# served from it.
+# Read-only except for the availability cache; needs DATABASE_URL (from .env)
+# pointing at a Postgres database, and an existing tenant/services for --subdomain.
+#
+# Usage (from backend/):
+#   python scripts/bench_async_db.py --requests 50 --query-ms 20
+#   python scripts/bench_async_db.py --requests 50 --subdomain demo --service-ids 1,2 --days 14
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from datetime import date as DDate, timedelta
+from typing import Awaitable, Callable, Dict, Tuple
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEARTBEAT_SECONDS = 0.01
+
+
+async def heartbeat(stop: asyncio.Event) -> float:
+    """Largest delay (seconds) between when a tick was due and when it actually ran."""
+    max_lag = 0.0
+    while not stop.is_set():
+        due = time.perf_counter() + HEARTBEAT_SECONDS
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        max_lag = max(max_lag, time.perf_counter() - due)
+    return max_lag
+
+
+async def run(request: Callable[[], Awaitable[None]], count: int) -> Tuple[float, float]:
+    """(wall time, max event-loop lag) for `count` concurrent calls of request()."""
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(heartbeat(stop))
+    await asyncio.sleep(HEARTBEAT_SECONDS) # Let the heartbeat start ticking
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(count)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await lag_task
+
+
+async def call_route(app, path: str, params: Dict[str, str]) -> int:
+    """Runs one GET through the ASGI app (all middleware and dependencies included); returns the status code."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(), "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000), "server": ("localhost", 80),
+    }
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return response.get("status", 0)
+
+
+def bench_route(args) -> None:
+    from app.main import app
+
+    start_date = DDate.today() + timedelta(days=1)
+    params = {
+        "subdomain": args.subdomain,
+        "service_ids_query": args.service_ids,
+        "start_date": start_date.isoformat(),
+        "end_date": (start_date + timedelta(days=args.days - 1)).isoformat(),
+    }
+    statuses: Counter = Counter()
+
+    async def route_request() -> None:
+        statuses[await call_route(app, "/availability/range", params)] += 1
+
+    async def bench() -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        # Warm-up (pools, tenant cache) on days a year later, so the measured days start uncached
+        warm_up_start = start_date + timedelta(days=365)
+        await call_route(app, "/availability/range", {
+            **params, "start_date": warm_up_start.isoformat(), "end_date": warm_up_start.isoformat(),
+        })
+        cold = await run(route_request, args.requests)
+        warm = await run(route_request, args.requests)
+        return cold, warm
+
+    (cold_elapsed, cold_lag), (warm_elapsed, warm_lag) = asyncio.run(bench())
+    print(f"{args.requests} concurrent GET /availability/range ({args.days} days, services {args.service_ids}), statuses {dict(statuses)}")
+    print(f"  first round:               {cold_elapsed:6.2f}s  max loop lag {cold_lag * 1000:7.1f}ms  {args.requests / cold_elapsed:7.1f} req/s")
+    print(f"  availability cache warm:   {warm_elapsed:6.2f}s  max loop lag {warm_lag * 1000:7.1f}ms  {args.requests / warm_elapsed:7.1f} req/s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--query-ms", type=float, default=20.0, help="Server-side duration of each query (pg_sleep)")
+    parser.add_argument("--subdomain", help="Also benchmark GET /availability/range for this tenant")
+    parser.add_argument("--service-ids", default="1", help="Comma-separated service IDs of that tenant")
+    parser.add_argument("--days", type=int, default=14, help="Days per /availability/range request")
+    args = parser.parse_args()
+
+    from sqlalchemy import text
+    from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+
+    query = text("SELECT pg_sleep(:seconds)")
+    params = {"seconds": args.query_ms / 1000}
+
+    async def sync_session_request() -> None:
+        # An async route using Depends(get_db): the query runs on the event loop thread
+        with SessionLocal() as db:
+            db.execute(query, params)
+
+    async def async_session_request() -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(query, params)
+
+    async def bench() -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        # Warm both pools first so connection setup is not part of either measurement
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        blocking = await run(sync_session_request, args.requests)
+        non_blocking = await run(async_session_request, args.requests)
+        await async_engine.dispose()
+        return blocking, non_blocking
+
+    (sync_elapsed, sync_lag), (async_elapsed, async_lag) = asyncio.run(bench())
+    engine.dispose()
+
+    print(f"{args.requests} concurrent requests, {args.query_ms:.0f}ms per query")
+    print(f"  sync Session in async def:  {sync_elapsed:6.2f}s  max loop lag {sync_lag * 1000:7.1f}ms")
+    print(f"  AsyncSession (asyncpg):     {async_elapsed:6.2f}s  max loop lag {async_lag * 1000:7.1f}ms")
+    print(f"  speed-up: x{sync_elapsed / async_elapsed:.1f}")
+
+    if args.subdomain:
+        bench_route(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
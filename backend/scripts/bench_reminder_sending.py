@@ -0,0 +1,151 @@
+# scripts/bench_reminder_sending.py
+# --- NEW FILE ---
+#
+# Throughput check for reminder sending: delivers N rendered reminder emails to a
+# local SMTP sink, first the old way (asyncio.run per email, one at a time), then
+# the way send_reminder_chunk does it (one event loop, deliver_notifications with
+# bounded concurrency). The sink accepts everything and can add per-message latency
+# to mimic a real relay. No database needed; nothing leaves the machine.
+#
+# Usage (from backend/):
+#   python scripts/bench_reminder_sending.py --emails 200 --concurrency 10 --latency-ms 50
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class SmtpSink:
+    """
+    Minimal SMTP server: answers every command with success and discards the mail.
+    latency_seconds delays each message's 250; handshake_seconds delays the greeting
+    and AUTH (a stand-in for TLS + login cost). Also used by bench_smtp_pool.py.
+    """
+
+    def __init__(self, latency_seconds: float, handshake_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.handshake_seconds = handshake_seconds
+        self.received = 0
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        self.port = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self.handshake_seconds:
+            await asyncio.sleep(self.handshake_seconds)
+        writer.write(b"220 sink ESMTP\r\n")
+        in_data = False
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if in_data:
+                if line in (b".\r\n", b".\n"):
+                    in_data = False
+                    if self.latency_seconds:
+                        await asyncio.sleep(self.latency_seconds)
+                    self.received += 1
+                    writer.write(b"250 OK queued\r\n")
+                continue
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                writer.write(b"250-sink\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif command == b"AUTH":
+                if self.handshake_seconds:
+                    await asyncio.sleep(self.handshake_seconds)
+                writer.write(b"235 Authentication successful\r\n")
+            elif command == b"DATA":
+                in_data = True
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def start(self) -> int:
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(self.loop)
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+            self.port = self.server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return self.port
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Per-message delay added by the sink")
+    args = parser.parse_args()
+
+    sink = SmtpSink(args.latency_ms / 1000)
+    port = sink.start()
+
+    # Point the app's mail settings at the sink before anything imports app.config
+    os.environ.update({
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": str(port),
+        "MAIL_USERNAME": "bench",
+        "MAIL_PASSWORD": "bench",
+        "MAIL_FROM_ADDRESS": "bench@example.com",
+        "MAIL_USE_SSL": "false",
+    })
+    from app.models.communications_log import CommunicationDirection, CommunicationType
+    from app.models.template import TemplateEventTrigger
+    from app.services.notification_service import PreparedNotification, deliver_notification, deliver_notifications
+
+    tenant = SimpleNamespace(id=0, contact_email="owner@example.com")
+    prepared = {
+        i: PreparedNotification(
+            tenant=tenant,
+            appointment_id=i,
+            client_id=i,
+            event_trigger=TemplateEventTrigger.APPOINTMENT_REMINDER_CLIENT,
+            recipient_email=f"client-{i}@example.com",
+            subject=f"Reminder {i}",
+            html_body="<p>See you tomorrow.</p>",
+            log_comm_type=CommunicationType.REMINDER,
+            log_direction=CommunicationDirection.OUTBOUND,
+            template_name="Benchmark",
+        )
+        for i in range(args.emails)
+    }
+
+    started = time.perf_counter()
+    sequential_ok = sum(1 for notification in prepared.values() if asyncio.run(deliver_notification(notification)))
+    sequential = time.perf_counter() - started
+
+    loop = asyncio.new_event_loop()
+    started = time.perf_counter()
+    results = loop.run_until_complete(deliver_notifications(prepared, args.concurrency))
+    concurrent = time.perf_counter() - started
+    loop.close()
+    sink.stop()
+
+    print(f"{args.emails} emails, sink latency {args.latency_ms:.0f}ms, {sink.received} received")
+    print(f"  sequential (asyncio.run per email): {sequential:6.2f}s  {sequential_ok / sequential:7.1f} emails/s  ({sequential_ok} ok)")
+    print(f"  concurrent (one loop, {args.concurrency:>3} in flight): {concurrent:6.2f}s  {sum(results.values()) / concurrent:7.1f} emails/s  ({sum(results.values())} ok)")
+    print(f"  speed-up: x{sequential / concurrent:.1f}")
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# scripts/bench_smtp_pool.py
+# --- NEW FILE ---
+#
+# Compares one-connection-per-email (connect, EHLO, LOGIN, send, QUIT: what
+# send_email did before the pool) with app.services.smtp_pool against a local SMTP
+# sink (the one from bench_reminder_sending.py). --handshake-ms adds delay to the
+# greeting and AUTH to stand in for TLS + login against a real relay.
+#
+# Usage (from backend/):
+#   python scripts/bench_smtp_pool.py --emails 500 --threads 10 --handshake-ms 40
+import argparse
+import os
+import smtplib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_reminder_sending import SmtpSink
+
+MESSAGE = "Subject: Reminder\r\n\r\nSee you tomorrow."
+
+
+def send_unpooled(port: int, index: int) -> None:
+    with smtplib.SMTP("127.0.0.1", port, timeout=30) as server:
+        server.ehlo()
+        server.login("bench", "bench")
+        server.sendmail("bench@example.com", [f"client-{index}@example.com"], MESSAGE)
+
+
+def timed(label: str, emails: int, threads: int, send) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(send, range(emails)))
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed:6.2f}s  {emails / elapsed:8.1f} emails/s")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=10, help="Concurrent senders (send_email runs in a threadpool)")
+    parser.add_argument("--handshake-ms", type=float, default=40.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Per-message delay added by the sink")
+    parser.add_argument("--max-messages", type=int, default=100, help="Pool recycling threshold")
+    args = parser.parse_args()
+
+    sink = SmtpSink(args.latency_ms / 1000, handshake_seconds=args.handshake_ms / 1000)
+    port = sink.start()
+
+    # Point the app's mail settings at the sink before anything imports app.config
+    os.environ.update({
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": str(port),
+        "MAIL_USERNAME": "bench",
+        "MAIL_PASSWORD": "bench",
+        "MAIL_FROM_ADDRESS": "bench@example.com",
+        "MAIL_USE_SSL": "false",
+    })
+    from app.services.smtp_pool import SmtpConnectionPool
+
+    pool = SmtpConnectionPool(max_size=args.threads, max_messages=args.max_messages, idle_seconds=60)
+
+    print(f"{args.emails} emails, {args.threads} threads, handshake {args.handshake_ms:.0f}ms, message latency {args.latency_ms:.0f}ms")
+    unpooled = timed("new connection per email", args.emails, args.threads, lambda i: send_unpooled(port, i))
+    pooled = timed("pooled connections", args.emails, args.threads,
+                   lambda i: pool.send("bench@example.com", [f"client-{i}@example.com"], MESSAGE))
+    pool.close_all()
+    sink.stop()
+
+    print(f"  speed-up: x{unpooled / pooled:.1f}")
+    print(f"  pool stats: {pool.stats()}")
+    return 0 if sink.received == 2 * args.emails else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
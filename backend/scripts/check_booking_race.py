@@ -0,0 +1,71 @@
+# scripts/check_booking_race.py
+# --- NEW FILE ---
+#
+# Concurrency check for POST /appointments/: fires N simultaneous bookings at the
+# same slot against a running API and expects exactly one 201 and N-1 409s.
+# Uses a dedicated tenant/slot of your choice; it creates real appointments.
+#
+# Usage:
+#   python scripts/check_booking_race.py --api http://localhost:8000 --subdomain demo \
+#       --service-id 1 --time 2030-01-07T10:00:00Z --requests 50
+import argparse
+import json
+import sys
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def book(api: str, subdomain: str, service_id: int, slot: str, index: int, barrier: threading.Barrier) -> int:
+    payload = json.dumps({
+        "client_name": f"Race Test {index}",
+        "client_email": f"race-test-{index}@example.com",
+        "appointment_time": slot,
+        "service_ids": [service_id],
+    }).encode("utf-8")
+    request = urllib.request.Request(
+        f"{api.rstrip('/')}/appointments/?subdomain={subdomain}",
+        data=payload,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    barrier.wait() # Release all requests at the same moment
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception as e:
+        print(f"Request {index} failed: {e}")
+        return -1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--api", default="http://localhost:8000")
+    parser.add_argument("--subdomain", required=True)
+    parser.add_argument("--service-id", type=int, required=True)
+    parser.add_argument("--time", required=True, help="Slot start, ISO 8601 UTC (must be free before running)")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    barrier = threading.Barrier(args.requests)
+    with ThreadPoolExecutor(max_workers=args.requests) as pool:
+        futures = [
+            pool.submit(book, args.api, args.subdomain, args.service_id, args.time, i, barrier)
+            for i in range(args.requests)
+        ]
+        results = Counter(f.result() for f in futures)
+
+    print(f"Status codes: {dict(results)}")
+    if results.get(201) == 1 and results.get(409) == args.requests - 1:
+        print("OK: exactly one booking succeeded, all others were rejected with 409.")
+        return 0
+    print("FAIL: expected exactly one 201 and the rest 409.")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# tests/test_availability_engine.py
+#
+# Equivalence of the sweep-line engine (app/services/availability_engine.py) with the
+# nested-loop algorithm GET /availability/ used before it. The reference below is that
+# algorithm, kept as it was (minus logging): per work interval, every step is checked
+# against every busy interval. Both are fed the same random busy sets over several
+# timezones, including DST transition days.
+#
+# Run from backend/: python -m pytest tests/test_availability_engine.py
+
+import random
+from datetime import datetime, date as DDate, timedelta, timezone as pytimezone
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from app.services.availability_engine import (
+    build_work_intervals_utc, compute_available_slots, compute_day_slots, format_slots_local, is_slot_start, local_day_bounds_utc,
+)
+from app.services.business_hours import compile_schedule, get_timezone_object
+
+TIMEZONES = ["UTC", "Europe/Paris", "America/New_York", "Australia/Sydney", "Asia/Kolkata", "Australia/Lord_Howe"]
+
+DAYS = [
+    DDate(2024, 1, 15),   # Plain winter weekday
+    DDate(2024, 3, 10),   # US spring forward
+    DDate(2024, 3, 31),   # EU spring forward
+    DDate(2024, 4, 7),    # Sydney / Lord Howe fall back
+    DDate(2024, 10, 6),   # Sydney / Lord Howe spring forward
+    DDate(2024, 10, 27),  # EU fall back
+    DDate(2024, 11, 3),   # US fall back
+]
+
+# Intervals around 01:00-04:00 local hit the DST gaps and overlaps
+HOURS_CONFIGS = [
+    [{"start": "09:00", "end": "17:00"}],
+    [{"start": "08:00", "end": "12:00"}, {"start": "13:30", "end": "19:45"}],
+    [{"start": "00:00", "end": "03:30"}, {"start": "02:00", "end": "05:00"}, {"start": "22:00", "end": "23:59"}],
+    [{"start": "01:15", "end": "02:45"}, {"start": "10:00", "end": "10:20"}],
+]
+
+ROUNDS_PER_CASE = 8
+
+
+def reference_day_slots(
+    date_query: DDate,
+    business_hours_config: Dict[str, Any],
+    tenant_tz_str: str,
+    busy_utc_intervals: List[Tuple[datetime, datetime]],
+    total_required_duration_minutes: int,
+    slot_step_minutes: int,
+) -> List[datetime]:
+    """The pre-engine nested-loop slot generation from app/routers/availability.py."""
+    tenant_tz = get_timezone_object(tenant_tz_str)
+    day_of_week_str = date_query.strftime("%A").lower()
+    business_hours_for_day = business_hours_config.get(day_of_week_str)
+    if not business_hours_for_day or not business_hours_for_day.get("isOpen") or not business_hours_for_day.get("intervals"):
+        return []
+
+    work_intervals_utc: List[Dict[str, datetime]] = []
+    for interval_str_obj in business_hours_for_day["intervals"]:
+        try:
+            start_time_obj = datetime.strptime(interval_str_obj["start"], "%H:%M").time()
+            end_time_obj = datetime.strptime(interval_str_obj["end"], "%H:%M").time()
+            if end_time_obj <= start_time_obj:
+                continue
+            start_utc = datetime.combine(date_query, start_time_obj, tzinfo=tenant_tz).astimezone(pytimezone.utc)
+            end_utc = datetime.combine(date_query, end_time_obj, tzinfo=tenant_tz).astimezone(pytimezone.utc)
+            if end_utc <= start_utc:
+                continue
+            work_intervals_utc.append({"start_utc": start_utc, "end_utc": end_utc})
+        except ValueError:
+            continue
+
+    available_slots_utc: List[datetime] = []
+    for work_interval in work_intervals_utc:
+        current_potential_slot_start_utc = work_interval["start_utc"]
+        work_interval_end_utc = work_interval["end_utc"]
+        while True:
+            potential_slot_end_utc = current_potential_slot_start_utc + timedelta(minutes=total_required_duration_minutes)
+            if potential_slot_end_utc > work_interval_end_utc:
+                break
+
+            is_slot_free = True
+            for busy_start, busy_end in busy_utc_intervals:
+                if max(current_potential_slot_start_utc, busy_start) < min(potential_slot_end_utc, busy_end):
+                    is_slot_free = False
+                    break
+            if is_slot_free:
+                available_slots_utc.append(current_potential_slot_start_utc)
+
+            current_potential_slot_start_utc += timedelta(minutes=slot_step_minutes)
+            if current_potential_slot_start_utc >= work_interval_end_utc:
+                break
+    return available_slots_utc
+
+
+def reference_format(slots_utc: List[datetime], tenant_tz_str: str) -> List[str]:
+    tenant_tz = get_timezone_object(tenant_tz_str)
+    return sorted(list(set(slot_utc.astimezone(tenant_tz).strftime("%H:%M") for slot_utc in slots_utc)))
+
+
+def config_for(day: DDate, intervals: List[Dict[str, str]]) -> Dict[str, Any]:
+    return {day.strftime("%A").lower(): {"isOpen": True, "intervals": intervals}}
+
+
+def random_busy(rng: random.Random, day: DDate, tenant_tz_str: str) -> List[Tuple[datetime, datetime]]:
+    """Busy intervals around the local day: overlapping, touching, empty and inverted ones included."""
+    day_start_utc, day_end_utc = local_day_bounds_utc(day, get_timezone_object(tenant_tz_str))
+    span_minutes = int((day_end_utc - day_start_utc).total_seconds() // 60)
+    busy = []
+    for _ in range(rng.randint(0, 25)):
+        start = day_start_utc + timedelta(minutes=rng.randint(-120, span_minutes + 60))
+        length = rng.choice([0, -15, rng.randint(1, 240), rng.randint(1, 30) * 5])
+        busy.append((start, start + timedelta(minutes=length)))
+    if busy and rng.random() < 0.3:
+        busy.append((busy[-1][1], busy[-1][1] + timedelta(minutes=45))) # Touching the previous one
+    return busy
+
+
+@pytest.mark.parametrize("tenant_tz_str", TIMEZONES)
+@pytest.mark.parametrize("day", DAYS, ids=str)
+def test_engine_matches_nested_loop(tenant_tz_str: str, day: DDate) -> None:
+    rng = random.Random(f"{tenant_tz_str}-{day}")
+    for intervals in HOURS_CONFIGS:
+        config = config_for(day, intervals)
+        schedule = compile_schedule(config, tenant_tz_str)
+        for _ in range(ROUNDS_PER_CASE):
+            busy = random_busy(rng, day, tenant_tz_str)
+            duration = rng.choice([5, 15, 30, 45, 60, 90, 135, 240])
+            step = rng.choice([5, 10, 15, 20, 30, 45, 60])
+
+            expected = reference_day_slots(day, config, tenant_tz_str, busy, duration, step)
+            actual = compute_day_slots(day, schedule, busy, duration, step)
+
+            assert sorted(actual) == sorted(expected), (intervals, busy, duration, step)
+            assert format_slots_local(actual, schedule.tz) == reference_format(expected, tenant_tz_str)
+
+
+def test_closed_day_has_no_slots() -> None:
+    day = DDate(2024, 1, 15)
+    schedule = compile_schedule({"monday": {"isOpen": False, "intervals": [{"start": "09:00", "end": "17:00"}]}}, "UTC")
+    assert compute_day_slots(day, schedule, [], 30, 15) == []
+    assert compute_day_slots(day + timedelta(days=1), schedule, [], 30, 15) == []
+
+
+def test_busy_interval_overlapping_whole_day_blocks_everything() -> None:
+    day = DDate(2024, 3, 31)
+    schedule = compile_schedule(config_for(day, [{"start": "09:00", "end": "17:00"}]), "Europe/Paris")
+    day_start_utc, day_end_utc = local_day_bounds_utc(day, schedule.tz)
+    busy = [(day_start_utc - timedelta(hours=1), day_end_utc + timedelta(hours=1))]
+    assert compute_day_slots(day, schedule, busy, 30, 15) == []
+
+
+@pytest.mark.parametrize("tenant_tz_str", ["Europe/Paris", "America/New_York"])
+def test_is_slot_start_matches_free_day_slots(tenant_tz_str: str) -> None:
+    """Slot holds accept exactly the starts an empty day offers."""
+    for day in DAYS:
+        for intervals in HOURS_CONFIGS:
+            schedule = compile_schedule(config_for(day, intervals), tenant_tz_str)
+            work_intervals_utc = build_work_intervals_utc(day, schedule)
+            for duration, step in ((30, 15), (45, 20), (60, 60)):
+                offered = set(compute_available_slots(work_intervals_utc, [], duration, step))
+                day_start_utc, day_end_utc = local_day_bounds_utc(day, schedule.tz)
+                candidate = day_start_utc
+                while candidate < day_end_utc:
+                    assert is_slot_start(work_intervals_utc, candidate, duration, step) == (candidate in offered)
+                    candidate += timedelta(minutes=5)
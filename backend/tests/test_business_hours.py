@@ -0,0 +1,53 @@
+# tests/test_business_hours.py
+#
+# get_tenant_schedule() reads the version stored on the tenant (tenants.business_hours_version)
+# and only hashes the config for tenants that were never stamped.
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import business_hours
+from app.services.business_hours import get_tenant_schedule, invalidate_tenant_schedule, stamp_schedule_version
+
+CONFIG = {"monday": {"isOpen": True, "intervals": [{"start": "09:00", "end": "17:00"}]}}
+
+
+def make_tenant(tenant_id: int, **fields) -> SimpleNamespace:
+    tenant = SimpleNamespace(id=tenant_id, timezone="Europe/Paris", business_hours_config=CONFIG, business_hours_version=None)
+    tenant.__dict__.update(fields)
+    return tenant
+
+
+def test_stamped_tenant_is_not_hashed_per_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    tenant = make_tenant(9001)
+    stamp_schedule_version(tenant)
+    invalidate_tenant_schedule(tenant.id)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("schedule_version() called on the read path")
+    monkeypatch.setattr(business_hours, "schedule_version", fail)
+
+    first = get_tenant_schedule(tenant)
+    assert get_tenant_schedule(tenant) is first
+    assert first.version == tenant.business_hours_version
+    assert first.days[0] == ((9 * 60, 17 * 60),)
+
+
+def test_new_stamp_recompiles() -> None:
+    tenant = make_tenant(9002)
+    stamp_schedule_version(tenant)
+    before = get_tenant_schedule(tenant)
+
+    tenant.business_hours_config = {"monday": {"isOpen": True, "intervals": [{"start": "10:00", "end": "12:00"}]}}
+    stamp_schedule_version(tenant)
+    after = get_tenant_schedule(tenant)
+
+    assert after is not before
+    assert after.days[0] == ((10 * 60, 12 * 60),)
+
+
+def test_unstamped_tenant_falls_back_to_hashing() -> None:
+    tenant = make_tenant(9003)
+    schedule = get_tenant_schedule(tenant)
+    assert schedule.version == business_hours.schedule_version(CONFIG, "Europe/Paris")
@@ -0,0 +1,71 @@
+# tests/test_reminder_schedule.py
+#
+# schedule_reminders() never creates a reminder whose moment already passed: a client
+# booking (or moved) inside an offset gets no late "24h reminder" next to the confirmation.
+# Plain ORM objects, no database.
+
+from datetime import datetime, timedelta, timezone as pytimezone
+from types import SimpleNamespace
+
+import app.models # noqa: F401 -- configures every mapper the relationships refer to
+from app.models.appointment import Appointment
+from app.models.appointment_reminder import AppointmentReminder, ReminderOutcome
+from app.services.reminder_schedule import schedule_reminders
+
+TENANT = SimpleNamespace(id=1, reminder_offsets_hours=[24, 1], reminder_interval_hours=24)
+
+
+def make_appointment(hours_ahead: float) -> Appointment:
+    appointment = Appointment(tenant_id=TENANT.id, appointment_time=datetime.now(pytimezone.utc) + timedelta(hours=hours_ahead))
+    appointment.services = []
+    return appointment
+
+
+def offsets(appointment: Appointment) -> list:
+    return sorted(reminder.offset_hours for reminder in appointment.reminders)
+
+
+def test_booking_inside_an_offset_skips_that_reminder() -> None:
+    appointment = make_appointment(2)
+    schedule_reminders(appointment, TENANT)
+    assert offsets(appointment) == [1]
+
+    appointment = make_appointment(48)
+    schedule_reminders(appointment, TENANT)
+    assert offsets(appointment) == [1, 24]
+
+
+def test_naive_appointment_time_is_taken_as_utc() -> None:
+    appointment = make_appointment(2)
+    appointment.appointment_time = appointment.appointment_time.replace(tzinfo=None)
+    schedule_reminders(appointment, TENANT)
+    assert offsets(appointment) == [1]
+
+
+def test_reschedule_nearer_drops_the_past_offset() -> None:
+    appointment = make_appointment(48)
+    schedule_reminders(appointment, TENANT)
+    appointment.appointment_time = datetime.now(pytimezone.utc) + timedelta(hours=3)
+    schedule_reminders(appointment, TENANT)
+    assert offsets(appointment) == [1]
+    assert all(reminder.sent_at is None for reminder in appointment.reminders)
+
+
+def test_offset_change_keeps_due_and_processed_rows() -> None:
+    appointment = make_appointment(2)
+    now_utc = datetime.now(pytimezone.utc)
+    due = AppointmentReminder(tenant_id=TENANT.id, offset_hours=1, due_at=now_utc - timedelta(minutes=5))
+    processed = AppointmentReminder(tenant_id=TENANT.id, offset_hours=24, due_at=now_utc - timedelta(hours=22), sent_at=now_utc, outcome=ReminderOutcome.SENT)
+    appointment.reminders.extend([due, processed])
+
+    schedule_reminders(appointment, TENANT, reset_sent=False)
+    assert appointment.reminders == [due, processed]
+    assert due.sent_at is None and processed.outcome == ReminderOutcome.SENT
+
+
+def test_added_offset_already_past_gets_no_row() -> None:
+    """Service offsets changed from [1] to [48, 1] for an appointment 2h away (reschedule_service_reminders)."""
+    appointment = make_appointment(2)
+    schedule_reminders(appointment, SimpleNamespace(id=1, reminder_offsets_hours=[1], reminder_interval_hours=24))
+    schedule_reminders(appointment, SimpleNamespace(id=1, reminder_offsets_hours=[48, 1], reminder_interval_hours=24), reset_sent=False)
+    assert offsets(appointment) == [1]
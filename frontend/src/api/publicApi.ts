@@ -2,7 +2,7 @@
 // --- FULL REPLACEMENT ---
 
 import axios from "axios";
-import { AvailabilityResponse } from '../types/Availability';
+import { AvailabilityResponse, AvailabilityRangeResponse, NextAvailabilityResponse, SlotHoldResponse } from '../types/Availability';
 import axiosInstance from "./axiosInstance";
 import { buildApiUrl } from "./apiBase";
 
@@ -25,6 +25,7 @@ export interface AppointmentCreatePayload {
     appointment_time: string; // ISO Format string
     service_ids: number[];
     status?: string; // Optional: backend should handle default
+    hold_id?: string; // Slot hold placed when the time was picked (see createSlotHold)
 }
 
 // --- Helper to extract subdomain from current hostname ---
@@ -78,7 +79,8 @@ export const createPublicAppointment = async (appointmentData: AppointmentCreate
 export const fetchAvailability = async (
     date: string, // YYYY-MM-DD format
     serviceIds: number[],
-    tenantSubdomain?: string
+    tenantSubdomain?: string,
+    holdId?: string // Our own hold, so its slot is still listed
 ): Promise<AvailabilityResponse> => {
     const serviceIdsString = serviceIds.join(',');
     const subdomain = tenantSubdomain || getSubdomainFromHostname();
@@ -88,8 +90,89 @@ export const fetchAvailability = async (
         params: {
             date_query: date,
             service_ids_query: serviceIdsString,
+            hold_id: holdId,
             subdomain,
         }
     });
     return response.data;
 };
+
+/**
+ * Fetches availability for a whole date range in one call (e.g. to color a month calendar).
+ * Calls the backend endpoint: GET /availability/range?subdomain=xxx
+ */
+export const fetchAvailabilityRange = async (
+    startDate: string, // YYYY-MM-DD format
+    endDate: string,   // YYYY-MM-DD format, inclusive (max 62 days)
+    serviceIds: number[],
+    mode: 'slots' | 'summary' = 'summary',
+    tenantSubdomain?: string
+): Promise<AvailabilityRangeResponse> => {
+    const subdomain = tenantSubdomain || getSubdomainFromHostname();
+    const apiUrl = buildApiUrl("/availability/range");
+
+    const response = await axiosInstance.get<AvailabilityRangeResponse>(apiUrl, {
+        params: {
+            start_date: startDate,
+            end_date: endDate,
+            service_ids_query: serviceIds.join(','),
+            mode,
+            subdomain,
+        }
+    });
+    return response.data;
+};
+
+/**
+ * Finds the earliest free slots (e.g. for a "first available" button) instead of walking dates one by one.
+ * Calls the backend endpoint: GET /availability/next?subdomain=xxx
+ */
+export const fetchNextAvailableSlots = async (
+    serviceIds: number[],
+    options: { startDate?: string; maxDays?: number; limit?: number } = {},
+    tenantSubdomain?: string
+): Promise<NextAvailabilityResponse> => {
+    const subdomain = tenantSubdomain || getSubdomainFromHostname();
+    const apiUrl = buildApiUrl("/availability/next");
+
+    const response = await axiosInstance.get<NextAvailabilityResponse>(apiUrl, {
+        params: {
+            service_ids_query: serviceIds.join(','),
+            start_date: options.startDate,
+            max_days: options.maxDays,
+            limit: options.limit,
+            subdomain,
+        }
+    });
+    return response.data;
+};
+
+/**
+ * Holds a slot for a few minutes while the visitor fills in their details.
+ * Calls the backend endpoint: POST /availability/holds?subdomain=xxx (409 if taken or held by someone else)
+ */
+export const createSlotHold = async (
+    serviceIds: number[],
+    startTime: string, // ISO format string
+    tenantSubdomain?: string
+): Promise<SlotHoldResponse> => {
+    const subdomain = tenantSubdomain || getSubdomainFromHostname();
+    const apiUrl = buildApiUrl("/availability/holds");
+
+    const response = await axiosInstance.post<SlotHoldResponse>(
+        apiUrl,
+        { service_ids: serviceIds, start_time: startTime },
+        { params: { subdomain } }
+    );
+    return response.data;
+};
+
+/**
+ * Releases a slot hold early (another slot was picked or the form was reset).
+ * Calls the backend endpoint: DELETE /availability/holds/{holdId}?subdomain=xxx
+ */
+export const releaseSlotHold = async (holdId: string, tenantSubdomain?: string): Promise<void> => {
+    const subdomain = tenantSubdomain || getSubdomainFromHostname();
+    const apiUrl = buildApiUrl(`/availability/holds/${encodeURIComponent(holdId)}`);
+    await axiosInstance.delete(apiUrl, { params: { subdomain } });
+};
@@ -156,20 +156,30 @@ export type ExpireOverdueTenantsResult = {
     message: string;
 };
 
+export type ReminderOffsetHealth = {
+    offset_hours: number;
+    sent_last_24h: number;
+    failed_last_24h: number;
+    due_now_count: number;
+    last_failure_at: string | null;
+};
+
 export type TenantReminderHealth = {
     tenant_id: number;
     checked_at: string;
     reminder_interval_hours: number;
+    reminder_offsets_hours: number[];
     sent_last_24h: number;
     failed_last_24h: number;
     due_now_count: number;
     last_failure_at: string | null;
+    offsets: ReminderOffsetHealth[];
 };
 
 export type RetryFailedRemindersResult = {
     tenant_id: number;
     attempted: number;
-    sent: number;
+    queued: number; // Re-sent asynchronously through the notification outbox
     failed: number;
     hours_back: number;
 };
@@ -1,7 +1,7 @@
 // src/pages/BookingPage.tsx
 
 import axios from "axios";
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import Calendar from 'react-calendar';
 import 'react-calendar/dist/Calendar.css';
 import { startOfDay } from 'date-fns';
@@ -13,6 +13,8 @@ import {
     fetchTenantServices,
     createPublicAppointment,
   fetchAvailability,
+    createSlotHold,
+    releaseSlotHold,
     PublicService,
     AppointmentCreatePayload
 } from '../api/publicApi';
@@ -20,6 +22,34 @@ import './BookingPage.css';
 
 type CalendarValue = Date | null;
 
+// Combines the calendar date with a "HH:MM" (or "h:mm AM/PM") slot label into a Date
+const buildAppointmentDate = (date: Date, time: string): Date => {
+  let hours = 0, minutes = 0;
+  const timeMatch = time.match(/(\d{1,2}):(\d{2})\s*(AM|PM)?/i);
+  if (timeMatch) {
+    hours = parseInt(timeMatch[1], 10);
+    minutes = parseInt(timeMatch[2], 10);
+    const period = timeMatch[3]?.toUpperCase();
+    if (period === "PM" && hours < 12) hours += 12;
+    if (period === "AM" && hours === 12) hours = 0;
+  } else {
+    const timeParts = time.split(':');
+    if (timeParts.length === 2) { hours = parseInt(timeParts[0], 10); minutes = parseInt(timeParts[1], 10); }
+    else throw new Error("Format d’heure invalide");
+  }
+  const appointmentDateTime = new Date(date);
+  appointmentDateTime.setHours(hours, minutes, 0, 0);
+  if (isNaN(appointmentDateTime.getTime())) throw new Error("Combinaison date/heure invalide");
+  return appointmentDateTime;
+};
+
+// Best-effort release of the current slot hold (it expires server-side anyway)
+const releaseHeldSlot = (holdIdRef: React.MutableRefObject<string | null>) => {
+  const holdId = holdIdRef.current;
+  holdIdRef.current = null;
+  if (holdId) releaseSlotHold(holdId).catch(() => undefined);
+};
+
 const BookingPage: React.FC = () => {
   const [name, setName] = useState('');
   const [email, setEmail] = useState('');
@@ -34,6 +64,8 @@ const BookingPage: React.FC = () => {
   const [isLoadingAvailability, setIsLoadingAvailability] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [successMessage, setSuccessMessage] = useState<string | null>(null);
+  // Hold on the selected slot while the visitor fills in the form (expires server-side on its own)
+  const holdIdRef = useRef<string | null>(null);
 
   useEffect(() => {
     setIsLoadingServices(true);
@@ -57,8 +89,10 @@ const BookingPage: React.FC = () => {
       if (!selectedDate || selectedServiceIds.length === 0) {
         setAvailableTimes([]);
         setSelectedTime(null);
+        releaseHeldSlot(holdIdRef);
         return;
       }
+      releaseHeldSlot(holdIdRef); // Date or services changed: the held range no longer matches
 
       setIsLoadingAvailability(true);
       try {
@@ -83,7 +117,22 @@ const BookingPage: React.FC = () => {
     if (date) setSelectedDate(startOfDay(date));
   };
 
-  const handleTimeSelect = (time: string) => setSelectedTime(time);
+  const handleTimeSelect = async (time: string) => {
+    setSelectedTime(time);
+    releaseHeldSlot(holdIdRef);
+    if (!selectedDate || selectedServiceIds.length === 0) return;
+    try {
+      const hold = await createSlotHold(selectedServiceIds, buildAppointmentDate(selectedDate, time).toISOString());
+      holdIdRef.current = hold.hold_id;
+    } catch (holdError) {
+      if (axios.isAxiosError(holdError) && holdError.response?.status === 409) {
+        setSelectedTime(null);
+        setAvailableTimes(prev => prev.filter(t => t !== time));
+        setError("Ce créneau vient d’être pris. Veuillez choisir une autre heure.");
+      }
+      // Other failures (e.g. holds unavailable): continue without a hold, booking re-checks the slot anyway
+    }
+  };
 
   const handleServiceSelect = (serviceId: number) => {
     setSelectedServiceIds(prevIds =>
@@ -101,28 +150,15 @@ const BookingPage: React.FC = () => {
     }
     setIsSubmitting(true);
     try {
-      let hours = 0, minutes = 0;
-      const timeMatch = selectedTime.match(/(\d{1,2}):(\d{2})\s*(AM|PM)?/i);
-      if (timeMatch) {
-        hours = parseInt(timeMatch[1], 10);
-        minutes = parseInt(timeMatch[2], 10);
-        const period = timeMatch[3]?.toUpperCase();
-        if (period === "PM" && hours < 12) hours += 12;
-        if (period === "AM" && hours === 12) hours = 0;
-      } else {
-        const timeParts = selectedTime.split(':');
-        if (timeParts.length === 2) { hours = parseInt(timeParts[0], 10); minutes = parseInt(timeParts[1], 10); }
-        else throw new Error("Format d’heure invalide");
-      }
-      const appointmentDateTime = new Date(selectedDate);
-      appointmentDateTime.setHours(hours, minutes, 0, 0);
-      if (isNaN(appointmentDateTime.getTime())) throw new Error("Combinaison date/heure invalide");
+      const appointmentDateTime = buildAppointmentDate(selectedDate, selectedTime);
 
       const payload: AppointmentCreatePayload = {
         client_name: name, client_email: email, client_phone: phone || undefined,
         appointment_time: appointmentDateTime.toISOString(), service_ids: selectedServiceIds,
+        hold_id: holdIdRef.current || undefined,
       };
       await createPublicAppointment(payload);
+      holdIdRef.current = null; // Consumed by the booking
       setSuccessMessage("Réservation confirmée ! Vous recevrez les détails dans quelques instants.");
       setName(''); setEmail(''); setPhone('');
       setSelectedDate(startOfDay(new Date())); setSelectedTime(null);
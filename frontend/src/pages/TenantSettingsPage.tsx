@@ -344,6 +344,22 @@ const TenantSettingsPage: React.FC = () => {
                             />
                             <FormHelperText fontSize="xs">Hours before appointment to send reminder. Leave blank or enter 0 to disable.</FormHelperText>
                         </FormControl>
+                        <FormControl>
+                            <FormLabel fontSize="sm" fontWeight="500" color="gray.700">Admin Booking Digest (Minutes)</FormLabel>
+                            <Input
+                                {...inputProps}
+                                name="admin_digest_interval_minutes"
+                                type="number"
+                                value={tenantData?.admin_digest_interval_minutes ?? ''}
+                                onChange={handleInputChange}
+                                isDisabled={!isEditing}
+                                min={15}
+                                max={1440}
+                                step={15}
+                                placeholder="e.g., 60"
+                            />
+                            <FormHelperText fontSize="xs">Send the contact email one summary of new bookings and cancellations every N minutes (15-1440). Leave blank for one email per booking.</FormHelperText>
+                        </FormControl>
                         <FormControl>
                             <FormLabel fontSize="sm" fontWeight="500" color="gray.700">Business Hours</FormLabel>
                             <FormHelperText fontSize="xs" mb="2">Times use 24-hour format (e.g., 17:00 for 5 PM).</FormHelperText>
@@ -54,6 +54,7 @@ import {
   retryTenantFailedReminders,
   runReminderJobNow,
   updateTenantById,
+  ReminderOffsetHealth,
 } from '../../api/tenantApi';
 import { createService } from '../../api/serviceApi';
 import { createUser, fetchUsers, resetUserPassword, updateUser } from '../../api/userApi';
@@ -649,8 +650,8 @@ const TenantsManagementView: React.FC = () => {
       setTenantReminderHealth(refreshedHealth);
 
       toast({
-        title: 'Retry completed',
-        description: `Attempted ${result.attempted}, sent ${result.sent}, failed ${result.failed}.`,
+        title: 'Retry queued',
+        description: `Attempted ${result.attempted}, queued ${result.queued}, failed ${result.failed}.`,
         status: result.failed > 0 ? 'warning' : 'success'
       });
     } catch (err: any) {
@@ -1069,6 +1070,30 @@ const TenantsManagementView: React.FC = () => {
                       <Text fontSize="xs" color="gray.500" mb="3">
                         Last failure: {tenantReminderHealth.last_failure_at ? new Date(tenantReminderHealth.last_failure_at).toLocaleString() : 'none'}
                       </Text>
+                      {tenantReminderHealth.offsets?.length > 0 && (
+                        <TableContainer mb="3">
+                          <Table size="sm">
+                            <Thead>
+                              <Tr>
+                                <Th>{tx('Offset', 'Delai')}</Th>
+                                <Th isNumeric>Sent (24h)</Th>
+                                <Th isNumeric>Failed (24h)</Th>
+                                <Th isNumeric>Due Now</Th>
+                              </Tr>
+                            </Thead>
+                            <Tbody>
+                              {tenantReminderHealth.offsets.map((offset: ReminderOffsetHealth) => (
+                                <Tr key={offset.offset_hours}>
+                                  <Td>{offset.offset_hours}h</Td>
+                                  <Td isNumeric>{offset.sent_last_24h}</Td>
+                                  <Td isNumeric>{offset.failed_last_24h}</Td>
+                                  <Td isNumeric>{offset.due_now_count}</Td>
+                                </Tr>
+                              ))}
+                            </Tbody>
+                          </Table>
+                        </TableContainer>
+                      )}
                     </>
                   )}
                   <HStack spacing="3">
@@ -4,3 +4,33 @@ export interface AvailabilityResponse {
     date_checked: string;      // "YYYY-MM-DD"
     timezone_queried: string;  // e.g., "America/New_York"
 }
+
+export interface AvailabilityRangeResponse {
+    start_date: string;        // "YYYY-MM-DD"
+    end_date: string;          // "YYYY-MM-DD", inclusive
+    timezone_queried: string;
+    mode: 'slots' | 'summary';
+    available_slots?: Record<string, string[]> | null; // mode "slots": date -> ["HH:MM", ...]
+    slot_counts?: Record<string, number> | null;       // mode "summary": date -> free slot count
+}
+
+export interface NextAvailableSlot {
+    local_date: string;        // "YYYY-MM-DD" in the tenant's timezone
+    local_time: string;        // "HH:MM" in the tenant's timezone
+    start_utc: string;         // ISO datetime, usable as appointment_time
+}
+
+export interface NextAvailabilityResponse {
+    slots: NextAvailableSlot[]; // Earliest first
+    timezone_queried: string;
+    searched_from: string;
+    searched_through?: string | null;
+    search_complete: boolean;   // false if the server stopped early (latency budget)
+}
+
+export interface SlotHoldResponse {
+    hold_id: string;           // Send back as hold_id when booking
+    start_utc: string;
+    end_utc: string;
+    expires_at: string;        // The slot is released automatically after this
+}
@@ -56,6 +56,7 @@ export interface TenantOut {
   business_hours_config: BusinessHoursConfig | null;
   booking_widget_config: Record<string, any> | null;
   reminder_interval_hours: number | null;
+  admin_digest_interval_minutes: number | null; // null: one admin email per booking
 
   billing_plan: string | null;
   billing_status: string | null;
@@ -97,6 +98,7 @@ export interface TenantUpdate {
   business_hours_config?: BusinessHoursConfig | null;
   booking_widget_config?: Record<string, any> | null;
   reminder_interval_hours?: number | null;
+  admin_digest_interval_minutes?: number | null;
 
   billing_plan?: string | null;
   billing_status?: string | null;